@@ -0,0 +1,60 @@
+"""Micro-benchmark: stdlib json vs the fast codec for transaction-sized payloads.
+
+Decodes and re-encodes a synthetic page of transactions shaped like the PocketSmith
+API's, for every installed backend. Run with `uv run python benchmarks/codec_bench.py`
+(install the `fast` extra to include orjson).
+"""
+
+import argparse
+import timeit
+
+from pocketsmith_mcp import codec
+
+
+def make_transactions(n: int) -> list:
+    return [
+        {
+            'id': 100000 + i,
+            'payee': f'Merchant {i % 250}',
+            'original_payee': f'MERCHANT {i % 250} SYDNEY AU',
+            'date': f'2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+            'amount': -round((i * 37) % 50000 / 100, 2),
+            'amount_in_base_currency': -round((i * 37) % 50000 / 100, 2),
+            'type': 'debit',
+            'is_transfer': False,
+            'needs_review': i % 17 == 0,
+            'status': 'posted',
+            'note': None,
+            'labels': ['groceries'] if i % 3 == 0 else [],
+            'category': {'id': i % 40, 'title': f'Category {i % 40}', 'colour': '#ff0000'},
+            'transaction_account': {'id': i % 6, 'name': 'Everyday', 'currency_code': 'aud'},
+            'created_at': '2024-06-01T10:00:00Z',
+            'updated_at': '2024-06-02T10:00:00Z',
+        }
+        for i in range(n)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_transactions(args.rows)
+    body = codec.select('json')[2](rows).encode('utf-8')
+    print(f'{args.rows} transactions, {len(body) / 1024:.0f} KiB body, best of {args.repeat}')
+    print(f'{"backend":<10}{"decode ms":>12}{"encode ms":>12}')
+    for name in codec.BACKENDS:
+        chosen, loads, dumps = codec.select(name)
+        if chosen != name:
+            print(f'{name:<10}{"not installed":>24}')
+            continue
+        decode = min(timeit.repeat(lambda: loads(body), number=1, repeat=args.repeat))  # noqa: B023
+        encode = min(timeit.repeat(lambda: dumps(rows), number=1, repeat=args.repeat))  # noqa: B023
+        print(f'{name:<10}{decode * 1000:>12.2f}{encode * 1000:>12.2f}')
+    print(f'active backend: {codec.NAME}')
+
+
+if __name__ == '__main__':
+    main()
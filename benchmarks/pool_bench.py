@@ -0,0 +1,178 @@
+"""Connection-pool benchmark: HTTP/1.1 pool sizes vs HTTP/2 against a local stand-in API.
+
+The stand-in answers every GET with a page of synthetic transactions after
+`--latency-ms`, and delays the first bytes of every new connection by `--handshake-ms`
+to stand in for TCP + TLS setup. Each configuration builds its client the way the
+server does (`_client_options`), fetches `--pages` pages with `--concurrency` in flight,
+then fetches them again on the now-warm pool. HTTP/2 runs as cleartext prior-knowledge
+h2c and needs the `http2` extra. Run with `uv run python benchmarks/pool_bench.py`.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+from pocketsmith_mcp.config import ServerConfig
+from pocketsmith_mcp.server import _client_options
+
+
+def _page(rows: int) -> bytes:
+    return json.dumps(
+        [
+            {'id': i, 'date': '2025-01-01', 'amount': -12.5, 'payee': f'Payee {i % 40}'}
+            for i in range(rows)
+        ]
+    ).encode()
+
+
+class StandIn:
+    """Tiny HTTP/1.1 + h2c server; counts the connections it accepts."""
+
+    def __init__(self, body: bytes, latency: float, handshake: float):
+        self.body = body
+        self.latency = latency
+        self.handshake = handshake
+        self.connections = 0
+
+    async def serve_h1(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        head = (
+            'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(self.body)}\r\n\r\n'
+        ).encode()
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                if not request:
+                    break
+                await asyncio.sleep(self.latency)
+                writer.write(head + self.body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        writer.close()
+
+    async def serve_h2(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        import h2.config
+        import h2.connection
+        import h2.events
+
+        self.connections += 1
+        await asyncio.sleep(self.handshake)
+        conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False))
+        conn.initiate_connection()
+        writer.write(conn.data_to_send())
+        window_opened = asyncio.Event()
+
+        async def respond(stream_id: int) -> None:
+            await asyncio.sleep(self.latency)
+            conn.send_headers(
+                stream_id,
+                [
+                    (':status', '200'),
+                    ('content-type', 'application/json'),
+                    ('content-length', str(len(self.body))),
+                ],
+            )
+            body = self.body
+            while body:
+                size = min(conn.local_flow_control_window(stream_id), conn.max_outbound_frame_size)
+                if size <= 0:
+                    window_opened.clear()
+                    writer.write(conn.data_to_send())
+                    await window_opened.wait()
+                    continue
+                conn.send_data(stream_id, body[:size], end_stream=len(body) <= size)
+                body = body[size:]
+            writer.write(conn.data_to_send())
+
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        asyncio.ensure_future(respond(event.stream_id))
+                    elif isinstance(event, h2.events.WindowUpdated):
+                        window_opened.set()
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        return
+                writer.write(conn.data_to_send())
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def fetch_all(client: httpx.AsyncClient, pages: int, concurrency: int) -> float:
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(page: int) -> None:
+        async with gate:
+            resp = await client.get('/users/1/transactions', params={'page': page})
+            resp.raise_for_status()
+            resp.json()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in range(1, pages + 1)))
+    return time.perf_counter() - started
+
+
+async def run(args: argparse.Namespace) -> None:
+    stand_in = StandIn(_page(args.rows), args.latency_ms / 1000, args.handshake_ms / 1000)
+    h1 = await asyncio.start_server(stand_in.serve_h1, '127.0.0.1', 0)
+    h2 = await asyncio.start_server(stand_in.serve_h2, '127.0.0.1', 0)
+    h1_url = f'http://127.0.0.1:{h1.sockets[0].getsockname()[1]}/v2'
+    h2_url = f'http://127.0.0.1:{h2.sockets[0].getsockname()[1]}/v2'
+
+    configs: List[Dict] = [
+        {'label': f'HTTP/1.1 pool={n}', 'url': h1_url, 'config': ServerConfig(max_connections=n)}
+        for n in args.pool_sizes
+    ]
+    if importlib.util.find_spec('h2') is not None:
+        configs.append({'label': 'HTTP/2 (h2c)', 'url': h2_url, 'config': ServerConfig(http2=True)})
+    else:
+        print('h2 not installed; skipping HTTP/2 (install the `http2` extra)')
+
+    print(
+        f'{args.pages} pages x {len(stand_in.body) // 1024} KB, concurrency {args.concurrency}, '
+        f'latency {args.latency_ms} ms, handshake {args.handshake_ms} ms'
+    )
+    print(f'  {"":<22}{"cold":>10}{"warm":>10}{"connections":>13}')
+    for entry in configs:
+        options = _client_options(entry['config'])
+        if options['http2']:
+            # No TLS/ALPN locally: speak HTTP/2 with prior knowledge
+            options['http1'] = False
+        stand_in.connections = 0
+        async with httpx.AsyncClient(base_url=entry['url'], **options) as client:
+            cold = await fetch_all(client, args.pages, args.concurrency)
+            warm = await fetch_all(client, args.pages, args.concurrency)
+        print(
+            f'  {entry["label"]:<22}{cold * 1000:>8.1f}ms{warm * 1000:>8.1f}ms'
+            f'{stand_in.connections:>13}'
+        )
+    h1.close()
+    h2.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=48)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=20.0)
+    parser.add_argument('--handshake-ms', type=float, default=60.0)
+    parser.add_argument('--pool-sizes', type=int, nargs='+', default=[1, 4, 8, 16])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Cold-start benchmark: server import and construction with and without the autotools.
+
+Imports `pocketsmith_mcp.server` and calls `create_server()` in fresh interpreters (the
+way `uvx pocketsmith-mcp` starts) and reports the median wall time of each step, plus
+the in-process cost of parsing the bundled OpenAPI spec. Run with `uv run python benchmarks/startup_bench.py`.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+_STARTUP = (
+    'import time; t = time.perf_counter(); import pocketsmith_mcp.server as s; '
+    'i = time.perf_counter(); s.create_server(); print(i - t, time.perf_counter() - i)'
+)
+
+
+def startup_seconds(env: dict, runs: int) -> tuple:
+    """(import times, create_server times) over `runs` fresh interpreters."""
+    imports, creates = [], []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', _STARTUP], env=env, capture_output=True, text=True, check=True
+        )
+        imported, created = out.stdout.strip().splitlines()[-1].split()
+        imports.append(float(imported))
+        creates.append(float(created))
+    return imports, creates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('POCKETSMITH_DEVELOPER_KEY', 'bench')
+    env = {**os.environ}
+    print(f'server startup, median of {args.runs} fresh interpreters')
+    print(f'  {"":<20}{"import":>21}{"create_server":>16}')
+    for label, flag in (('curated only', '0'), ('with autotools', '1')):
+        imports, creates = startup_seconds(
+            {**env, 'POCKETSMITH_INCLUDE_AUTOTOOLS': flag}, args.runs
+        )
+        print(
+            f'  {label:<20}{statistics.median(imports) * 1000:>18.1f} ms'
+            f'{statistics.median(creates) * 1000:>13.1f} ms'
+        )
+
+    from pocketsmith_mcp import codec
+    from pocketsmith_mcp.server import load_openapi_spec
+
+    parse = min(timeit.repeat(load_openapi_spec, number=20, repeat=5)) / 20
+    print(f'  {"spec parse":<20}{parse * 1000:>9.2f} ms  (codec={codec.NAME})')
+
+
+if __name__ == '__main__':
+    main()
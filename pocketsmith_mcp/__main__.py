@@ -1,4 +1,51 @@
-def main() -> None:
+import argparse
+from typing import List, Optional
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='pocketsmith-mcp', description='PocketSmith MCP server (stdio by default).'
+    )
+    parser.add_argument('--http', action='store_true', help='serve streamable HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--path', default='/mcp', help='MCP endpoint path')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    parser.add_argument(
+        '--stateless',
+        action='store_true',
+        help='no server-side MCP sessions (always on with more than one worker)',
+    )
+    parser.add_argument(
+        '--graceful-timeout',
+        type=int,
+        default=30,
+        help='seconds to let in-flight requests finish on shutdown',
+    )
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args(argv)
+    # Sessions live in one worker's memory; with several workers any request may land
+    # on any of them
+    args.stateless = args.stateless or args.workers > 1
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    if args.http:
+        from .service import run
+
+        run(
+            host=args.host,
+            port=args.port,
+            workers=max(1, args.workers),
+            path=args.path,
+            stateless=args.stateless,
+            graceful_timeout=args.graceful_timeout,
+            log_level=args.log_level,
+        )
+        return
+
     # Lazy-import to avoid pulling heavy deps during module import
     from .server import main as _main
 
@@ -0,0 +1,220 @@
+"""Server-side aggregates from PocketSmith's trend_analysis and budget_summary endpoints.
+
+Both endpoints return `BudgetAnalysisPackage`s: per category (trend_analysis) or for the
+whole budget (budget_summary), an expense and an income analysis split into periods
+with actual and forecast amounts. One such call can stand in for downloading every
+transaction in a long range, so the report tools ask `plan()` whether a request can be
+answered from it:
+
+- only month and category groupings are available (payees are not analysed);
+- the API widens the range to whole periods, so it must start on the 1st of a month
+  and end on a month's last day to match a transaction sum exactly;
+- in `auto` mode the range must also be long enough that downloading transactions
+  would cost more than the category/account lookups plus one aggregate call, and the
+  report must not need transaction counts, which the endpoints don't report.
+
+Uncategorised transactions are not part of any category's analysis; callers add them
+from a filtered transaction download. Categories set to roll up (`roll_up`) already
+include their subcategories, so `analysed_categories` leaves those out.
+"""
+
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .grouping import Group
+from .records import UNCATEGORISED
+
+PERIODS = ('weeks', 'months', 'years')
+SOURCES = ('auto', 'aggregate', 'transactions')
+# Groupings trend_analysis can answer
+GROUPABLE = ('month', 'category', 'category_id')
+# Period fields kept by `summarize`
+_PERIOD_FIELDS = (
+    'start_date',
+    'end_date',
+    'actual_amount',
+    'forecast_amount',
+    'refund_amount',
+    'over_by',
+    'under_by',
+    'percentage_used',
+)
+
+
+def whole_months(start_date: str, end_date: str) -> Optional[int]:
+    """Number of calendar months the range covers, or None if it isn't month-aligned."""
+    try:
+        start = date.fromisoformat(start_date[:10])
+        end = date.fromisoformat(end_date[:10])
+    except ValueError:
+        return None
+    if start.day != 1 or end.day != calendar.monthrange(end.year, end.month)[1]:
+        return None
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    return months if months > 0 else None
+
+
+def plan(
+    source: str,
+    start_date: str,
+    end_date: str,
+    by: Sequence[str],
+    min_months: int,
+    counts: bool = False,
+) -> bool:
+    """Whether to answer a grouping from trend_analysis instead of raw transactions.
+
+    source: 'auto' (use aggregates when exact and worthwhile), 'aggregate' (require
+    them) or 'transactions' (never). counts: the report shows transaction counts, so
+    auto keeps to transactions. Raises ValueError for an unknown source, or when
+    'aggregate' is asked for something the endpoint can't answer.
+    """
+    if source not in SOURCES:
+        raise ValueError(f'Unknown source {source!r}; choose from {list(SOURCES)}')
+    if source == 'transactions':
+        return False
+    months = whole_months(start_date, end_date)
+    unsupported = [key for key in by if key not in GROUPABLE]
+    if source == 'aggregate':
+        if unsupported:
+            raise ValueError(f'Aggregates cannot group by {unsupported}')
+        if months is None:
+            raise ValueError(
+                'Aggregates need a range from the 1st of a month to the last day of a month'
+            )
+        return True
+    if counts or unsupported or months is None:
+        return False
+    return months >= min_months
+
+
+def flatten_categories(tree: Iterable[dict]) -> List[dict]:
+    """Every category in a nested category tree, parents before their children."""
+    out: List[dict] = []
+    stack = list(reversed(list(tree or [])))
+    while stack:
+        category = stack.pop()
+        if not isinstance(category, dict):
+            continue
+        out.append(category)
+        stack.extend(reversed(category.get('children') or []))
+    return out
+
+
+def analysed_categories(tree: Iterable[dict]) -> Tuple[List[int], bool]:
+    """Category ids to analyse, without double counting, and whether any roll up.
+
+    A category with `roll_up` set is analysed with its subcategories included, so its
+    descendants are not requested separately.
+    """
+    ids: List[int] = []
+    rolled_up = False
+    stack = list(reversed(list(tree or [])))
+    while stack:
+        category = stack.pop()
+        if not isinstance(category, dict) or not isinstance(category.get('id'), int):
+            continue
+        ids.append(category['id'])
+        children = category.get('children') or []
+        if category.get('roll_up') and children:
+            rolled_up = True
+            continue
+        stack.extend(reversed(children))
+    return ids, rolled_up
+
+
+def account_currency(accounts: Iterable[dict]) -> Optional[str]:
+    """The currency every account shares (lower case), or None when they differ."""
+    codes = {str(a.get('currency_code') or '').lower() for a in accounts or []}
+    return codes.pop() if len(codes) == 1 and '' not in codes else None
+
+
+def currencies(packages: Iterable[dict]) -> Set[str]:
+    """Currencies (lower case) the packages' analyses are expressed in."""
+    codes = set()
+    for package in packages or []:
+        for side in ('expense', 'income'):
+            code = (package.get(side) or {}).get('currency_code')
+            if code:
+                codes.add(str(code).lower())
+    return codes
+
+
+def merge(*group_lists: Iterable[Group]) -> List[Group]:
+    """Sum groups with equal labels; a count is None if any merged count is None."""
+    merged: Dict[Tuple[Any, ...], List[Any]] = {}
+    for groups_ in group_lists:
+        for key, total, count in groups_:
+            cell = merged.setdefault(key, [0.0, 0])
+            cell[0] += total
+            cell[1] = None if count is None or cell[1] is None else cell[1] + count
+    return [(key, total, count) for key, (total, count) in merged.items()]
+
+
+def scenario_ids(accounts: Iterable[dict]) -> List[int]:
+    """Ids of every scenario of the given accounts, primary scenarios included."""
+    ids: Dict[int, None] = {}
+    for account in accounts or []:
+        scenarios = [account.get('primary_scenario')] + list(account.get('scenarios') or [])
+        for scenario in scenarios:
+            if isinstance(scenario, dict) and isinstance(scenario.get('id'), int):
+                ids.setdefault(scenario['id'], None)
+    return list(ids)
+
+
+def groups(packages: Iterable[dict], by: Sequence[str]) -> List[Group]:
+    """Net actual amounts (expense plus income) of monthly packages, grouped by `by`.
+
+    Groups that sum to zero are dropped, like months without transactions in a
+    transaction sum. Counts are None: the endpoints don't report them.
+    """
+    totals: Dict[tuple, float] = {}
+    for package in packages or []:
+        category = package.get('category') or {}
+        title = category.get('title') or UNCATEGORISED
+        for side in ('expense', 'income'):
+            analysis = package.get(side) or {}
+            for period in analysis.get('periods') or []:
+                amount = period.get('actual_amount')
+                if not amount:
+                    continue
+                labels = {
+                    'month': str(period.get('start_date', ''))[:7],
+                    'category': title,
+                    'category_id': category.get('id'),
+                }
+                key = tuple(labels[k] for k in by)
+                totals[key] = totals.get(key, 0.0) + float(amount)
+    return [(key, total, None) for key, total in totals.items() if total]  # type: ignore[misc]
+
+
+def _analysis(analysis: Optional[dict]) -> Optional[Dict[str, Any]]:
+    if not analysis:
+        return None
+    out = {k: v for k, v in analysis.items() if k != 'periods'}
+    out['periods'] = [
+        {k: period.get(k) for k in _PERIOD_FIELDS} for period in analysis.get('periods') or []
+    ]
+    return out
+
+
+def summarize(packages: Iterable[dict]) -> List[Dict[str, Any]]:
+    """Packages with the embedded category reduced to its id and title.
+
+    Each keeps `is_transfer` and its expense and income analyses: totals plus
+    per-period actual, forecast, refund and over/under amounts.
+    """
+    out = []
+    for package in packages or []:
+        category = package.get('category') or {}
+        out.append(
+            {
+                'category_id': category.get('id'),
+                'category': category.get('title'),
+                'is_transfer': package.get('is_transfer'),
+                'expense': _analysis(package.get('expense')),
+                'income': _analysis(package.get('income')),
+            }
+        )
+    return out
@@ -0,0 +1,105 @@
+"""Selection of the OpenAPI operations that are compiled into autotools.
+
+`FastMCP.from_openapi` turns every operation in the spec into a tool. `OperationFilter`
+prunes the spec first, by tag, path glob and HTTP method, so unwanted operations cost
+neither startup time nor space in the `list_tools` payload. Write operations are
+dropped unless the server runs in write mode.
+"""
+
+import fnmatch
+from typing import Iterable, Sequence, Tuple
+
+from .config import ServerConfig
+
+HTTP_METHODS = ('get', 'put', 'post', 'delete', 'patch', 'head', 'options', 'trace')
+# Methods that never change data on the PocketSmith side
+READ_METHODS = ('get', 'head', 'options')
+
+
+def _lower(values: Iterable[str]) -> Tuple[str, ...]:
+    return tuple(v.strip().lower() for v in values if v.strip())
+
+
+class OperationFilter:
+    """Allow/deny rules over an operation's tags, path and HTTP method.
+
+    An operation is kept when it matches every non-empty allowlist (tags, paths,
+    methods) and no denylist. Tags and methods compare case-insensitively. Paths are
+    shell-style globs over the spec's path templates, where `*` also spans `/`: for
+    example `/users/*/transactions` or `/attachments*`. With read_only set, only
+    GET/HEAD/OPTIONS operations are ever kept.
+    """
+
+    def __init__(
+        self,
+        tags: Sequence[str] = (),
+        exclude_tags: Sequence[str] = (),
+        paths: Sequence[str] = (),
+        exclude_paths: Sequence[str] = (),
+        methods: Sequence[str] = (),
+        read_only: bool = False,
+    ):
+        self.tags = _lower(tags)
+        self.exclude_tags = _lower(exclude_tags)
+        self.paths = tuple(paths)
+        self.exclude_paths = tuple(exclude_paths)
+        self.methods = _lower(methods)
+        self.read_only = read_only
+
+    @classmethod
+    def from_config(cls, config: ServerConfig) -> 'OperationFilter':
+        return cls(
+            tags=config.autotool_tags,
+            exclude_tags=config.autotool_exclude_tags,
+            paths=config.autotool_paths,
+            exclude_paths=config.autotool_exclude_paths,
+            methods=config.autotool_methods,
+            read_only=not config.write_mode,
+        )
+
+    def allows(self, method: str, path: str, tags: Iterable[str] = ()) -> bool:
+        method = method.lower()
+        if self.read_only and method not in READ_METHODS:
+            return False
+        if self.methods and method not in self.methods:
+            return False
+        op_tags = set(_lower(tags))
+        if self.tags and not op_tags.intersection(self.tags):
+            return False
+        if op_tags.intersection(self.exclude_tags):
+            return False
+        if self.paths and not any(fnmatch.fnmatchcase(path, p) for p in self.paths):
+            return False
+        return not any(fnmatch.fnmatchcase(path, p) for p in self.exclude_paths)
+
+    def apply(self, spec: dict) -> dict:
+        """Return a copy of `spec` holding only the allowed operations.
+
+        Paths left without operations are dropped; everything else (components,
+        servers, path-level parameters) is shared with the original, which is not
+        modified.
+        """
+        paths = {}
+        for path, item in (spec.get('paths') or {}).items():
+            if not isinstance(item, dict):
+                continue
+            kept = {
+                key: value
+                for key, value in item.items()
+                if key not in HTTP_METHODS
+                or self.allows(key, path, (value or {}).get('tags') or ())
+            }
+            if any(key in HTTP_METHODS for key in kept):
+                paths[path] = kept
+        return {**spec, 'paths': paths}
+
+
+def count_operations(spec: dict) -> int:
+    """Number of operations (path + method pairs) in an OpenAPI spec."""
+    return sum(
+        1
+        for item in (spec.get('paths') or {}).values()
+        if isinstance(item, dict)
+        for key in item
+        if key in HTTP_METHODS
+    )
@@ -0,0 +1,381 @@
+"""Pluggable byte stores behind the server's caches.
+
+A backend maps string keys to byte values with an optional TTL. The HTTP, reference
+data and transaction segment caches keep parsed values in their own in-process tier
+and use a backend as a second tier that other processes can see:
+
+- `MemoryBackend`: in-process LRU; nothing is shared.
+- `SqliteBackend`: one SQLite file in WAL mode, shared by every process on the host.
+  SQLite's file locks serialise writers; readers never block.
+- `RedisBackend`: any server speaking the Redis protocol (RESP2), shared across hosts.
+
+Callers namespace keys per credential, so tenants never read each other's entries.
+Backends never raise for cache faults: a failed lookup is a miss and a failed write is
+dropped, both counted in `stats()['errors']`.
+"""
+
+import abc
+import asyncio
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+
+class CacheBackend(abc.ABC):
+    """Interface of a shared byte store; subclasses implement get, set and delete_prefix."""
+
+    name = 'base'
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """The stored value, or None when it is missing or expired."""
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store `value`; it expires after `ttl` seconds, or never when ttl is None."""
+
+    async def touch(self, key: str) -> None:
+        """Mark `key` as recently used (backends without LRU trimming ignore this)."""
+        return None
+
+    @abc.abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        """Drop every key starting with `prefix`."""
+
+    def close(self) -> None:
+        """Release connections and files (nothing by default)."""
+        return None
+
+    def entries(self) -> Optional[int]:
+        """Number of stored keys, or None when counting is not cheap."""
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': self.name,
+            'entries': self.entries(),
+            'hits': self.hits,
+            'misses': self.misses,
+            'sets': self.sets,
+            'errors': self.errors,
+        }
+
+    def _counted(self, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+
+class MemoryBackend(CacheBackend):
+    """Bounded in-process LRU with per-key expiry."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries: int = 1024, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.max_entries = max_entries
+        self._clock = clock
+        self._data: 'OrderedDict[str, Tuple[Optional[float], bytes]]' = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] is not None and self._clock() >= entry[0]:
+            del self._data[key]
+            entry = None
+        if entry is not None:
+            self._data.move_to_end(key)
+        return self._counted(entry[1] if entry is not None else None)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.sets += 1
+        self._data[key] = (None if ttl is None else self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def touch(self, key: str) -> None:
+        if key in self._data:
+            self._data.move_to_end(key)
+
+    async def delete_prefix(self, prefix: str) -> None:
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def entries(self) -> Optional[int]:
+        return len(self._data)
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_cache_used ON cache (used_at);
+"""
+
+
+class SqliteBackend(CacheBackend):
+    """SQLite file shared by the processes on one host.
+
+    WAL mode lets readers run alongside the single writer, and `busy_timeout` makes a
+    writer wait for another process's lock instead of failing. max_entries bounds the
+    file, trimming the rows least recently stored or touched. Queries run on one
+    dedicated thread, so waiting for a lock never blocks the event loop.
+    """
+
+    name = 'sqlite'
+
+    def __init__(
+        self,
+        path: Path,
+        max_entries: int = 4096,
+        busy_timeout: float = 5.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self._clock = clock
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            str(path), timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(_SQLITE_SCHEMA)
+        self._writes = 0
+        # Refreshed on the query thread after each write, so stats() never queries
+        self._count: Optional[int] = self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        # One thread: the connection is never used concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache-sqlite')
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _write(self, *statements: Tuple[str, tuple]) -> None:
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes never both
+        # read and then fail to upgrade
+        try:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, params in statements:
+                    self._db.execute(sql, params)
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._count = self._db.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _read(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        try:
+            return self._db.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            self.errors += 1
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        row = await self._run(self._read, key)
+        if row is not None and row[1] is not None and self._clock() >= row[1]:
+            row = None
+        return self._counted(row[0] if row is not None else None)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.sets += 1
+        now = self._clock()
+        statements: List[Tuple[str, tuple]] = [
+            (
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, used_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, value, None if ttl is None else now + ttl, now),
+            )
+        ]
+        self._writes += 1
+        if self._writes % 64 == 0 or self.max_entries < 64:
+            statements.append(('DELETE FROM cache WHERE expires_at <= ?', (now,)))
+            statements.append(
+                (
+                    'DELETE FROM cache WHERE key NOT IN '
+                    '(SELECT key FROM cache ORDER BY used_at DESC LIMIT ?)',
+                    (self.max_entries,),
+                )
+            )
+        await self._run(self._write, *statements)
+
+    async def touch(self, key: str) -> None:
+        await self._run(
+            self._write, ('UPDATE cache SET used_at = ? WHERE key = ?', (self._clock(), key))
+        )
+
+    async def delete_prefix(self, prefix: str) -> None:
+        await self._run(
+            self._write,
+            ('DELETE FROM cache WHERE substr(key, 1, ?) = ?', (len(prefix), prefix)),
+        )
+
+    def close(self) -> None:
+        """Close the file after queries already queued, without waiting for them."""
+        self._executor.submit(self._db.close)
+        self._executor.shutdown(wait=False)
+
+    def entries(self) -> Optional[int]:
+        """Rows in the file as of this backend's last write."""
+        return self._count
+
+
+class RedisError(Exception):
+    pass
+
+
+RespValue = Union[None, int, bytes, List[Any]]
+
+
+class RedisBackend(CacheBackend):
+    """Minimal Redis-protocol (RESP2) client over one asyncio connection.
+
+    Only GET, SET with PX, DEL and SCAN are used, so any server speaking the protocol
+    works. Commands are serialised on the connection; a broken connection is dropped and
+    reopened on the next command. url: redis://[:password@]host[:port][/db]
+    (rediss:// for TLS).
+    """
+
+    name = 'redis'
+
+    def __init__(self, url: str = 'redis://127.0.0.1:6379/0', timeout: float = 2.0):
+        super().__init__()
+        parts = urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.strip('/') or 0)
+        self.tls = parts.scheme == 'rediss'
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(
+            self.host, self.port, ssl=self.tls or None
+        )
+        if self.password:
+            await self._roundtrip(b'AUTH', self.password.encode())
+        if self.db:
+            await self._roundtrip(b'SELECT', str(self.db).encode())
+
+    async def _roundtrip(self, *args: bytes) -> RespValue:
+        assert self._writer is not None and self._reader is not None
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self._writer.write(b''.join(out))
+        await self._writer.drain()
+        return await self._read()
+
+    async def _read(self) -> RespValue:
+        assert self._reader is not None
+        line = await self._reader.readuntil(b'\r\n')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest
+        if kind == b'-':
+            raise RedisError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            size = int(rest)
+            if size < 0:
+                return None
+            return (await self._reader.readexactly(size + 2))[:-2]
+        if kind == b'*':
+            size = int(rest)
+            return None if size < 0 else [await self._read() for _ in range(size)]
+        # Out of step with the server: dropped like a broken connection
+        raise ConnectionError(f'unexpected reply {line!r}')
+
+    async def command(self, *args: Union[str, bytes]) -> RespValue:
+        """Send one command and return its reply; raises on connection or server errors."""
+        encoded = [a.encode() if isinstance(a, str) else a for a in args]
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await asyncio.wait_for(self._connect(), self.timeout)
+                return await asyncio.wait_for(self._roundtrip(*encoded), self.timeout)
+            except RedisError:
+                # The error reply was read in full; the connection is still in step
+                raise
+            except BaseException:
+                # Broken, timed out or cancelled mid-roundtrip: a reply may still be
+                # unread, and the next command would read it as its own
+                self.close()
+                raise
+
+    async def _safe(self, *args: Union[str, bytes]) -> RespValue:
+        try:
+            return await self.command(*args)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, RedisError):
+            self.errors += 1
+            return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self._safe('GET', key)
+        return self._counted(value if isinstance(value, bytes) else None)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.sets += 1
+        if ttl is None:
+            await self._safe('SET', key, value)
+        else:
+            await self._safe('SET', key, value, 'PX', str(max(1, int(ttl * 1000))))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        pattern = ''.join('\\' + c if c in '*?[]\\' else c for c in prefix) + '*'
+        cursor = b'0'
+        while True:
+            reply = await self._safe('SCAN', cursor, 'MATCH', pattern, 'COUNT', '500')
+            if not isinstance(reply, list) or len(reply) != 2:
+                return
+            cursor, keys = reply
+            if keys:
+                await self._safe('DEL', *keys)
+            if cursor == b'0':
+                return
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+def open_backend(spec: str, cache_dir: Path) -> CacheBackend:
+    """Backend for a POCKETSMITH_CACHE_BACKEND value.
+
+    `memory`, `sqlite` (shared.sqlite3 under cache_dir), `sqlite:///path/to/file`, or a
+    `redis://` / `rediss://` URL. Raises ValueError for anything else.
+    """
+    if spec in ('', 'memory'):
+        return MemoryBackend()
+    if spec == 'sqlite':
+        return SqliteBackend(cache_dir / 'shared.sqlite3')
+    if spec.startswith('sqlite://'):
+        return SqliteBackend(Path(spec[len('sqlite://') :]).expanduser())
+    if spec.startswith(('redis://', 'rediss://')):
+        return RedisBackend(spec)
+    raise ValueError(f'Unknown cache backend: {spec!r}')
@@ -0,0 +1,89 @@
+"""Category hierarchy index for subtree and depth rollups.
+
+PocketSmith categories form a tree (`parent_id`, nested `children`), but transactions
+only name their own, usually leaf, category. `CategoryIndex` flattens a user's tree
+once into an id -> ancestor-path table, so the report tools can fold per-category
+totals into a parent's subtree or up to a given depth. The totals come from one pass
+over one transaction fetch, not one fetch per child category.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .grouping import Group
+
+
+class CategoryIndex:
+    """Ancestor paths, titles and subtrees of one user's categories.
+
+    paths[id] runs from the top-level category down to `id` itself. Built from the
+    nested tree that /users/{id}/categories returns; a category's `parent_id` wins
+    over the nesting it was found in.
+    """
+
+    def __init__(self, tree: Iterable[dict]):
+        self.titles: Dict[int, str] = {}
+        parents: Dict[int, Optional[int]] = {}
+        stack: List[Tuple[dict, Optional[int]]] = [(c, None) for c in tree or []]
+        while stack:
+            category, nested_in = stack.pop()
+            if not isinstance(category, dict) or not isinstance(category.get('id'), int):
+                continue
+            cid = category['id']
+            parent = category.get('parent_id')
+            parents[cid] = parent if isinstance(parent, int) else nested_in
+            self.titles[cid] = category.get('title') or str(cid)
+            stack.extend((child, cid) for child in category.get('children') or [])
+        self.paths: Dict[int, Tuple[int, ...]] = {}
+        for cid in parents:
+            path = [cid]
+            parent = parents.get(cid)
+            # Unknown parents end the path; a cycle in bad data stops at the repeat
+            while parent is not None and parent in parents and parent not in path:
+                path.append(parent)
+                parent = parents[parent]
+            self.paths[cid] = tuple(reversed(path))
+        self._subtrees: Dict[int, Set[int]] = {}
+
+    def subtree(self, category_id: int) -> Set[int]:
+        """The category and all of its descendants (just the id when it is unknown)."""
+        ids = self._subtrees.get(category_id)
+        if ids is None:
+            ids = {cid for cid, path in self.paths.items() if category_id in path}
+            self._subtrees[category_id] = ids or {category_id}
+        return self._subtrees[category_id]
+
+    def ancestor(self, category_id: Optional[int], depth: int) -> Optional[int]:
+        """The category's ancestor at `depth` (1 = top level), or itself if shallower."""
+        path = self.paths.get(category_id)  # type: ignore[arg-type]
+        if not path:
+            return category_id
+        return path[min(depth, len(path)) - 1]
+
+    def roll_up(
+        self, groups: Iterable[Group], depth: int, id_at: int = 0, title_at: int = 1
+    ) -> List[Group]:
+        """Fold groups keyed by (..., category_id, category title, ...) up to `depth`.
+
+        The id and title labels become the ancestor's title; categories the index
+        doesn't know keep their own title. Counts stay None if any input count is None
+        (server-side aggregates don't report counts).
+        """
+        if depth < 1:
+            raise ValueError('rollup_depth must be at least 1')
+        merged: Dict[Tuple[Any, ...], List[Any]] = {}
+        for labels, total, count in groups:
+            cid = labels[id_at]
+            top = self.ancestor(cid, depth)
+            title = self.titles.get(top, labels[title_at])  # type: ignore[arg-type]
+            key = tuple(
+                title if i == title_at else label for i, label in enumerate(labels) if i != id_at
+            )
+            cell = merged.setdefault(key, [0.0, 0])
+            cell[0] += total
+            cell[1] = None if count is None or cell[1] is None else cell[1] + count
+        return [(key, total, count) for key, (total, count) in merged.items()]
+
+    def within(self, groups: Iterable[Group], category_id: int, id_at: int = 0) -> List[Group]:
+        """The groups whose category_id label lies in `category_id`'s subtree."""
+        ids = self.subtree(category_id)
+        return [g for g in groups if g[0][id_at] in ids]
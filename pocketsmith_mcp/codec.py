@@ -0,0 +1,64 @@
+"""JSON codec used for upstream bodies, tool results and the OpenAPI spec.
+
+Uses orjson when installed (the `fast` extra), then msgspec, and otherwise falls back
+to the stdlib `json` module. Every backend decodes from bytes or str and encodes to
+str, so callers don't care which one is active. Set POCKETSMITH_JSON_CODEC to `json`,
+`orjson` or `msgspec` to pin a backend (unavailable choices fall back to `json`).
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict, Tuple, Union
+
+Decoder = Callable[[Union[bytes, str]], Any]
+Encoder = Callable[[Any], str]
+
+
+def _stdlib() -> Tuple[Decoder, Encoder]:
+    def dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str)
+
+    return json.loads, dumps
+
+
+def _orjson() -> Tuple[Decoder, Encoder]:
+    import orjson
+
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, default=str).decode('utf-8')
+
+    return orjson.loads, dumps
+
+
+def _msgspec() -> Tuple[Decoder, Encoder]:
+    import msgspec
+
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder(enc_hook=str)
+
+    def dumps(obj: Any) -> str:
+        return encoder.encode(obj).decode('utf-8')
+
+    return decoder.decode, dumps
+
+
+BACKENDS: Dict[str, Callable[[], Tuple[Decoder, Encoder]]] = {
+    'orjson': _orjson,
+    'msgspec': _msgspec,
+    'json': _stdlib,
+}
+
+
+def select(preferred: str = '') -> Tuple[str, Decoder, Encoder]:
+    """Return (name, loads, dumps) for `preferred`, or the fastest installed backend."""
+    order = [preferred] if preferred in BACKENDS else list(BACKENDS)
+    for name in order:
+        try:
+            loads_, dumps_ = BACKENDS[name]()
+        except ImportError:
+            continue
+        return name, loads_, dumps_
+    return ('json', *_stdlib())
+
+
+NAME, loads, dumps = select(os.getenv('POCKETSMITH_JSON_CODEC', '').lower())
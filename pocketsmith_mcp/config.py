@@ -0,0 +1,197 @@
+"""Settings for one PocketSmith MCP server instance.
+
+`ServerConfig.from_env()` reads the POCKETSMITH_* environment variables (after loading
+a `.env` file); constructing `ServerConfig(...)` directly touches nothing, so several
+servers with different credentials and tuning can be built in one process.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    """Read a boolean flag (1/true/yes/on) from the environment."""
+    raw = os.getenv(name)
+    if raw is None or raw == '':
+        return default
+    return raw.lower() in {'1', 'true', 'yes', 'on'}
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    """Read an integer >= minimum from the environment, falling back to default."""
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        return default
+    return value if value >= minimum else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a positive number of seconds from the environment, falling back to default."""
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        return default
+    return value if value > 0 else default
+
+
+def _env_list(name: str) -> Tuple[str, ...]:
+    """Read a comma-separated list from the environment, dropping blank items."""
+    return tuple(item.strip() for item in os.getenv(name, '').split(',') if item.strip())
+
+
+def auth_headers(access_token: Optional[str], developer_key: Optional[str]) -> Dict[str, str]:
+    """Request headers for the given credentials; the access token wins if both are set."""
+    headers: Dict[str, str] = {}
+    if access_token:
+        headers['Authorization'] = f'Bearer {access_token}'
+    elif developer_key:
+        headers['X-Developer-Key'] = developer_key
+    # API recommends JSON
+    headers.setdefault('Accept', 'application/json')
+    headers.setdefault('Content-Type', 'application/json')
+    return headers
+
+
+def default_cache_dir() -> Path:
+    """Directory for on-disk caches: POCKETSMITH_CACHE_DIR or the XDG cache dir."""
+    configured = os.getenv('POCKETSMITH_CACHE_DIR')
+    if configured:
+        return Path(configured).expanduser()
+    base = os.getenv('XDG_CACHE_HOME') or str(Path.home() / '.cache')
+    return Path(base) / 'pocketsmith-mcp'
+
+
+@dataclass
+class ServerConfig:
+    """Credentials, API location, feature switches and tuning for one server."""
+
+    access_token: Optional[str] = None
+    developer_key: Optional[str] = None
+    # None: the bundled spec's server URL
+    base_url: Optional[str] = None
+    write_mode: bool = False
+    include_autotools: bool = False
+    # Credentials come with each request; one client and cache set per tenant
+    multi_tenant: bool = False
+    max_tenants: int = 32
+    # Autotool selection (see autotools.OperationFilter); empty allowlists allow all
+    autotool_tags: Tuple[str, ...] = ()
+    autotool_exclude_tags: Tuple[str, ...] = ()
+    autotool_paths: Tuple[str, ...] = ()
+    autotool_exclude_paths: Tuple[str, ...] = ()
+    autotool_methods: Tuple[str, ...] = ()
+    # Upstream connection pool; HTTP/2 needs the `http2` extra (h2)
+    http2: bool = False
+    max_connections: int = 20
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 10.0
+    # Connections opened when a server starts; 0 disables the warm-up
+    warmup_connections: int = 1
+    page_concurrency: int = 4
+    shard_months: int = 3
+    shard_concurrency: int = 4
+    http_cache: bool = True
+    http_cache_size: int = 256
+    http_cache_disk: bool = False
+    segment_cache: bool = True
+    segment_ttl: int = 300
+    segment_settled_ttl: int = 86400
+    segment_settle_days: int = 60
+    segment_cache_size: int = 512
+    segment_cache_rows: int = 100_000
+    refdata_cache: bool = True
+    refdata_ttl: int = 300
+    refdata_cache_size: int = 256
+    mirror: bool = False
+    mirror_max_age: int = 300
+    mirror_full_resync: int = 86400
+    # Report tools may answer long month-aligned ranges from trend_analysis
+    aggregates: bool = True
+    aggregate_min_months: int = 6
+    # Large list results: rows per tool result, snapshots kept for next_page, TTL, and
+    # rows held across a worker's snapshots
+    result_page_size: int = 100
+    result_snapshots: int = 32
+    result_ttl: int = 900
+    result_max_rows: int = 50_000
+    # None: default_cache_dir()
+    cache_dir: Optional[Path] = None
+    # Second cache tier: memory (worker-local only), sqlite, sqlite:///path or redis://...
+    cache_backend: str = 'memory'
+
+    @classmethod
+    def from_env(cls, dotenv: bool = True) -> 'ServerConfig':
+        """Build a config from POCKETSMITH_* variables, loading `.env` first by default."""
+        if dotenv:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+        return cls(
+            access_token=os.getenv('POCKETSMITH_ACCESS_TOKEN') or None,
+            developer_key=os.getenv('POCKETSMITH_DEVELOPER_KEY') or None,
+            base_url=os.getenv('POCKETSMITH_BASE_URL') or None,
+            write_mode=env_flag('POCKETSMITH_WRITE_MODE'),
+            include_autotools=env_flag('POCKETSMITH_INCLUDE_AUTOTOOLS'),
+            multi_tenant=env_flag('POCKETSMITH_MULTI_TENANT'),
+            max_tenants=_env_int('POCKETSMITH_MAX_TENANTS', 32),
+            autotool_tags=_env_list('POCKETSMITH_AUTOTOOL_TAGS'),
+            autotool_exclude_tags=_env_list('POCKETSMITH_AUTOTOOL_EXCLUDE_TAGS'),
+            autotool_paths=_env_list('POCKETSMITH_AUTOTOOL_PATHS'),
+            autotool_exclude_paths=_env_list('POCKETSMITH_AUTOTOOL_EXCLUDE_PATHS'),
+            autotool_methods=_env_list('POCKETSMITH_AUTOTOOL_METHODS'),
+            http2=env_flag('POCKETSMITH_HTTP2'),
+            max_connections=_env_int('POCKETSMITH_MAX_CONNECTIONS', 20),
+            max_keepalive_connections=_env_int('POCKETSMITH_MAX_KEEPALIVE', 20),
+            keepalive_expiry=_env_float('POCKETSMITH_KEEPALIVE_EXPIRY', 30.0),
+            connect_timeout=_env_float('POCKETSMITH_CONNECT_TIMEOUT', 5.0),
+            read_timeout=_env_float('POCKETSMITH_READ_TIMEOUT', 30.0),
+            write_timeout=_env_float('POCKETSMITH_WRITE_TIMEOUT', 10.0),
+            pool_timeout=_env_float('POCKETSMITH_POOL_TIMEOUT', 10.0),
+            warmup_connections=_env_int('POCKETSMITH_WARMUP_CONNECTIONS', 1, minimum=0),
+            page_concurrency=_env_int('POCKETSMITH_PAGE_CONCURRENCY', 4),
+            shard_months=_env_int('POCKETSMITH_SHARD_MONTHS', 3),
+            shard_concurrency=_env_int('POCKETSMITH_SHARD_CONCURRENCY', 4),
+            http_cache=env_flag('POCKETSMITH_HTTP_CACHE', default=True),
+            http_cache_size=_env_int('POCKETSMITH_HTTP_CACHE_SIZE', 256),
+            http_cache_disk=env_flag('POCKETSMITH_HTTP_CACHE_DISK'),
+            segment_cache=env_flag('POCKETSMITH_SEGMENT_CACHE', default=True),
+            segment_ttl=_env_int('POCKETSMITH_SEGMENT_TTL', 300),
+            segment_settled_ttl=_env_int('POCKETSMITH_SEGMENT_SETTLED_TTL', 86400),
+            segment_settle_days=_env_int('POCKETSMITH_SEGMENT_SETTLE_DAYS', 60),
+            segment_cache_size=_env_int('POCKETSMITH_SEGMENT_CACHE_SIZE', 512),
+            segment_cache_rows=_env_int('POCKETSMITH_SEGMENT_CACHE_ROWS', 100_000),
+            refdata_cache=env_flag('POCKETSMITH_REFDATA_CACHE', default=True),
+            refdata_ttl=_env_int('POCKETSMITH_REFDATA_TTL', 300),
+            refdata_cache_size=_env_int('POCKETSMITH_REFDATA_CACHE_SIZE', 256),
+            mirror=env_flag('POCKETSMITH_MIRROR'),
+            mirror_max_age=_env_int('POCKETSMITH_MIRROR_MAX_AGE', 300),
+            mirror_full_resync=_env_int('POCKETSMITH_MIRROR_FULL_RESYNC', 86400),
+            aggregates=env_flag('POCKETSMITH_AGGREGATES', default=True),
+            aggregate_min_months=_env_int('POCKETSMITH_AGGREGATE_MIN_MONTHS', 6),
+            result_page_size=_env_int('POCKETSMITH_RESULT_PAGE_SIZE', 100),
+            result_snapshots=_env_int('POCKETSMITH_RESULT_SNAPSHOTS', 32),
+            result_ttl=_env_int('POCKETSMITH_RESULT_TTL', 900),
+            result_max_rows=_env_int('POCKETSMITH_RESULT_MAX_ROWS', 50_000),
+            cache_dir=default_cache_dir(),
+            cache_backend=os.getenv('POCKETSMITH_CACHE_BACKEND', '').strip() or 'memory',
+        )
+
+    @property
+    def authenticated(self) -> bool:
+        return bool(self.access_token or self.developer_key)
+
+    def headers(self) -> Dict[str, str]:
+        return auth_headers(self.access_token, self.developer_key)
@@ -0,0 +1,185 @@
+"""Server-side snapshots of large tool results, handed out a page at a time.
+
+A list tool fetches its full result once, keeps it as a snapshot and returns the first
+page plus an opaque cursor; `next_page(cursor)` reads further pages from the snapshot
+without going upstream again. Snapshots live in a bounded LRU and expire after a TTL
+(refreshed on every read), so an abandoned listing costs memory only briefly.
+
+With a shared cache backend, snapshots are also stored there under the server's
+credential namespace, so a cursor opened on one worker can be continued on another.
+"""
+
+import base64
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import codec
+from .cachestore import CacheBackend
+from .projection import columns_of, to_columns
+
+# Upper bound for a caller-chosen page size
+MAX_PAGE_SIZE = 1000
+
+
+class CursorError(ValueError):
+    """The cursor is malformed, unknown or its snapshot has expired."""
+
+
+def _encode(snapshot_id: str, offset: int) -> str:
+    return base64.urlsafe_b64encode(f'{snapshot_id}:{offset}'.encode()).decode().rstrip('=')
+
+
+def _decode(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        snapshot_id, offset = raw.rsplit(':', 1)
+        return snapshot_id, int(offset)
+    except ValueError as exc:
+        raise CursorError('Malformed cursor') from exc
+
+
+# One snapshot: (expires, stored in the backend at, page size, rows, columns when columnar)
+_Snapshot = Tuple[float, float, int, List[Any], Optional[List[str]]]
+
+
+class ResultStore:
+    """LRU of result snapshots with a sliding TTL, paged through cursors.
+
+    page_size: default rows per page. A snapshot keeps the size it was opened with;
+    `next_page` may ask for another size for that one page. Snapshots opened with
+    `columnar=True` page out as { columns, rows } with one header for every page.
+    The local tier holds at most `max_snapshots` snapshots and `max_rows` rows (the
+    newest snapshot is always kept). `backend` adds a shared tier under `namespace`,
+    where a snapshot's TTL is renewed once half of it has passed.
+    """
+
+    def __init__(
+        self,
+        page_size: int = 100,
+        max_snapshots: int = 32,
+        ttl: float = 900.0,
+        max_rows: int = 50_000,
+        clock: Callable[[], float] = time.time,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = 'results',
+    ):
+        self.page_size = page_size
+        self.max_snapshots = max_snapshots
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.backend = backend
+        self.namespace = namespace
+        self._clock = clock
+        self._snapshots: 'OrderedDict[str, _Snapshot]' = OrderedDict()
+        self._rows = 0
+        self.opened = 0
+        self.expired = 0
+        self.shared_hits = 0
+
+    def _size(self, page_size: Optional[int], default: int) -> int:
+        return max(1, min(page_size or default, MAX_PAGE_SIZE))
+
+    def _keep(self, snapshot_id: str, snapshot: _Snapshot) -> None:
+        old = self._snapshots.pop(snapshot_id, None)
+        if old is not None:
+            self._rows -= len(old[3])
+        self._snapshots[snapshot_id] = snapshot
+        self._rows += len(snapshot[3])
+        while len(self._snapshots) > 1 and (
+            len(self._snapshots) > self.max_snapshots or self._rows > self.max_rows
+        ):
+            _, evicted = self._snapshots.popitem(last=False)
+            self._rows -= len(evicted[3])
+
+    def _drop(self, snapshot_id: str) -> None:
+        snapshot = self._snapshots.pop(snapshot_id, None)
+        if snapshot is not None:
+            self._rows -= len(snapshot[3])
+
+    async def _share(self, snapshot_id: str, snapshot: _Snapshot) -> None:
+        assert self.backend is not None
+        _, stored_at, size, rows, columns = snapshot
+        await self.backend.set(
+            f'{self.namespace}:{snapshot_id}',
+            codec.dumps([stored_at, size, columns, rows]).encode('utf-8'),
+            ttl=self.ttl,
+        )
+
+    async def _shared(self, snapshot_id: str) -> Optional[_Snapshot]:
+        assert self.backend is not None
+        raw = await self.backend.get(f'{self.namespace}:{snapshot_id}')
+        if raw is None:
+            return None
+        stored_at, size, columns, rows = codec.loads(raw)
+        self.shared_hits += 1
+        return (self._clock() + self.ttl, stored_at, size, rows, columns)
+
+    async def first_page(
+        self, rows: List[Any], page_size: Optional[int] = None, columnar: bool = False
+    ) -> Dict[str, Any]:
+        """First page of `rows`; the rest is kept as a snapshot only if there is a rest."""
+        size = self._size(page_size, self.page_size)
+        columns = columns_of(rows) if columnar else None
+        if len(rows) <= size:
+            return self._page(rows, 0, size, None, columns)
+        snapshot_id = secrets.token_urlsafe(12)
+        now = self._clock()
+        snapshot = (now + self.ttl, now, size, rows, columns)
+        self._keep(snapshot_id, snapshot)
+        self.opened += 1
+        if self.backend is not None:
+            await self._share(snapshot_id, snapshot)
+        return self._page(rows, 0, size, snapshot_id, columns)
+
+    async def next_page(self, cursor: str, page_size: Optional[int] = None) -> Dict[str, Any]:
+        """The page a cursor points at. Raises CursorError if it is unknown or expired."""
+        snapshot_id, offset = _decode(cursor)
+        now = self._clock()
+        entry = self._snapshots.get(snapshot_id)
+        if entry is not None and now >= entry[0]:
+            self._drop(snapshot_id)
+            self.expired += 1
+            entry = None
+        if entry is None and self.backend is not None:
+            entry = await self._shared(snapshot_id)
+        if entry is None:
+            raise CursorError('Cursor expired or unknown; run the original tool again')
+        _, stored_at, default, rows, columns = entry
+        size = self._size(page_size, default)
+        if offset < 0 or offset > len(rows):
+            raise CursorError('Cursor offset is out of range')
+        if self.backend is not None and now - stored_at >= self.ttl / 2:
+            stored_at = now
+            await self._share(snapshot_id, (now + self.ttl, now, default, rows, columns))
+        self._keep(snapshot_id, (now + self.ttl, stored_at, default, rows, columns))
+        # Kept until it expires even after the last page, so a retried call still works
+        return self._page(rows, offset, size, snapshot_id, columns)
+
+    @staticmethod
+    def _page(
+        rows: List[Any],
+        offset: int,
+        size: int,
+        snapshot_id: Optional[str],
+        columns: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        end = offset + size
+        page = rows[offset:end]
+        body = to_columns(page, columns) if columns is not None else {'items': page}
+        return {
+            **body,
+            'offset': offset,
+            'total': len(rows),
+            'next_cursor': _encode(snapshot_id, end) if snapshot_id and end < len(rows) else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'snapshots': len(self._snapshots),
+            'rows': self._rows,
+            'opened': self.opened,
+            'expired': self.expired,
+            'shared_hits': self.shared_hits,
+        }
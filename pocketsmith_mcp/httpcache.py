@@ -0,0 +1,177 @@
+"""Conditional-GET (ETag / Last-Modified) cache for the shared HTTP client.
+
+Successful GET responses that carry a validator are stored with their body. Later
+requests for the same URL and credentials send `If-None-Match` / `If-Modified-Since`;
+when the API answers 304 the stored body is served instead, parsed at most once per
+entry. Entries live in a bounded in-memory LRU and, optionally, a cache backend (a
+SQLite file that survives restarts, or a store shared with other workers). The server
+decides which requests go through the cache.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+
+from . import codec
+from .cachestore import CacheBackend, SqliteBackend
+
+# Headers describing the wire encoding of the original body; the stored body is decoded
+_WIRE_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding')
+
+
+class CachedResponse:
+    """A stored response body with its validators."""
+
+    __slots__ = ('etag', 'last_modified', 'headers', 'content', '_parsed')
+
+    def __init__(
+        self,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        headers: List[Tuple[str, str]],
+        content: bytes,
+    ):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.content = content
+        self._parsed: List[Any] = []
+
+    @classmethod
+    def from_response(cls, resp: Any) -> Optional['CachedResponse']:
+        """Capture a 200 response, or return None when it has no validator."""
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if resp.status_code != 200 or not (etag or last_modified):
+            return None
+        headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in _WIRE_HEADERS]
+        return cls(etag, last_modified, headers, resp.content)
+
+    def to_bytes(self) -> bytes:
+        meta = codec.dumps([self.etag, self.last_modified, self.headers])
+        return meta.encode('utf-8') + b'\n' + self.content
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> 'CachedResponse':
+        meta, _, content = raw.partition(b'\n')
+        etag, last_modified, headers = codec.loads(meta)
+        return cls(etag, last_modified, [tuple(h) for h in headers], content)
+
+    def validators(self) -> Dict[str, str]:
+        """Request headers that ask the API to confirm this entry is still current."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def json(self, **kwargs: Any) -> Any:
+        if kwargs:
+            return json.loads(self.content, **kwargs)
+        if not self._parsed:
+            self._parsed.append(codec.loads(self.content))
+        return self._parsed[0]
+
+    def to_response(self, request: Any, revalidated: Optional[httpx.Headers] = None) -> Any:
+        """Rebuild a 200 response whose json() returns the already-parsed body.
+
+        `revalidated`: headers of the 304 that confirmed the entry. They replace the
+        stored ones (RFC 9111 section 4.3.4), so e.g. Date and X-Rate-Limit-* are current.
+        """
+        headers = httpx.Headers(self.headers)
+        for name, value in (revalidated or {}).items():
+            if name.lower() not in _WIRE_HEADERS:
+                headers[name] = value
+        resp = httpx.Response(200, headers=headers, content=self.content, request=request)
+        resp.json = self.json
+        return resp
+
+
+class HttpCache:
+    """Two-tier store of `CachedResponse`s: a memory LRU and an optional backend.
+
+    max_entries bounds the memory tier. `path` is shorthand for a private SQLite
+    backend bounded by max_disk_entries; a `backend` passed in may be shared with other
+    caches and processes, so its keys are prefixed with `namespace` and hashed (they
+    contain credentials). Backend hits are promoted into memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        path: Optional[Path] = None,
+        max_disk_entries: int = 4096,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = 'http',
+    ):
+        self.max_entries = max_entries
+        self.path = path
+        self.namespace = namespace
+        self._memory: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._owns_backend = backend is None and path is not None
+        if self._owns_backend:
+            backend = SqliteBackend(path, max_entries=max_disk_entries)
+        self.backend = backend
+        self.revalidated = 0
+        self.misses = 0
+        self.stores = 0
+
+    def close(self) -> None:
+        """Close a backend this cache opened itself; shared backends belong to the caller."""
+        if self._owns_backend and self.backend is not None:
+            self.backend.close()
+
+    def _backend_key(self, key: Hashable) -> str:
+        digest = hashlib.sha256(json.dumps(key, default=str).encode('utf-8')).hexdigest()
+        return f'{self.namespace}:{digest}'
+
+    async def get(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+        if self.backend is None:
+            return None
+        raw = await self.backend.get(self._backend_key(key))
+        if raw is None:
+            return None
+        entry = CachedResponse.from_bytes(raw)
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: Hashable, entry: CachedResponse) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def put(self, key: Hashable, entry: CachedResponse) -> None:
+        self.stores += 1
+        self._remember(key, entry)
+        if self.backend is not None:
+            await self.backend.set(self._backend_key(key), entry.to_bytes())
+
+    async def touch(self, key: Hashable) -> None:
+        """Record a successful revalidation (and refresh the entry's backend recency)."""
+        self.revalidated += 1
+        if self.backend is not None:
+            await self.backend.touch(self._backend_key(key))
+
+    async def clear(self) -> None:
+        self._memory.clear()
+        if self.backend is not None:
+            await self.backend.delete_prefix(f'{self.namespace}:')
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._memory),
+            'disk_entries': self.backend.entries() if self.backend is not None else None,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'stores': self.stores,
+        }
@@ -0,0 +1,538 @@
+"""Opt-in local SQLite mirror of a user's transactions, categories and accounts.
+
+The mirror is filled by one full download and then kept current with incremental
+`updated_since` syncs, so the report tools can answer from indexed local queries
+instead of paging through the API on every call. The mirror only stores data; the
+server decides when to sync and when to read from it.
+
+Monthly rollups keyed by (month, category) and (month, payee) are maintained alongside
+the raw rows: each sync subtracts the old contribution of every changed transaction
+and adds the new one, so whole-month report ranges sum a few hundred rollup cells
+instead of scanning every transaction.
+"""
+
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import codec
+from .records import Transaction
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sync_state (
+    user_id INTEGER PRIMARY KEY,
+    synced_at REAL NOT NULL,
+    full_synced_at REAL NOT NULL,
+    cursor TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    date TEXT,
+    amount REAL,
+    payee TEXT NOT NULL,
+    category_id INTEGER,
+    category_title TEXT NOT NULL,
+    type TEXT,
+    needs_review INTEGER NOT NULL DEFAULT 0,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_transactions_user_date ON transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS ix_transactions_category_date ON transactions (category_id, date);
+CREATE TABLE IF NOT EXISTS categories (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    title TEXT,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_categories_user ON categories (user_id);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_accounts_user ON accounts (user_id);
+CREATE TABLE IF NOT EXISTS rollup_category (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    category_id INTEGER NOT NULL,
+    category_title TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, category_id, category_title)
+);
+CREATE INDEX IF NOT EXISTS ix_rollup_category_id ON rollup_category (category_id, month);
+CREATE TABLE IF NOT EXISTS rollup_payee (
+    user_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    total REAL NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (user_id, month, payee)
+);
+"""
+
+# Bumped when derived tables change shape; older files get their rollups rebuilt
+_SCHEMA_VERSION = 1
+
+# Rollup tables: (name, key columns). category_id 0 stands for "no category id".
+_ROLLUPS = {
+    'rollup_category': ('category_id', 'category_title'),
+    'rollup_payee': ('payee',),
+}
+
+# Transaction-table expressions feeding each rollup key column
+_ROLLUP_SOURCE = {
+    'category_id': 'COALESCE(category_id, 0)',
+    'category_title': 'category_title',
+    'payee': 'payee',
+}
+
+# SQL expressions for the report group keys
+_GROUP_COLUMNS = {
+    'month': 'substr(date, 1, 7)',
+    'category': 'category_title',
+    'category_id': 'category_id',
+    'payee': 'payee',
+}
+_ROLLUP_GROUP_COLUMNS = {
+    'month': 'month',
+    'category': 'category_title',
+    'category_id': 'NULLIF(category_id, 0)',
+    'payee': 'payee',
+}
+
+# Overlap applied to the updated_since cursor to absorb clock skew between hosts
+_CURSOR_SKEW = timedelta(seconds=60)
+
+
+def _flatten_categories(categories: Iterable[dict]) -> Iterable[dict]:
+    """Yield every category in a (possibly nested) category tree."""
+    for c in categories or []:
+        if not isinstance(c, dict):
+            continue
+        yield c
+        yield from _flatten_categories(c.get('children') or [])
+
+
+class TransactionMirror:
+    """SQLite-backed store of mirrored PocketSmith data, keyed by user id."""
+
+    def __init__(self, path: Path, full_resync_after: float = 86400.0, reconcile_days: int = 31):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.full_resync_after = full_resync_after
+        # Incremental syncs relist this many recent days to catch deletions
+        self.reconcile_days = reconcile_days
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(_SCHEMA)
+        if self._db.execute('PRAGMA user_version').fetchone()[0] < _SCHEMA_VERSION:
+            with self._db:
+                self._rebuild_rollups(None)
+                self._db.execute(f'PRAGMA user_version = {_SCHEMA_VERSION}')
+
+    def close(self) -> None:
+        self._db.close()
+
+    # -----------------------
+    # Sync bookkeeping
+    # -----------------------
+
+    def _state(self, user_id: int) -> Optional[Tuple[float, float, str]]:
+        return self._db.execute(
+            'SELECT synced_at, full_synced_at, cursor FROM sync_state WHERE user_id = ?',
+            (user_id,),
+        ).fetchone()
+
+    def age(self, user_id: int) -> Optional[float]:
+        """Seconds since the last completed sync for user_id, or None if never synced."""
+        state = self._state(user_id)
+        return None if state is None else max(0.0, time.time() - state[0])
+
+    def needs_full_sync(self, user_id: int) -> bool:
+        """True when the user has never been loaded or the periodic full reload is due.
+
+        `updated_since` does not report deletions, so a full reload reconciles them
+        (incremental syncs only reconcile the last `reconcile_days`).
+        """
+        state = self._state(user_id)
+        return state is None or time.time() - state[1] > self.full_resync_after
+
+    def cursor(self, user_id: int) -> Optional[str]:
+        """ISO8601 `updated_since` value for the next incremental sync."""
+        state = self._state(user_id)
+        return None if state is None else state[2]
+
+    def apply_sync(
+        self,
+        user_id: int,
+        started_at: float,
+        transactions: List[dict],
+        categories: List[dict],
+        accounts: List[dict],
+        full: bool,
+    ) -> None:
+        """Store one sync's results; a full sync replaces everything held for user_id.
+
+        `started_at` (epoch seconds) is when the sync began fetching, so changes made
+        while it was running are picked up by the next incremental sync.
+        """
+        cursor = (datetime.fromtimestamp(started_at, timezone.utc) - _CURSOR_SKEW).isoformat(
+            timespec='seconds'
+        )
+        records = list(self._records(transactions))
+        with self._db:
+            if full:
+                for table in ('transactions', 'categories', 'accounts'):
+                    self._db.execute(f'DELETE FROM {table} WHERE user_id = ?', (user_id,))
+            else:
+                # Reference data is always fetched whole; replace it
+                self._db.execute('DELETE FROM categories WHERE user_id = ?', (user_id,))
+                self._db.execute('DELETE FROM accounts WHERE user_id = ?', (user_id,))
+                # Take the previous version of each changed row out of the rollups
+                self._apply_rollup_delta([r.id for _, r in records], -1)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO transactions '
+                '(id, user_id, date, amount, payee, category_id, category_title, type, '
+                'needs_review, body) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        r.id,
+                        user_id,
+                        r.date,
+                        r.amount,
+                        r.payee,
+                        r.category_id,
+                        r.category,
+                        r.type,
+                        1 if r.needs_review else 0,
+                        codec.dumps(t),
+                    )
+                    for t, r in records
+                ],
+            )
+            if full:
+                self._rebuild_rollups(user_id)
+            else:
+                self._apply_rollup_delta([r.id for _, r in records], 1)
+            self._db.executemany(
+                'INSERT OR REPLACE INTO categories (id, user_id, parent_id, title, body) '
+                'VALUES (?, ?, ?, ?, ?)',
+                [
+                    (c['id'], user_id, c.get('parent_id'), c.get('title'), codec.dumps(c))
+                    for c in _flatten_categories(categories)
+                    if isinstance(c.get('id'), int)
+                ],
+            )
+            self._db.executemany(
+                'INSERT OR REPLACE INTO accounts (id, user_id, body) VALUES (?, ?, ?)',
+                [
+                    (a['id'], user_id, codec.dumps(a))
+                    for a in accounts or []
+                    if isinstance(a, dict) and isinstance(a.get('id'), int)
+                ],
+            )
+            now = time.time()
+            prior = self._state(user_id)
+            full_synced_at = now if full or prior is None else prior[1]
+            self._db.execute(
+                'INSERT OR REPLACE INTO sync_state (user_id, synced_at, full_synced_at, cursor) '
+                'VALUES (?, ?, ?, ?)',
+                (user_id, now, full_synced_at, cursor),
+            )
+
+    def delete_transactions(self, user_id: Optional[int], ids: List[int]) -> None:
+        """Remove transactions (e.g. after an upstream DELETE) and their rollup share.
+
+        user_id None matches any user (a DELETE /transactions/{id} doesn't name one).
+        """
+        if user_id is not None:
+            ids = [
+                i
+                for (i,) in self._db.execute(
+                    'SELECT id FROM transactions WHERE user_id = ? '
+                    f'AND id IN ({", ".join("?" * len(ids))})',
+                    (user_id, *ids),
+                )
+            ]
+        if not ids:
+            return
+        with self._db:
+            self._apply_rollup_delta(ids, -1)
+            self._db.executemany('DELETE FROM transactions WHERE id = ?', [(i,) for i in ids])
+
+    def reconcile(
+        self, user_id: int, start_date: str, end_date: str, ids: Iterable[int]
+    ) -> List[int]:
+        """Delete the user's rows dated start_date..end_date whose id is not in `ids`.
+
+        `ids` is a complete upstream listing of that range; `updated_since` syncs never
+        report deletions, so this catches them without a full reload. Returns the
+        deleted ids.
+        """
+        keep = set(ids)
+        gone = [
+            i
+            for (i,) in self._db.execute(
+                'SELECT id FROM transactions WHERE user_id = ? AND date >= ? AND date <= ?',
+                (user_id, start_date, end_date),
+            )
+            if i not in keep
+        ]
+        self.delete_transactions(user_id, gone)
+        return gone
+
+    # -----------------------
+    # Rollups
+    # -----------------------
+
+    def _rebuild_rollups(self, user_id: Optional[int]) -> None:
+        """Recompute rollups from raw rows for one user (or every user when None)."""
+        scope, args = ('WHERE user_id = ?', (user_id,)) if user_id is not None else ('', ())
+        for table, keys in _ROLLUPS.items():
+            self._db.execute(f'DELETE FROM {table} {scope}', args)
+            sources = ', '.join(_ROLLUP_SOURCE[k] for k in keys)
+            where = 'amount IS NOT NULL AND date IS NOT NULL'
+            if user_id is not None:
+                where += ' AND user_id = ?'
+            self._db.execute(
+                f'INSERT INTO {table} (user_id, month, {", ".join(keys)}, total, count) '
+                f'SELECT user_id, substr(date, 1, 7), {sources}, SUM(amount), COUNT(*) '
+                f'FROM transactions WHERE {where} '
+                f'GROUP BY user_id, substr(date, 1, 7), {sources}',
+                args,
+            )
+
+    def _apply_rollup_delta(self, ids: List[int], sign: int) -> None:
+        """Add (sign=1) or subtract (sign=-1) the stored rows `ids` from every rollup."""
+        for start in range(0, len(ids), 500):
+            chunk = ids[start : start + 500]
+            marks = ', '.join('?' * len(chunk))
+            for table, keys in _ROLLUPS.items():
+                sources = ', '.join(_ROLLUP_SOURCE[k] for k in keys)
+                key_list = ', '.join(keys)
+                self._db.execute(
+                    f'INSERT INTO {table} (user_id, month, {key_list}, total, count) '
+                    f'SELECT user_id, substr(date, 1, 7), {sources}, ? * SUM(amount), '
+                    f'? * COUNT(*) FROM transactions '
+                    f'WHERE id IN ({marks}) AND amount IS NOT NULL AND date IS NOT NULL '
+                    f'GROUP BY user_id, substr(date, 1, 7), {sources} '
+                    f'ON CONFLICT (user_id, month, {key_list}) DO UPDATE SET '
+                    f'total = total + excluded.total, count = count + excluded.count',
+                    (sign, sign, *chunk),
+                )
+                self._db.execute(f'DELETE FROM {table} WHERE count <= 0')
+
+    @staticmethod
+    def _records(transactions: List[dict]) -> Iterable[Tuple[dict, Transaction]]:
+        for t in transactions:
+            if isinstance(t, dict):
+                r = Transaction.from_api(t)
+                if r.id is not None:
+                    yield t, r
+
+    def category_owner(self, category_id: int) -> Optional[int]:
+        """Return the mirrored user that owns category_id, if known."""
+        row = self._db.execute(
+            'SELECT user_id FROM categories WHERE id = ?', (category_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    # -----------------------
+    # Queries
+    # -----------------------
+
+    @staticmethod
+    def _where(
+        user_id: Optional[int],
+        category_id: Optional[int],
+        start_date: Optional[str],
+        end_date: Optional[str],
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        args: List[Any] = []
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            args.append(user_id)
+        if category_id is not None:
+            clauses.append('category_id = ?')
+            args.append(category_id)
+        if start_date:
+            clauses.append('date >= ?')
+            args.append(start_date[:10])
+        if end_date:
+            clauses.append('date <= ?')
+            args.append(end_date[:10])
+        return clauses, args
+
+    def transactions(
+        self,
+        user_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        uncategorised: Optional[int] = None,
+        tx_type: Optional[str] = None,
+        needs_review: Optional[int] = None,
+    ) -> List[dict]:
+        """Return raw transaction payloads, newest first, matching the API's list filters."""
+        clauses, args = self._where(user_id, category_id, start_date, end_date)
+        if uncategorised:
+            clauses.append('category_id IS NULL')
+        if tx_type in ('debit', 'credit'):
+            clauses.append('type = ?')
+            args.append(tx_type)
+        if needs_review:
+            clauses.append('needs_review = 1')
+        where = ' AND '.join(clauses) or '1'
+        rows = self._db.execute(
+            f'SELECT body FROM transactions WHERE {where} ORDER BY date DESC, id DESC', args
+        ).fetchall()
+        return [codec.loads(r[0]) for r in rows]
+
+    def totals(
+        self,
+        user_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        by: Sequence[str] = (),
+    ) -> List[Tuple[Tuple[Any, ...], float, int]]:
+        """Sum and count amounts grouped by any of 'month', 'category', 'category_id', 'payee'.
+
+        Returns (labels, total, count) rows in the same shape as
+        `GroupAccumulator.groups`, with months formatted as YYYY-MM. Whole months of
+        the range are read from the rollups; partial months at either edge (and
+        groupings the rollups can't express) fall back to the raw rows.
+        """
+        plan = self._rollup_plan(category_id, start_date, end_date, by)
+        if plan is None:
+            return self._raw_totals(user_id, category_id, start_date, end_date, by)
+        table, first_month, last_month, edges = plan
+
+        merged: Dict[Tuple[Any, ...], List[Any]] = {}
+
+        def add(rows: Iterable[Tuple[Tuple[Any, ...], float, int]]) -> None:
+            for key, total, count in rows:
+                acc = merged.setdefault(key, [0.0, 0])
+                acc[0] += total
+                acc[1] += count
+
+        clauses = ['month >= ?', 'month <= ?']
+        args: List[Any] = [first_month, last_month]
+        if user_id is not None:
+            clauses.append('user_id = ?')
+            args.append(user_id)
+        if category_id is not None:
+            clauses.append('category_id = ?')
+            args.append(category_id)
+        columns = [_ROLLUP_GROUP_COLUMNS[name] for name in by]
+        select = ', '.join([*columns, 'SUM(total)', 'SUM(count)'])
+        group = f' GROUP BY {", ".join(columns)}' if columns else ''
+        n = len(columns)
+        add(
+            (tuple(r[:n]), r[n], r[n + 1])
+            for r in self._db.execute(
+                f'SELECT {select} FROM {table} WHERE {" AND ".join(clauses)}{group}', args
+            ).fetchall()
+            if r[n + 1]
+        )
+        for lo, hi in edges:
+            add(self._raw_totals(user_id, category_id, lo, hi, by))
+        return [(key, total, count) for key, (total, count) in merged.items() if count]
+
+    def describe(
+        self,
+        user_id: Optional[int] = None,
+        category_id: Optional[int] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Count, total, min, max and mean of the amounts, like `GroupAccumulator.describe`."""
+        clauses, args = self._where(user_id, category_id, start_date, end_date)
+        clauses.append('amount IS NOT NULL')
+        count, total, low, high = self._db.execute(
+            'SELECT COUNT(*), SUM(amount), MIN(amount), MAX(amount) FROM transactions '
+            f'WHERE {" AND ".join(clauses)}',
+            args,
+        ).fetchone()
+        if not count:
+            return {'count': 0, 'total': 0.0, 'min': None, 'max': None, 'mean': None}
+        return {'count': count, 'total': total, 'min': low, 'max': high, 'mean': total / count}
+
+    @staticmethod
+    def _rollup_plan(
+        category_id: Optional[int],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        by: Sequence[str],
+    ) -> Optional[Tuple[str, str, str, List[Tuple[str, str]]]]:
+        """Split a date range into whole rollup months plus raw edge ranges.
+
+        Returns (table, first_month, last_month, [(lo, hi), ...]) or None when the
+        rollups can't answer (open range, no whole month, or category and payee both
+        requested).
+        """
+        if not start_date or not end_date:
+            return None
+        keys = set(by) - {'month'}
+        if category_id is not None and 'payee' in keys:
+            return None
+        if keys <= {'category', 'category_id'}:
+            table = 'rollup_category'
+        elif keys == {'payee'}:
+            table = 'rollup_payee'
+        else:
+            return None
+        try:
+            start = datetime.fromisoformat(start_date[:10]).date()
+            end = datetime.fromisoformat(end_date[:10]).date()
+        except ValueError:
+            return None
+        first = (
+            start if start.day == 1 else (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        )
+        after_end = end + timedelta(days=1)
+        last_end = end if after_end.day == 1 else end.replace(day=1) - timedelta(days=1)
+        if first > last_end:
+            return None
+        edges: List[Tuple[str, str]] = []
+        if start < first:
+            edges.append((start.isoformat(), (first - timedelta(days=1)).isoformat()))
+        if last_end < end:
+            edges.append(((last_end + timedelta(days=1)).isoformat(), end.isoformat()))
+        return table, first.isoformat()[:7], last_end.isoformat()[:7], edges
+
+    def _raw_totals(
+        self,
+        user_id: Optional[int],
+        category_id: Optional[int],
+        start_date: Optional[str],
+        end_date: Optional[str],
+        by: Sequence[str],
+    ) -> List[Tuple[Tuple[Any, ...], float, int]]:
+        clauses, args = self._where(user_id, category_id, start_date, end_date)
+        clauses.append('amount IS NOT NULL')
+        columns: List[str] = []
+        for name in by:
+            if name == 'month':
+                clauses.append('date IS NOT NULL')
+            columns.append(_GROUP_COLUMNS[name])
+        select = ', '.join([*columns, 'SUM(amount)', 'COUNT(*)'])
+        group = f' GROUP BY {", ".join(columns)}' if columns else ''
+        sql = f'SELECT {select} FROM transactions WHERE {" AND ".join(clauses)}{group}'
+        n = len(columns)
+        return [
+            (tuple(r[:n]), r[n], r[n + 1])
+            for r in self._db.execute(sql, args).fetchall()
+            if r[n + 1]
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        users = self._db.execute('SELECT COUNT(*) FROM sync_state').fetchone()[0]
+        rows = self._db.execute('SELECT COUNT(*) FROM transactions').fetchone()[0]
+        return {'path': str(self.path), 'users': users, 'transactions': rows}
@@ -0,0 +1,100 @@
+"""Field projection and compact layouts for list tool results.
+
+Raw PocketSmith payloads nest whole objects (a transaction carries its account with
+institution, its category with children, labels, balances ...). Tools can instead
+return:
+
+- `fields=[...]`: only the named fields; dotted paths reach into nested objects
+  (`category.title`, `transaction_account.id`).
+- `compact=True`: one flat record per row with the fields agents usually need
+  (`COMPACT_FIELDS`); `fields` then selects among those names.
+- `columnar=True`: one `columns` header plus a list of row arrays, so field names
+  are not repeated per row.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .records import Transaction
+
+
+def _transaction(row: dict) -> Dict[str, Any]:
+    tx = Transaction.from_api(row)
+    return {
+        'id': tx.id,
+        'date': tx.date,
+        'payee': tx.payee,
+        'amount': tx.amount,
+        'category_id': tx.category_id,
+        'category_title': tx.category,
+        'account_id': tx.account_id,
+    }
+
+
+def _account(row: dict) -> Dict[str, Any]:
+    return {
+        'id': row.get('id'),
+        'title': row.get('title'),
+        'type': row.get('type'),
+        'currency_code': row.get('currency_code'),
+        'current_balance': row.get('current_balance'),
+        'current_balance_date': row.get('current_balance_date'),
+    }
+
+
+# Flatteners for compact mode, by payload kind
+COMPACT: Dict[str, Callable[[dict], Dict[str, Any]]] = {
+    'transaction': _transaction,
+    'account': _account,
+}
+COMPACT_FIELDS: Dict[str, List[str]] = {kind: list(fn({})) for kind, fn in COMPACT.items()}
+
+
+def pick(row: Any, path: str) -> Any:
+    """Value at a dotted path, or None where any step is missing."""
+    value = row
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def select(
+    rows: Iterable[dict],
+    kind: str,
+    fields: Optional[Sequence[str]] = None,
+    compact: bool = False,
+) -> List[dict]:
+    """Apply compact mode and/or a field projection to raw payloads.
+
+    Raises ValueError for a compact field name that does not exist.
+    """
+    rows = list(rows)
+    if compact:
+        rows = [COMPACT[kind](row) for row in rows]
+        if fields:
+            unknown = [f for f in fields if f not in COMPACT_FIELDS[kind]]
+            if unknown:
+                raise ValueError(
+                    f'Unknown compact {kind} fields {unknown}; choose from {COMPACT_FIELDS[kind]}'
+                )
+            return [{f: row[f] for f in fields} for row in rows]
+        return rows
+    if fields:
+        return [{f: pick(row, f) for f in fields} for row in rows]
+    return rows
+
+
+def columns_of(rows: Iterable[dict]) -> List[str]:
+    """Union of the rows' keys in order of first appearance."""
+    seen: Dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            seen.setdefault(key, None)
+    return list(seen)
+
+
+def to_columns(rows: Sequence[dict], columns: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Header-plus-arrays layout: { columns, rows }."""
+    columns = columns if columns is not None else columns_of(rows)
+    return {'columns': columns, 'rows': [[row.get(c) for c in columns] for row in rows]}
@@ -0,0 +1,137 @@
+"""Normalised, compact transaction records.
+
+PocketSmith transaction payloads are large nested dicts, and older or proxied payloads
+spell the same field several ways. `Transaction.from_api` resolves those fallbacks once
+per row into a `__slots__` record with interned category and payee strings, so helpers
+and report tools work from one consistent representation.
+"""
+
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Optional, Tuple
+
+UNCATEGORISED = '(uncategorised)'
+UNKNOWN_PAYEE = '(unknown)'
+
+
+def parse_amount(row: dict) -> Optional[float]:
+    """Parse amount from a transaction payload, handling various formats safely.
+
+    Prefers `amount` and falls back to `amount_cents` only when `amount` is absent, so
+    a zero amount is kept rather than treated as missing.
+    """
+    raw = None
+    if 'amount' in row:
+        raw = row.get('amount')
+    elif 'amount_cents' in row:
+        raw = row.get('amount_cents')
+    if raw is None:
+        return None
+    try:
+        return float(raw)
+    except (ValueError, TypeError):
+        return None
+
+
+@lru_cache(maxsize=8192)
+def parse_date(raw: str) -> Tuple[Optional[str], int]:
+    """Return (YYYY-MM-DD, month ordinal) for an ISO date/datetime string.
+
+    The month ordinal is year * 12 + month - 1, or -1 (with date None) when the value
+    can't be parsed. Cached because a batch repeats the same few hundred dates.
+    """
+    try:
+        d = datetime.fromisoformat(raw[:10])
+    except ValueError:
+        return None, -1
+    return d.date().isoformat(), d.year * 12 + d.month - 1
+
+
+def row_date(row: dict) -> Tuple[Optional[str], int]:
+    """`parse_date` of a payload's `date`, else `transaction_date`, else `created_at`."""
+    raw = row.get('date') or row.get('transaction_date') or row.get('created_at')
+    return parse_date(str(raw)) if raw else (None, -1)
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(str(value))
+
+
+class Transaction:
+    """One transaction reduced to the fields the curated tools use."""
+
+    __slots__ = (
+        'id',
+        'date',
+        'month',
+        'amount',
+        'payee',
+        'category_id',
+        'category',
+        'account_id',
+        'type',
+        'needs_review',
+    )
+
+    def __init__(
+        self,
+        id: Optional[int],
+        date: Optional[str],
+        month: int,
+        amount: Optional[float],
+        payee: str,
+        category_id: Optional[int],
+        category: str,
+        account_id: Optional[int] = None,
+        type: Optional[str] = None,
+        needs_review: bool = False,
+    ):
+        self.id = id
+        self.date = date
+        self.month = month
+        self.amount = amount
+        self.payee = payee
+        self.category_id = category_id
+        self.category = category
+        self.account_id = account_id
+        self.type = type
+        self.needs_review = needs_review
+
+    @classmethod
+    def from_api(cls, row: dict) -> 'Transaction':
+        """Build a record from a raw API payload, resolving field-name fallbacks.
+
+        - amount: `amount`, else `amount_cents`
+        - date: `date`, else `transaction_date`, else `created_at`
+        - category: `category.title`, else `category_name`, else '(uncategorised)'
+        - payee: `payee`, else `payee_name`, else `merchant`, else '(unknown)'
+        """
+        date, month = row_date(row)
+        cat = row.get('category')
+        cat = cat if isinstance(cat, dict) else {}
+        account = row.get('transaction_account')
+        account = account if isinstance(account, dict) else {}
+        tx_id = row.get('id')
+        cat_id = cat.get('id')
+        account_id = account.get('id')
+        return cls(
+            id=tx_id if isinstance(tx_id, int) else None,
+            date=date,
+            month=month,
+            amount=parse_amount(row),
+            payee=_intern(
+                row.get('payee') or row.get('payee_name') or row.get('merchant') or UNKNOWN_PAYEE
+            ),
+            category_id=cat_id if isinstance(cat_id, int) else None,
+            category=_intern(cat.get('title') or row.get('category_name') or UNCATEGORISED),
+            account_id=account_id if isinstance(account_id, int) else None,
+            type=row.get('type') if row.get('type') in ('debit', 'credit') else None,
+            needs_review=bool(row.get('needs_review')),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f'Transaction(id={self.id!r}, date={self.date!r}, amount={self.amount!r}, '
+            f'payee={self.payee!r}, category={self.category!r})'
+        )
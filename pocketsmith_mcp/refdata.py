@@ -0,0 +1,155 @@
+"""In-process TTL cache for slow-changing reference data.
+
+Holds the authenticated user (`/me`), category trees, account lists, single accounts
+and budget analyses so the common tool path doesn't refetch them on every call.
+Entries are keyed by entity name plus an id, expire after a fixed TTL and are evicted
+least recently used first beyond `max_entries`. Concurrent misses for one key share a
+single load. The cache is bound to one set of credentials: binding a different
+credential fingerprint drops everything. With a shared cache backend, entries fetched
+by one worker are served to the others until they expire.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from . import codec
+from .cachestore import CacheBackend
+
+# Entities the server caches; used for per-entity stats and invalidation
+ENTITIES = ('user', 'categories', 'accounts', 'account', 'trend_analysis', 'budget_summary')
+
+
+class ReferenceCache:
+    """Bounded TTL map of (entity, key) -> parsed API body with per-entity counters.
+
+    A miss starts one load task per key; callers arriving while it runs await the
+    same task (counted as `coalesced`) instead of fetching again, like `SingleFlight`.
+    `backend` adds a second tier under `namespace` (which callers make per credential);
+    a value found there keeps the expiry it was stored with.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = 'refdata',
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self.backend = backend
+        self.namespace = namespace
+        self.shared_hits = 0
+        self.coalesced = 0
+        self._entries: 'OrderedDict[Tuple[str, Hashable], Tuple[float, Any]]' = OrderedDict()
+        self._loading: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+        self._owner: Optional[str] = None
+        self.hits: Dict[str, int] = {e: 0 for e in ENTITIES}
+        self.misses: Dict[str, int] = {e: 0 for e in ENTITIES}
+
+    def bind(self, fingerprint: str) -> None:
+        """Attach the cache to a credential; a different credential clears it."""
+        if fingerprint != self._owner:
+            self.invalidate()
+            self._owner = fingerprint
+
+    async def get(self, entity: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for (entity, key), calling fetch() when absent/expired."""
+        entry = self._entries.get((entity, key))
+        if entry is not None and self._clock() < entry[0]:
+            self._entries.move_to_end((entity, key))
+            self.hits[entity] = self.hits.get(entity, 0) + 1
+            return entry[1]
+        task = self._loading.get((entity, key))
+        if task is None:
+            task = asyncio.ensure_future(self._load(entity, key, fetch))
+            self._loading[(entity, key)] = task
+            task.add_done_callback(lambda t: self._loaded((entity, key), t))
+        else:
+            self.coalesced += 1
+        # Shield so one caller being cancelled doesn't cancel the shared load
+        return await asyncio.shield(task)
+
+    async def _load(self, entity: str, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        shared_key = self._shared_key(entity, key)
+        if self.backend is not None:
+            raw = await self.backend.get(shared_key)
+            if raw is not None:
+                expires_at, value = codec.loads(raw)
+                remaining = expires_at - time.time()
+                if remaining > 0:
+                    # Counted as a hit: no upstream request was made
+                    self.hits[entity] = self.hits.get(entity, 0) + 1
+                    self.shared_hits += 1
+                    if self._current((entity, key)):
+                        self._store((entity, key), remaining, value)
+                    return value
+        self.misses[entity] = self.misses.get(entity, 0) + 1
+        value = await fetch()
+        # Invalidated while loading: hand the value to our callers but don't keep it
+        if not self._current((entity, key)):
+            return value
+        self._store((entity, key), self.ttl, value)
+        if self.backend is not None:
+            raw = codec.dumps([time.time() + self.ttl, value]).encode('utf-8')
+            await self.backend.set(shared_key, raw, ttl=self.ttl)
+        return value
+
+    def _current(self, key: Tuple[str, Hashable]) -> bool:
+        return self._loading.get(key) is asyncio.current_task()
+
+    def _store(self, key: Tuple[str, Hashable], ttl: float, value: Any) -> None:
+        self._entries[key] = (self._clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _loaded(self, key: Tuple[str, Hashable], task: asyncio.Task) -> None:
+        if self._loading.get(key) is task:
+            del self._loading[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.exception()
+
+    def _shared_key(self, entity: str, key: Optional[Hashable] = None) -> str:
+        prefix = f'{self.namespace}:{entity}:'
+        # The trailing ':' keeps key 1's prefix from matching key 10
+        return prefix if key is None else f'{prefix}{json.dumps(key, default=str)}:'
+
+    def invalidate(self, entity: Optional[str] = None, key: Optional[Hashable] = None) -> None:
+        """Drop one entry, every entry of an entity, or (no arguments) everything.
+
+        Loads still running for them finish for their callers but are not stored, and
+        the next caller starts a fresh one.
+        """
+        if entity is None:
+            self._entries.clear()
+            self._loading.clear()
+            return
+        matches = (lambda k: k == (entity, key)) if key is not None else (lambda k: k[0] == entity)
+        for k in [k for k in self._entries if matches(k)]:
+            del self._entries[k]
+        for k in [k for k in self._loading if matches(k)]:
+            del self._loading[k]
+
+    async def forget(self, entity: str, key: Optional[Hashable] = None) -> None:
+        """`invalidate()` both tiers, so other workers refetch too."""
+        self.invalidate(entity, key)
+        if self.backend is not None:
+            await self.backend.delete_prefix(self._shared_key(entity, key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'ttl': self.ttl,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'coalesced': self.coalesced,
+            'hits': dict(self.hits),
+            'misses': dict(self.misses),
+            'shared_hits': self.shared_hits,
+        }
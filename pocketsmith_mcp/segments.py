@@ -0,0 +1,299 @@
+"""Month-segmented cache for date-ranged transaction list results.
+
+Results are stored per (key, calendar month), where the key identifies the endpoint
+and its non-date filters. A `start_date`..`end_date` request is answered from the
+cached months it covers and only the missing months are fetched upstream, in windows
+of a few months that never span two gaps. Months that closed long ago rarely change
+and are kept for a long TTL (a late import or recategorisation still shows up
+eventually); recent months expire after a short one. With a shared cache backend, months fetched by one
+worker are served to the others.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from . import codec
+from .cachestore import CacheBackend
+from .records import row_date
+
+# fetch_window(start_date, end_date) -> rows for that inclusive YYYY-MM-DD window
+FetchWindow = Callable[[str, str], Awaitable[List[dict]]]
+
+
+def _month_start(ordinal: int) -> date:
+    return date(ordinal // 12, ordinal % 12 + 1, 1)
+
+
+def _month_end(ordinal: int) -> date:
+    return _month_start(ordinal + 1) - timedelta(days=1)
+
+
+def _contiguous_runs(months: List[int]) -> List[Tuple[int, int]]:
+    """Group sorted month ordinals into (first, last) runs of consecutive months."""
+    runs: List[Tuple[int, int]] = []
+    for m in months:
+        if runs and runs[-1][1] == m - 1:
+            runs[-1] = (runs[-1][0], m)
+        else:
+            runs.append((m, m))
+    return runs
+
+
+def date_windows(start_date: str, end_date: str, months: int) -> List[Tuple[str, str]]:
+    """Split an inclusive YYYY-MM-DD range into windows of up to `months` calendar months.
+
+    Windows are aligned to month boundaries (the first and last are clipped to the
+    range) and returned newest first. Raises ValueError for non-date strings.
+    """
+    start = date.fromisoformat(start_date[:10])
+    end = date.fromisoformat(end_date[:10])
+    first = start.year * 12 + start.month - 1
+    last = end.year * 12 + end.month - 1
+    if last < first:
+        return [(start.isoformat(), end.isoformat())]
+    step = max(1, months)
+    windows = [
+        (
+            max(start, _month_start(m)).isoformat(),
+            min(end, _month_end(min(m + step - 1, last))).isoformat(),
+        )
+        for m in range(first, last + 1, step)
+    ]
+    return windows[::-1]
+
+
+class SegmentCache:
+    """LRU of per-month transaction segments with age-dependent TTLs.
+
+    recent_ttl: seconds a month that ended within `settle_days` (or hasn't ended)
+    stays cached. settled_ttl: seconds an older month stays cached. The LRU holds at
+    most `max_segments` months and `max_rows` rows (the newest month is always kept).
+    Gaps are fetched in windows of `window_months`, at most `window_concurrency`
+    windows ahead of the consumer.
+    `backend` adds a second tier under `namespace` (which callers make per credential).
+    """
+
+    def __init__(
+        self,
+        recent_ttl: float = 300.0,
+        settled_ttl: float = 86400.0,
+        settle_days: int = 60,
+        max_segments: int = 512,
+        max_rows: int = 100_000,
+        window_months: int = 3,
+        window_concurrency: int = 4,
+        clock: Callable[[], float] = time.time,
+        today: Callable[[], date] = date.today,
+        backend: Optional[CacheBackend] = None,
+        namespace: str = 'segments',
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.shared_hits = 0
+        self.recent_ttl = recent_ttl
+        self.settled_ttl = settled_ttl
+        self.settle_days = settle_days
+        self.max_segments = max_segments
+        self.max_rows = max_rows
+        self.window_months = max(1, window_months)
+        self.window_concurrency = max(1, window_concurrency)
+        self._rows = 0
+        self._clock = clock
+        self._today = today
+        self._segments: 'OrderedDict[Tuple[Hashable, int], Tuple[float, List[dict]]]' = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, month: int) -> float:
+        settled = _month_end(month) + timedelta(days=self.settle_days) < self._today()
+        return self.settled_ttl if settled else self.recent_ttl
+
+    def _get(self, key: Hashable, month: int) -> Optional[List[dict]]:
+        entry = self._segments.get((key, month))
+        if entry is None:
+            return None
+        expires, rows = entry
+        if self._clock() >= expires:
+            self._drop((key, month))
+            return None
+        self._segments.move_to_end((key, month))
+        return rows
+
+    def _put(self, key: Hashable, month: int, rows: List[dict]) -> bool:
+        ttl = self._ttl(month)
+        if ttl <= 0:
+            return False
+        self._drop((key, month))
+        self._segments[(key, month)] = (self._clock() + ttl, rows)
+        self._rows += len(rows)
+        while len(self._segments) > 1 and (
+            len(self._segments) > self.max_segments or self._rows > self.max_rows
+        ):
+            self._drop(next(iter(self._segments)))
+        return True
+
+    def _drop(self, segment: Tuple[Hashable, int]) -> None:
+        entry = self._segments.pop(segment, None)
+        if entry is not None:
+            self._rows -= len(entry[1])
+
+    def _shared_key(self, key: Optional[Hashable] = None, month: Optional[int] = None) -> str:
+        if key is None:
+            return f'{self.namespace}:'
+        prefix = f'{self.namespace}:{json.dumps(key, default=str)}:'
+        return prefix if month is None else f'{prefix}{month}'
+
+    async def _shared_get(self, key: Hashable, month: int) -> Optional[List[dict]]:
+        assert self.backend is not None
+        raw = await self.backend.get(self._shared_key(key, month))
+        if raw is None:
+            return None
+        rows = codec.loads(raw)
+        self._put(key, month, rows)
+        return rows
+
+    async def _shared_put(self, key: Hashable, month: int, rows: List[dict]) -> None:
+        assert self.backend is not None
+        await self.backend.set(
+            self._shared_key(key, month), codec.dumps(rows).encode('utf-8'), ttl=self._ttl(month)
+        )
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop every segment for key, or everything when key is None."""
+        if key is None:
+            self._segments.clear()
+            self._rows = 0
+            return
+        for k in [k for k in self._segments if k[0] == key]:
+            self._drop(k)
+
+    async def forget(self, key: Optional[Hashable] = None) -> None:
+        """`invalidate()` both tiers, so other workers refetch too."""
+        self.invalidate(key)
+        if self.backend is not None:
+            await self.backend.delete_prefix(self._shared_key(key))
+
+    async def fetch(
+        self, key: Hashable, start_date: str, end_date: str, fetch_window: FetchWindow
+    ) -> List[dict]:
+        """Return rows dated start_date..end_date, fetching only uncached months.
+
+        Rows come back newest month first, in upstream order within each month.
+        Raises ValueError if the dates are not valid YYYY-MM-DD strings.
+        """
+        out: List[dict] = []
+        async for rows in self.stream(key, start_date, end_date, fetch_window):
+            out.extend(rows)
+        return out
+
+    def stream(
+        self, key: Hashable, start_date: str, end_date: str, fetch_window: FetchWindow
+    ) -> AsyncIterator[List[dict]]:
+        """Yield the rows of `fetch` one month at a time, newest month first.
+
+        Missing months are fetched in windows of up to `window_months` within each gap,
+        newest first and at most `window_concurrency` windows ahead of the consumer. A
+        month is handed over as soon as its window arrives, so a cold range holds only
+        the windows in flight, not the whole history. Raises ValueError here, before
+        any iteration, if the dates are not valid YYYY-MM-DD strings.
+        """
+        start = date.fromisoformat(start_date[:10])
+        end = date.fromisoformat(end_date[:10])
+        return self._stream(key, start, end, fetch_window)
+
+    async def _stream(
+        self, key: Hashable, start: date, end: date, fetch_window: FetchWindow
+    ) -> AsyncIterator[List[dict]]:
+        months = list(range(start.year * 12 + start.month - 1, end.year * 12 + end.month))
+        segments: Dict[int, List[dict]] = {}
+        missing: List[int] = []
+        for m in months:
+            rows = self._get(key, m)
+            if rows is None:
+                missing.append(m)
+            else:
+                segments[m] = rows
+        if missing and self.backend is not None:
+            shared = await asyncio.gather(*(self._shared_get(key, m) for m in missing))
+            found = {m: rows for m, rows in zip(missing, shared, strict=True) if rows is not None}
+            self.shared_hits += len(found)
+            segments.update(found)
+            missing = [m for m in missing if m not in found]
+        self.hits += len(months) - len(missing)
+        self.misses += len(missing)
+
+        async def fill(first: int, last: int) -> None:
+            rows = await fetch_window(_month_start(first).isoformat(), _month_end(last).isoformat())
+            by_month: Dict[int, List[dict]] = {m: [] for m in range(first, last + 1)}
+            for row in rows:
+                month = row_date(row)[1]
+                if month < 0:
+                    # Undated rows stay with the first month so they are not lost
+                    by_month[first].append(row)
+                elif month in by_month:
+                    by_month[month].append(row)
+                # Rows dated outside the window belong to (and come with) another one
+            for m, month_rows in by_month.items():
+                if self._put(key, m, month_rows) and self.backend is not None:
+                    await self._shared_put(key, m, month_rows)
+                segments[m] = month_rows
+
+        # Windows (first, last) newest first; month -> index of the window filling it
+        windows: List[Tuple[int, int]] = []
+        for first, last in reversed(_contiguous_runs(missing)):
+            for top in range(last, first - 1, -self.window_months):
+                windows.append((max(first, top - self.window_months + 1), top))
+        window_of = {m: i for i, (a, b) in enumerate(windows) for m in range(a, b + 1)}
+        fills: List['asyncio.Task[None]'] = []
+
+        def prefetch(upto: int) -> None:
+            while len(fills) < min(len(windows), upto):
+                fills.append(asyncio.ensure_future(fill(*windows[len(fills)])))
+
+        lo, hi = start.isoformat(), end.isoformat()
+        try:
+            # The first windows load while cached months are handed over
+            prefetch(self.window_concurrency)
+            for m in reversed(months):
+                index = window_of.get(m)
+                if index is not None:
+                    prefetch(index + self.window_concurrency)
+                    await fills[index]
+                rows = []
+                for row in segments.pop(m):
+                    day = row_date(row)[0]
+                    if day is None or lo <= day <= hi:
+                        rows.append(row)
+                yield rows
+        finally:
+            # The consumer stopped early or a window failed: don't leave fetches running
+            for task in fills:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # retrieved, so an unawaited failure isn't logged
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'segments': len(self._segments),
+            'rows': self._rows,
+            'hits': self.hits,
+            'misses': self.misses,
+            'shared_hits': self.shared_hits,
+        }
@@ -1,17 +1,39 @@
-import json
 import os
-from collections import defaultdict
-from typing import Any, Dict, List, Optional
-from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from pathlib import Path
 import sys
 import asyncio
+from collections import deque
+import functools
+import itertools
 import email.utils as eut
+import hashlib
+import importlib.util
+import re
 import time
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
+import dataclasses
 
 import httpx
 from fastmcp import FastMCP
-from dotenv import load_dotenv
+from fastmcp.tools import Tool
 from tenacity import (
     AsyncRetrying,
     retry_if_exception_type,
@@ -19,21 +41,23 @@ from tenacity import (
     wait_exponential_jitter,
 )
 from types import MethodType
-
-
-def _parse_amount(transaction: dict) -> Optional[float]:
-    """Parse amount from transaction, handling various formats safely."""
-    raw = None
-    if 'amount' in transaction:
-        raw = transaction.get('amount')
-    elif 'amount_cents' in transaction:
-        raw = transaction.get('amount_cents')
-    if raw is None:
-        return None
-    try:
-        return float(raw)
-    except (ValueError, TypeError):
-        return None
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from . import aggregates, codec
+from .config import ServerConfig, auth_headers, default_cache_dir
+from .autotools import OperationFilter, count_operations
+from .cachestore import CacheBackend, open_backend
+from .categories import CategoryIndex
+from .cursors import ResultStore
+from .projection import select, to_columns
+from .grouping import Group, GroupAccumulator, regroup
+from .httpcache import CachedResponse, HttpCache
+from .mirror import TransactionMirror
+from .records import Transaction
+from .refdata import ReferenceCache
+from .records import parse_amount as _parse_amount  # noqa: F401  (kept for callers/tests)
+from .segments import FetchWindow, SegmentCache, date_windows
+from .tenants import Credentials, TenantPool, request_credentials
 
 
 def build_headers() -> dict:
@@ -42,27 +66,13 @@ def build_headers() -> dict:
     Supports either:
     - OAuth2 access token via POCKETSMITH_ACCESS_TOKEN -> Authorization: Bearer ...
     - Developer key via POCKETSMITH_DEVELOPER_KEY -> X-Developer-Key: ...
-    """
-    headers: dict[str, str] = {}
 
+    Missing credentials are not reported here; `create_server` warns about them once,
+    on stderr, where they can't corrupt a stdio transport.
+    """
     access_token = os.getenv('POCKETSMITH_ACCESS_TOKEN')
     developer_key = os.getenv('POCKETSMITH_DEVELOPER_KEY')
-
-    if access_token:
-        headers['Authorization'] = f'Bearer {access_token}'
-    elif developer_key:
-        headers['X-Developer-Key'] = developer_key
-    else:
-        # No auth provided; many endpoints will fail without auth
-        print(
-            '[PocketSmith MCP] Warning: No POCKETSMITH_ACCESS_TOKEN or '
-            'POCKETSMITH_DEVELOPER_KEY set; API calls may be unauthorized.'
-        )
-
-    # API recommends JSON
-    headers.setdefault('Accept', 'application/json')
-    headers.setdefault('Content-Type', 'application/json')
-    return headers
+    return auth_headers(access_token, developer_key)
 
 
 def load_openapi_spec() -> dict:
@@ -77,14 +87,16 @@ def load_openapi_spec() -> dict:
 
         files = res.files('pocketsmith_mcp.data')
         openapi_path = files / 'openapi.json'
-        with openapi_path.open('r', encoding='utf-8') as f:
-            return json.load(f)
+        return codec.loads(openapi_path.read_bytes())
     except (ImportError, FileNotFoundError, AttributeError):
         pass
 
     ref_path = Path(__file__).parent.parent / 'reference' / 'openapi.json'
-    with ref_path.open('r', encoding='utf-8') as f:
-        return json.load(f)
+    return codec.loads(ref_path.read_bytes())
+
+
+# servers[0].url of the bundled spec; used when the spec itself isn't loaded
+DEFAULT_BASE_URL = 'https://api.pocketsmith.com/v2'
 
 
 def detect_base_url(openapi_spec: dict) -> str:
@@ -97,7 +109,7 @@ def detect_base_url(openapi_spec: dict) -> str:
     except Exception:
         pass
     # Fallback to documented production URL
-    return 'https://api.pocketsmith.com/v2'
+    return DEFAULT_BASE_URL
 
 
 """PocketSmith MCP server with curated tools.
@@ -106,19 +118,8 @@ We generate tools from the OpenAPI spec and add curated, LLM-friendly tools
 that simplify common workflows.
 """
 
-# Initialize OpenAPI-driven server and shared HTTP client at import time so we
-# can register curated tools using decorators.
-_spec: dict = load_openapi_spec()
-_base_url: str = detect_base_url(_spec)
-load_dotenv()
-
-# Duplicate auth warning removed (already handled in build_headers())
-
-# Read/write mode: default to READ-ONLY unless explicitly enabled
-_WRITE_MODE = os.getenv('POCKETSMITH_WRITE_MODE', '').lower() in {'1', 'true', 'yes', 'on'}
-print(f'PocketSmith MCP mode: {"write" if _WRITE_MODE else "read-only"}', file=sys.stderr)
-_headers: dict = build_headers()
-_client: httpx.AsyncClient = httpx.AsyncClient(base_url=_base_url, headers=_headers)
+# Importing this module has no side effects: clients, caches and the rate limiter
+# belong to a ServerState built by create_server() (see "Server state" below).
 
 # -----------------------
 # Resilience: retries & rate limits
@@ -152,18 +153,160 @@ def _parse_retry_after(value: Optional[str]) -> Optional[float]:
         return None
 
 
-def _install_retries(client: httpx.AsyncClient) -> None:
+class RateLimited(TransientError):
+    """Raised on HTTP 429; carries the server's Retry-After (seconds) when given."""
+
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__('rate limited')
+        self.retry_after = retry_after
+
+
+def _parse_rate_reset(value: Optional[str]) -> Optional[float]:
+    """Parse X-Rate-Limit-Reset to seconds from now.
+
+    Accepts either a delta in seconds or an absolute epoch timestamp.
+    """
+    if not value:
+        return None
+    try:
+        reset = float(value)
+    except ValueError:
+        return None
+    if reset > 1_000_000_000:
+        # Looks like an epoch timestamp rather than a delta
+        reset -= time.time()
+    return max(0.0, reset)
+
+
+class RateLimiter:
+    """Process-wide async token bucket kept in sync with X-Rate-Limit-* headers.
+
+    The bucket holds the number of requests the API says are left in the current
+    window. While plenty remain, requests pass straight through; once the bucket drops
+    to the low-water mark (`reserve` of the limit) the remaining tokens are handed out
+    evenly over the time left until the window resets, so concurrent callers slow down
+    instead of all running into 429s together. Until the API has reported its limits
+    the bucket does not pace at all.
+    """
+
+    def __init__(self, reserve: float = 0.1, clock=time.monotonic):
+        self.reserve = reserve
+        self._clock = clock
+        self.limit: Optional[int] = None
+        self.tokens: Optional[float] = None
+        self.reset_at: Optional[float] = None
+        self._next_slot = 0.0
+        self.waits = 0
+
+    def _roll(self, now: float) -> None:
+        """Refill the bucket once the server-side window has reset."""
+        if self.reset_at is not None and now >= self.reset_at:
+            self.tokens = float(self.limit) if self.limit is not None else None
+            self.reset_at = None
+            self._next_slot = 0.0
+
+    def _low_water(self) -> float:
+        return max(1.0, (self.limit or 0) * self.reserve)
+
+    def _try_acquire(self) -> float:
+        """Take a token if one is available now; otherwise return seconds to wait."""
+        now = self._clock()
+        self._roll(now)
+        if self.tokens is None or self.reset_at is None:
+            # Nothing known (or no reset time to pace against): let the request through
+            if self.tokens is not None:
+                self.tokens = max(0.0, self.tokens - 1)
+            return 0.0
+        if self.tokens > self._low_water():
+            self.tokens -= 1
+            return 0.0
+        if self.tokens >= 1 and now >= self._next_slot:
+            # Spread what is left of the budget evenly across the rest of the window
+            self._next_slot = now + (self.reset_at - now) / self.tokens
+            self.tokens -= 1
+            return 0.0
+        if self.tokens >= 1:
+            return self._next_slot - now
+        return self.reset_at - now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent under the current budget."""
+        # No lock needed: the bookkeeping never awaits, so it is atomic on the loop.
+        while True:
+            delay = self._try_acquire()
+            if delay <= 0:
+                return
+            self.waits += 1
+            await asyncio.sleep(delay)
+
+    def update(self, headers: Any) -> None:
+        """Resynchronise the bucket from a response's X-Rate-Limit-* headers."""
+        try:
+            remaining = int(headers.get('X-Rate-Limit-Remaining'))
+        except (TypeError, ValueError):
+            return
+        try:
+            self.limit = int(headers.get('X-Rate-Limit-Limit'))
+        except (TypeError, ValueError):
+            pass
+        now = self._clock()
+        reset = _parse_rate_reset(headers.get('X-Rate-Limit-Reset'))
+        reset_at = now + reset if reset is not None else None
+        new_window = self.reset_at is None or reset_at is None or reset_at > self.reset_at + 1.0
+        if self.tokens is None or new_window:
+            self.tokens = float(remaining)
+        else:
+            # Requests still in flight already took tokens locally; keep the lower count
+            self.tokens = min(self.tokens, float(remaining))
+        if reset_at is not None:
+            self.reset_at = reset_at
+
+    def pacing(self) -> bool:
+        """True while the budget is at the low-water mark and requests are being spaced."""
+        self._roll(self._clock())
+        return (
+            self.tokens is not None
+            and self.reset_at is not None
+            and self.tokens <= self._low_water()
+        )
+
+    def block(self, seconds: float) -> None:
+        """Hold every caller until `seconds` from now (e.g. after a 429 Retry-After)."""
+        self.tokens = 0.0
+        self.reset_at = self._clock() + max(0.0, seconds)
+
+    def snapshot(self) -> dict:
+        now = self._clock()
+        return {
+            'limit': self.limit,
+            'tokens': self.tokens,
+            'reset_in': max(0.0, self.reset_at - now) if self.reset_at is not None else None,
+            'waits': self.waits,
+        }
+
+
+def _install_retries(client: httpx.AsyncClient, limiter: Optional[RateLimiter] = None) -> None:
     original_request = client.request
+    backoff = wait_exponential_jitter(initial=1, max=20)
+
+    def wait(retry_state) -> float:
+        exc = retry_state.outcome.exception() if retry_state.outcome else None
+        if limiter is not None and isinstance(exc, RateLimited) and exc.retry_after:
+            # The limiter already holds every caller until Retry-After has passed
+            return 0.0
+        return backoff(retry_state)
 
     async def request(self: httpx.AsyncClient, method: str, url: str, **kwargs):  # type: ignore[override]
         # Use tenacity for backoff/jitter on network errors and 5xx
         async for attempt in AsyncRetrying(
             retry=retry_if_exception_type((httpx.HTTPError, TransientError)),
             stop=stop_after_attempt(6),
-            wait=wait_exponential_jitter(initial=1, max=20),
+            wait=wait,
             reraise=True,
         ):
             with attempt:
+                if limiter is not None:
+                    await limiter.acquire()
                 try:
                     # Call the original bound request
                     resp: httpx.Response = await original_request(method, url, **kwargs)
@@ -171,13 +314,19 @@ def _install_retries(client: httpx.AsyncClient) -> None:
                     # Network/timeout errors -> retry by raising
                     raise
 
+                if limiter is not None:
+                    limiter.update(resp.headers)
+
                 # Rate limited
                 if resp.status_code == 429:
                     retry_after = _parse_retry_after(resp.headers.get('Retry-After'))
                     if retry_after and retry_after > 0:
-                        await asyncio.sleep(retry_after)
+                        if limiter is not None:
+                            limiter.block(retry_after)
+                        else:
+                            await asyncio.sleep(retry_after)
                     # Trigger a retry with backoff next
-                    raise TransientError('rate limited')
+                    raise RateLimited(retry_after)
 
                 # Retry for typical transient server errors
                 if resp.status_code in {500, 502, 503, 504}:
@@ -189,55 +338,1008 @@ def _install_retries(client: httpx.AsyncClient) -> None:
     client.request = MethodType(request, client)  # type: ignore[assignment]
 
 
-_install_retries(_client)
-# Server initialization
-# Control inclusion of auto-generated OpenAPI tools via env flag (default: off)
-_INCLUDE_AUTOTOOLS = os.getenv('POCKETSMITH_INCLUDE_AUTOTOOLS', '').lower() in {
-    '1',
-    'true',
-    'yes',
-    'on',
-}
-
-if _INCLUDE_AUTOTOOLS:
-    # Full surface (read + write according to API), useful for power users
-    mcp: FastMCP = FastMCP.from_openapi(
-        openapi_spec=_spec,
-        client=_client,
-        name='PocketSmith MCP',
+# -----------------------
+# JSON codec
+# -----------------------
+
+
+def _install_json_codec(client: httpx.AsyncClient) -> None:
+    """Decode response bodies on `client` with `codec.loads` (orjson/msgspec if installed)."""
+    inner_request = client.request
+
+    async def request(self: httpx.AsyncClient, method: str, url: str, **kwargs):  # type: ignore[override]
+        resp = await inner_request(method, url, **kwargs)
+        stdlib_json = resp.json
+
+        def json_fast(**kw: Any) -> Any:
+            # Keyword options (object_hook etc.) are stdlib-specific
+            return stdlib_json(**kw) if kw else codec.loads(resp.content)
+
+        resp.json = json_fast
+        return resp
+
+    client.request = MethodType(request, client)  # type: ignore[assignment]
+
+
+# -----------------------
+# Conditional-GET cache
+# -----------------------
+
+# Request body arguments that make a call unsafe to share between callers
+_BODY_KWARGS = ('content', 'data', 'files', 'json')
+
+
+def _get_key(client: httpx.AsyncClient, method: str, url: str, kwargs: dict) -> Optional[tuple]:
+    """Identify a plain GET by full URL and credentials; None for anything else."""
+    if method.upper() != 'GET' or any(kwargs.get(k) is not None for k in _BODY_KWARGS):
+        return None
+    probe = client.build_request(
+        'GET', url, params=kwargs.get('params'), headers=kwargs.get('headers')
+    )
+    return (
+        str(probe.url),
+        probe.headers.get('Authorization'),
+        probe.headers.get('X-Developer-Key'),
     )
-else:
-    # Curated-only surface (read-only by design)
-    mcp = FastMCP(name='PocketSmith MCP')
 
 
-@mcp.tool(tags={'curated', 'users'})
-async def me() -> dict:
-    """Get the authorised user (GET /me)."""
-    resp = await _client.get('/me')
+def _credential_fingerprint(headers: Any) -> str:
+    """Short stable hash of the auth headers, used to keep per-credential data apart."""
+    secret = headers.get('Authorization') or headers.get('X-Developer-Key') or ''
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()[:16]
+
+
+def _install_http_cache(client: httpx.AsyncClient, cache: HttpCache) -> None:
+    """Revalidate cached GETs on `client` with If-None-Match / If-Modified-Since."""
+    inner_request = client.request
+
+    async def request(self: httpx.AsyncClient, method: str, url: str, **kwargs):  # type: ignore[override]
+        key = _get_key(self, method, url, kwargs)
+        if key is None:
+            return await inner_request(method, url, **kwargs)
+        entry = await cache.get(key)
+        if entry is not None:
+            headers = httpx.Headers(kwargs.get('headers'))
+            headers.update(entry.validators())
+            kwargs = {**kwargs, 'headers': headers}
+        resp = await inner_request(method, url, **kwargs)
+        if resp.status_code == 304 and entry is not None:
+            await cache.touch(key)
+            return entry.to_response(resp.request, resp.headers)
+        cache.misses += 1
+        fresh = CachedResponse.from_response(resp)
+        if fresh is not None:
+            await cache.put(key, fresh)
+        return resp
+
+    # Sits between the retry/rate-limit layer and request coalescing
+    client.request = MethodType(request, client)  # type: ignore[assignment]
+
+
+# -----------------------
+# Request coalescing
+# -----------------------
+
+
+class SingleFlight:
+    """Coalesce identical in-flight requests so they share one upstream call.
+
+    The first caller for a key starts the upstream request as a task; callers that
+    arrive with the same key while it is still running await that task instead of
+    issuing their own. Keys are dropped as soon as the request completes, so this is
+    not a cache: later calls always go upstream.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self.upstream = 0
+        self.coalesced = 0
+
+    async def do(self, key: Any, fn) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.upstream += 1
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.coalesced += 1
+        # Shield so one caller being cancelled doesn't cancel the shared request
+        return await asyncio.shield(task)
+
+    def _done(self, key: Any, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            task.exception()
+
+    def snapshot(self) -> dict:
+        return {
+            'upstream': self.upstream,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._inflight),
+        }
+
+
+def _memoize_json(resp: Any) -> Any:
+    """Make resp.json() parse the body once and hand every caller the same object."""
+    original = resp.json
+    parsed: List[Any] = []
+
+    def json_once(**kwargs: Any) -> Any:
+        if kwargs:
+            return original(**kwargs)
+        if not parsed:
+            parsed.append(original())
+        return parsed[0]
+
+    resp.json = json_once
+    return resp
+
+
+def _install_single_flight(client: httpx.AsyncClient, flight: SingleFlight) -> None:
+    """Route GETs on `client` through `flight`, keyed by full URL and credentials."""
+    inner_request = client.request
+
+    async def request(self: httpx.AsyncClient, method: str, url: str, **kwargs):  # type: ignore[override]
+        key = _get_key(self, method, url, kwargs)
+        if key is None:
+            return await inner_request(method, url, **kwargs)
+
+        async def fetch():
+            return _memoize_json(await inner_request(method, url, **kwargs))
+
+        return await flight.do(key, fetch)
+
+    # Installed outermost so coalesced callers don't take rate-limit tokens
+    client.request = MethodType(request, client)  # type: ignore[assignment]
+
+
+# -----------------------
+# Pagination
+# -----------------------
+
+
+def _parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    """Parse an RFC 8288 Link header into a {rel: url} mapping."""
+    links: Dict[str, str] = {}
+    if not value:
+        return links
+    for part in value.split(','):
+        segments = part.split(';')
+        target = segments[0].strip()
+        if not (target.startswith('<') and target.endswith('>')):
+            continue
+        for seg in segments[1:]:
+            key, _, val = seg.strip().partition('=')
+            if key.strip().lower() != 'rel':
+                continue
+            for rel in val.strip().strip('"').split():
+                links[rel.lower()] = target[1:-1]
+    return links
+
+
+def _page_from_url(url: Optional[str]) -> Optional[int]:
+    """Extract the integer `page` query parameter from a URL, if present."""
+    if not url:
+        return None
+    values = parse_qs(urlsplit(url).query).get('page') or []
+    try:
+        return int(values[0]) if values else None
+    except ValueError:
+        return None
+
+
+def _total_pages(headers: Any) -> Optional[int]:
+    """Work out how many pages a paginated response spans.
+
+    Prefers the Link rel="last" page number and falls back to Total / Per-Page.
+    Returns None when the headers do not advertise a page count.
+    """
+    last = _page_from_url(_parse_link_header(headers.get('Link')).get('last'))
+    if last is not None:
+        return max(1, last)
+    try:
+        total = int(headers.get('Total'))
+        per_page = int(headers.get('Per-Page'))
+    except (TypeError, ValueError):
+        return None
+    if per_page <= 0:
+        return None
+    return max(1, -(-total // per_page))
+
+
+async def _bounded_in_order(
+    factories: Iterable[Callable[[], Awaitable[Any]]], limit: int
+) -> AsyncIterator[Any]:
+    """Run the factories at most `limit` ahead of the consumer, yielding results in order.
+
+    Only `limit` results are ever in flight or waiting to be consumed, so memory stays
+    bounded however many factories there are. Unconsumed tasks are cancelled if the
+    consumer stops early.
+    """
+    remaining = iter(factories)
+    pending: Deque[asyncio.Future] = deque()
+    try:
+        for factory in itertools.islice(remaining, max(1, limit)):
+            pending.append(asyncio.ensure_future(factory()))
+        while pending:
+            result = await pending.popleft()
+            factory = next(remaining, None)
+            if factory is not None:
+                pending.append(asyncio.ensure_future(factory()))
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _iter_pages(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[int] = None,
+) -> AsyncIterator[List[dict]]:
+    """Yield every page of a paginated list endpoint, in page order.
+
+    The first page is fetched on its own to learn the page count from the Link/Total
+    headers; the remaining pages are then fetched at most `concurrency` (default
+    ServerConfig.page_concurrency) ahead of the consumer. If the response only
+    advertises a rel="next" link, pages are followed one at a time instead.
+    """
+    base: Dict[str, Any] = dict(params or {})
+    state = _state()
+
+    async def fetch(page: int) -> tuple[List[dict], Any]:
+        resp = await state.client.get(path, params={**base, 'page': page} if page > 1 else base)
+        resp.raise_for_status()
+        return resp.json() or [], resp.headers
+
+    rows, headers = await fetch(1)
+    yield rows
+    pages = _total_pages(headers)
+
+    if pages is None:
+        # No page count advertised; follow rel="next" until it disappears.
+        page = 1
+        next_url = _parse_link_header(headers.get('Link')).get('next')
+        while next_url and rows:
+            page = _page_from_url(next_url) or page + 1
+            rows, headers = await fetch(page)
+            yield rows
+            next_url = _parse_link_header(headers.get('Link')).get('next')
+        return
+
+    factories = [functools.partial(fetch, p) for p in range(2, pages + 1)]
+    async for chunk, _ in _bounded_in_order(
+        factories, concurrency or state.config.page_concurrency
+    ):
+        yield chunk
+
+
+async def _fetch_pages(
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    concurrency: Optional[int] = None,
+) -> List[dict]:
+    """Fetch every page of a paginated list endpoint and return rows in page order."""
+    out: List[dict] = []
+    async for rows in _iter_pages(path, params, concurrency):
+        out.extend(rows)
+    return out
+
+
+# -----------------------
+# Date-window sharding
+# -----------------------
+
+
+async def _iter_sharded(path: str, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+    """Yield a date-ranged list as month-aligned windows, newest window first.
+
+    Windows of `shard_months` are fetched at most `shard_concurrency` ahead of the
+    consumer (see ServerConfig), and only the first copy of
+    any transaction id seen in more than one window is kept. While the rate limiter is
+    pacing, windows are fetched one at a time since parallel windows would only queue
+    behind it. Ranges that fit one window are streamed page by page.
+    """
+    state = _state()
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    windows: List[Tuple[str, str]] = []
+    if start_date and end_date:
+        try:
+            windows = date_windows(start_date, end_date, state.config.shard_months)
+        except ValueError:
+            pass
+    if len(windows) <= 1:
+        async for rows in _iter_pages(path, params):
+            yield rows
+        return
+
+    factories = [
+        functools.partial(_fetch_pages, path, {**params, 'start_date': lo, 'end_date': hi})
+        for lo, hi in windows
+    ]
+    limit = 1 if state.rate_limiter.pacing() else state.config.shard_concurrency
+    seen: set = set()
+    async for rows in _bounded_in_order(factories, limit):
+        fresh: List[dict] = []
+        for row in rows:
+            tx_id = row.get('id')
+            if tx_id is not None:
+                if tx_id in seen:
+                    continue
+                seen.add(tx_id)
+            fresh.append(row)
+        yield fresh
+
+
+async def _fetch_sharded(path: str, params: Dict[str, Any]) -> List[dict]:
+    """Collect `_iter_sharded` into one list (newest window first)."""
+    out: List[dict] = []
+    async for rows in _iter_sharded(path, params):
+        out.extend(rows)
+    return out
+
+
+# -----------------------
+# Date-range segment cache
+# -----------------------
+
+
+def _segment_source(
+    path: str, params: Dict[str, Any]
+) -> Optional[Tuple[SegmentCache, Hashable, FetchWindow]]:
+    """The segment cache, key and window fetcher for a cacheable request, else None.
+
+    Only requests with both start_date and end_date (and no updated_since) are
+    cacheable; the cache key is the path plus every non-date filter.
+    """
+    cache = _state().segment_cache
+    if (
+        cache is None
+        or not params.get('start_date')
+        or not params.get('end_date')
+        or 'updated_since' in params
+    ):
+        return None
+    filters = {k: v for k, v in params.items() if k not in ('start_date', 'end_date')}
+
+    async def fetch_window(start: str, end: str) -> List[dict]:
+        return await _fetch_sharded(path, {**filters, 'start_date': start, 'end_date': end})
+
+    return cache, (path, tuple(sorted(filters.items()))), fetch_window
+
+
+async def _fetch_date_range(path: str, params: Dict[str, Any]) -> List[dict]:
+    """Fetch a paginated transaction list, serving whole months from the segment cache."""
+    source = _segment_source(path, params)
+    if source is None:
+        return await _fetch_sharded(path, params)
+    cache, key, fetch_window = source
+    try:
+        return await cache.fetch(key, params['start_date'], params['end_date'], fetch_window)
+    except ValueError:
+        # Not plain YYYY-MM-DD dates; let the API interpret them
+        return await _fetch_pages(path, params)
+
+
+async def _iter_date_range(path: str, params: Dict[str, Any]) -> AsyncIterator[List[dict]]:
+    """Stream a transaction list in batches for incremental aggregation.
+
+    Cacheable ranges come from the segment cache one month at a time (newest first).
+    Uncached months are fetched `shard_months` at a time, at most `shard_concurrency`
+    windows ahead, and are kept in the cache, which POCKETSMITH_SEGMENT_CACHE_ROWS
+    caps. Everything else is streamed a page or window at a time.
+    """
+    source = _segment_source(path, params)
+    if source is not None:
+        cache, key, fetch_window = source
+        try:
+            months = cache.stream(key, params['start_date'], params['end_date'], fetch_window)
+        except ValueError:
+            pass
+        else:
+            async for rows in months:
+                yield rows
+            return
+    async for rows in _iter_sharded(path, params):
+        yield rows
+
+
+# -----------------------
+# Local mirror (opt-in)
+# -----------------------
+
+
+async def _sync_mirror(mirror: TransactionMirror, user_id: int) -> None:
+    """Bring the mirror up to date for user_id.
+
+    The first sync (and a periodic full reload) downloads everything; later syncs only
+    fetch transactions changed since the last cursor, plus a fresh listing of the last
+    `mirror.reconcile_days` so that recently deleted transactions are dropped.
+    """
+    started = time.time()
+    full = mirror.needs_full_sync(user_id)
+    client = _state().client
+    recent: Optional[Tuple[str, str]] = None
+    fetches: List[Awaitable[Any]] = [
+        _fetch_transactions(user_id, updated_since=None if full else mirror.cursor(user_id)),
+        client.get(f'/users/{user_id}/categories'),
+        client.get(f'/users/{user_id}/accounts'),
+    ]
+    if not full:
+        today = date.fromtimestamp(started)
+        recent = ((today - timedelta(days=mirror.reconcile_days)).isoformat(), today.isoformat())
+        # Straight from upstream: a stale cached segment would look like deletions
+        fetches.append(
+            _fetch_sharded(
+                f'/users/{user_id}/transactions',
+                {'start_date': recent[0], 'end_date': recent[1]},
+            )
+        )
+    txns, categories_resp, accounts_resp, *listed = await asyncio.gather(*fetches)
+    categories_resp.raise_for_status()
+    accounts_resp.raise_for_status()
+    mirror.apply_sync(
+        user_id,
+        started,
+        txns + (listed[0] if listed else []),
+        categories_resp.json() or [],
+        accounts_resp.json() or [],
+        full=full,
+    )
+    if recent is not None:
+        ids = [t.get('id') for t in listed[0] if isinstance(t, dict)]
+        mirror.reconcile(user_id, recent[0], recent[1], ids)
+
+
+async def _ready_mirror(
+    user_id: Optional[int], max_age: Optional[int]
+) -> Optional[TransactionMirror]:
+    """Return the mirror, synced to within max_age seconds, or None if it can't be used.
+
+    max_age defaults to ServerConfig.mirror_max_age; 0 forces an incremental sync.
+    """
+    state = _state()
+    mirror = state.mirror
+    if mirror is None or user_id is None:
+        return None
+    bound = state.config.mirror_max_age if max_age is None else max(0, max_age)
+    age = mirror.age(user_id)
+    if age is None or age > bound or bound == 0:
+        # Concurrent tool calls needing a sync for the same user share one sync
+        await state.mirror_flight.do(user_id, lambda: _sync_mirror(mirror, user_id))
+    return mirror
+
+
+# -----------------------
+# Reference data cache
+# -----------------------
+
+
+async def _get_json(path: str) -> Any:
+    resp = await _state().client.get(path)
     resp.raise_for_status()
     return resp.json()
 
 
+async def _reference(entity: str, key: Any, path: str) -> Any:
+    """GET `path` through the reference cache, bound to the current credentials."""
+    state = _state()
+    cache = state.ref_cache
+    if cache is None:
+        return await _get_json(path)
+    cache.bind(_credential_fingerprint(state.client.headers))
+    return await cache.get(entity, key, lambda: _get_json(path))
+
+
+async def _invalidate_after_write(state: 'ServerState', method: str, path: str) -> None:
+    """Drop cached data that a successful write to `path` may have changed.
+
+    Shared cache tiers are cleared too, so other workers refetch. Cached transaction
+    months embed category titles and are recategorised by category rules, so category
+    writes clear them as well. A DELETE of one transaction also removes it (and its
+    rollup share) from the local mirror.
+    """
+    if state.mirror is not None and method.upper() == 'DELETE':
+        deleted = re.search(r'/transactions/(\d+)/?$', path)
+        if deleted:
+            state.mirror.delete_transactions(None, [int(deleted.group(1))])
+    ref_cache = state.ref_cache
+    if ref_cache is not None:
+        if 'categor' in path:
+            await ref_cache.forget('categories')
+        if 'account' in path:
+            await ref_cache.forget('accounts')
+            await ref_cache.forget('account')
+        if path.rstrip('/').endswith('/me') or re.search(r'/users/\d+/?$', path):
+            await ref_cache.forget('user')
+        # Budget analyses sum transactions, categories and budget events
+        if re.search(r'transaction|categor|event|budget', path):
+            await ref_cache.forget('trend_analysis')
+            await ref_cache.forget('budget_summary')
+    if state.segment_cache is not None and re.search(r'transactions|categor', path):
+        await state.segment_cache.forget()
+
+
+def _install_write_invalidation(
+    client: httpx.AsyncClient, state: Optional['ServerState'] = None
+) -> None:
+    """Invalidate cached reference data after successful non-GET requests on `client`.
+
+    Invalidates `state`'s caches, or those of the calling server when not given.
+    """
+    inner_request = client.request
+
+    async def request(self: httpx.AsyncClient, method: str, url: str, **kwargs):  # type: ignore[override]
+        resp = await inner_request(method, url, **kwargs)
+        if method.upper() not in ('GET', 'HEAD', 'OPTIONS') and resp.status_code < 400:
+            await _invalidate_after_write(state or _state(), method, urlsplit(str(url)).path)
+        return resp
+
+    client.request = MethodType(request, client)  # type: ignore[assignment]
+
+
+# -----------------------
+# Server state
+# -----------------------
+
+
+def _client_options(config: ServerConfig) -> Dict[str, Any]:
+    """Pool limits, per-phase timeouts and protocol for the upstream httpx client.
+
+    HTTP/2 falls back to HTTP/1.1 (with a warning) when h2 is not installed.
+    """
+    http2 = config.http2 and importlib.util.find_spec('h2') is not None
+    if config.http2 and not http2:
+        print(
+            '[PocketSmith MCP] Warning: POCKETSMITH_HTTP2 is set but h2 is not installed '
+            "(pip install 'pocketsmith-mcp[http2]'); using HTTP/1.1.",
+            file=sys.stderr,
+        )
+    return {
+        'http2': http2,
+        'limits': httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=min(config.max_keepalive_connections, config.max_connections),
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        'timeout': httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.write_timeout,
+            pool=config.pool_timeout,
+        ),
+    }
+
+
+class ServerState:
+    """The HTTP client, caches and rate limiter of one server instance.
+
+    Everything is built from `config`. A `client` passed in is used as is, without the
+    retry/cache layers (tests use this to inject a mock transport).
+    """
+
+    def __init__(self, config: ServerConfig, client: Optional[httpx.AsyncClient] = None):
+        self.config = config
+        headers = config.headers()
+        fingerprint = _credential_fingerprint(headers)
+        cache_dir = config.cache_dir or default_cache_dir()
+        # Second cache tier shared with other workers; keys are namespaced per credential
+        self.cache_backend: Optional[CacheBackend] = None
+        if config.cache_backend != 'memory':
+            self.cache_backend = open_backend(config.cache_backend, cache_dir)
+        namespace = f'pocketsmith:{fingerprint}'
+        # Shared by every request made through the client, including autotools
+        self.rate_limiter = RateLimiter()
+        self.single_flight = SingleFlight()
+        self.mirror_flight = SingleFlight()
+        self.http_cache: Optional[HttpCache] = None
+        if config.http_cache:
+            private = config.http_cache_disk and self.cache_backend is None
+            self.http_cache = HttpCache(
+                max_entries=config.http_cache_size,
+                path=cache_dir / f'http-{fingerprint}.sqlite3' if private else None,
+                backend=self.cache_backend,
+                namespace=f'{namespace}:http',
+            )
+        # On by default; recent months expire after segment_ttl seconds, settled ones
+        # after segment_settled_ttl
+        self.segment_cache: Optional[SegmentCache] = None
+        if config.segment_cache:
+            self.segment_cache = SegmentCache(
+                recent_ttl=config.segment_ttl,
+                settled_ttl=config.segment_settled_ttl,
+                settle_days=config.segment_settle_days,
+                max_segments=config.segment_cache_size,
+                max_rows=config.segment_cache_rows,
+                window_months=config.shard_months,
+                window_concurrency=config.shard_concurrency,
+                backend=self.cache_backend,
+                namespace=f'{namespace}:segments',
+            )
+        # /me, category trees and account lists
+        self.ref_cache: Optional[ReferenceCache] = None
+        if config.refdata_cache:
+            self.ref_cache = ReferenceCache(
+                ttl=config.refdata_ttl,
+                max_entries=config.refdata_cache_size,
+                backend=self.cache_backend,
+                namespace=f'{namespace}:refdata',
+            )
+        # Snapshots behind the cursors of paged list results
+        self.results = ResultStore(
+            page_size=config.result_page_size,
+            max_snapshots=config.result_snapshots,
+            ttl=config.result_ttl,
+            max_rows=config.result_max_rows,
+            backend=self.cache_backend,
+            namespace=f'{namespace}:results',
+        )
+        # user id -> (category tree it was built from, index); rebuilt when the tree is refetched
+        self.category_indexes: Dict[int, Tuple[Any, CategoryIndex]] = {}
+        self.mirror: Optional[TransactionMirror] = None
+        if config.mirror:
+            self.mirror = TransactionMirror(
+                cache_dir / f'mirror-{fingerprint}.sqlite3',
+                full_resync_after=config.mirror_full_resync,
+            )
+        self.http2 = False
+        if client is None:
+            options = _client_options(config)
+            self.http2 = options['http2']
+            client = httpx.AsyncClient(
+                base_url=config.base_url or DEFAULT_BASE_URL, headers=headers, **options
+            )
+            # Innermost first: retries, codec, conditional GETs, coalescing, invalidation
+            _install_retries(client, self.rate_limiter)
+            _install_json_codec(client)
+            if self.http_cache is not None:
+                _install_http_cache(client, self.http_cache)
+            _install_single_flight(client, self.single_flight)
+            _install_write_invalidation(client, self)
+        self.client = client
+        self.closed = False
+        self._warm_up: Optional[asyncio.Future] = None
+
+    async def warm_up(self) -> None:
+        """Open up to `warmup_connections` pooled connections before the first tool call.
+
+        Sends concurrent HEAD /me requests straight through httpx, bypassing retries,
+        caches and the rate limiter; only the connections they leave in the pool matter.
+        Over HTTP/2 a single connection carries every request, so one is enough.
+        """
+        count = 1 if self.http2 else self.config.warmup_connections
+
+        async def probe() -> None:
+            try:
+                await type(self.client).request(self.client, 'HEAD', '/me')
+            except httpx.HTTPError:
+                pass
+
+        await asyncio.gather(*(probe() for _ in range(count)))
+
+    def start_warm_up(self) -> None:
+        """Run `warm_up` in the background once, if enabled."""
+        if self._warm_up is None and self.config.warmup_connections > 0:
+            self._warm_up = asyncio.ensure_future(self.warm_up())
+
+    async def aclose(self) -> None:
+        """Close the client's connection pool and any open cache files."""
+        if self.closed:
+            return
+        self.closed = True
+        if self._warm_up is not None and not self._warm_up.done():
+            self._warm_up.cancel()
+        await self.client.aclose()
+        if self.mirror is not None:
+            self.mirror.close()
+        if self.http_cache is not None:
+            self.http_cache.close()
+        if self.cache_backend is not None:
+            self.cache_backend.close()
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.single_flight.snapshot(),
+            'rate_limiter': self.rate_limiter.snapshot(),
+            'http_cache': self.http_cache.stats() if self.http_cache is not None else None,
+            'reference_data': self.ref_cache.stats() if self.ref_cache is not None else None,
+            'segment_cache': (
+                self.segment_cache.stats() if self.segment_cache is not None else None
+            ),
+            'mirror': self.mirror.stats() if self.mirror is not None else None,
+            'results': self.results.stats(),
+            'cache_backend': (
+                self.cache_backend.stats() if self.cache_backend is not None else None
+            ),
+        }
+
+
+# Used when a tool runs outside a server built by create_server() (e.g. `tool.fn()`)
+_default: Optional[ServerState] = None
+# The calling tenant's state while a multi-tenant server runs a tool
+_tenant: ContextVar[Optional[ServerState]] = ContextVar('pocketsmith_tenant', default=None)
+
+
+def _lifespan_context() -> Any:
+    try:
+        from mcp.server.lowlevel.server import request_ctx
+
+        return request_ctx.get().lifespan_context
+    except (ImportError, LookupError, AttributeError):
+        return None
+
+
+def _state() -> ServerState:
+    """State of the server (or, in multi-tenant mode, the tenant) handling the request.
+
+    Inside a request that is the lifespan context of the server; otherwise a process
+    default built from the environment on first use.
+    """
+    tenant = _tenant.get()
+    if tenant is not None:
+        return tenant
+    state = _lifespan_context()
+    if isinstance(state, ServerState):
+        return state
+    if isinstance(state, TenantPool):
+        # Never fall back to the environment's credentials for a tenant
+        raise PermissionError('No tenant resolved for this request')
+    global _default
+    if _default is None:
+        _default = ServerState(ServerConfig.from_env())
+    return _default
+
+
+def _tenant_pool(config: ServerConfig) -> TenantPool:
+    """A pool of per-tenant states, each built from `config` plus the tenant's credentials."""
+
+    def build(credentials: Credentials) -> ServerState:
+        state = ServerState(
+            dataclasses.replace(
+                config,
+                access_token=credentials.access_token,
+                developer_key=credentials.developer_key,
+                multi_tenant=False,
+            )
+        )
+        state.start_warm_up()
+        return state
+
+    return TenantPool(build, max_tenants=config.max_tenants)
+
+
+class _TenantRouting:
+    """FastMCP middleware that runs each tool call against its caller's tenant state.
+
+    Credentials come from the MCP auth context or the HTTP request headers (see
+    `tenants.request_credentials`); a call without any is refused.
+    """
+
+    async def __call__(self, context: Any, call_next: Callable[[Any], Awaitable[Any]]) -> Any:
+        pool = _lifespan_context()
+        if context.method != 'tools/call' or not isinstance(pool, TenantPool):
+            return await call_next(context)
+        credentials = request_credentials()
+        if credentials is None:
+            raise PermissionError(
+                'PocketSmith credentials required: send Authorization: Bearer <token> '
+                'or X-Developer-Key: <key>'
+            )
+        key = _credential_fingerprint(auth_headers(*credentials))
+        async with pool.lease(key, credentials) as state:
+            token = _tenant.set(state)
+            try:
+                return await call_next(context)
+            finally:
+                _tenant.reset(token)
+
+
+class _ToolListCache:
+    """FastMCP middleware answering tools/list from the last listing of the same tool set.
+
+    The listing is reused while `version` (bumped by `server.add_tool` and
+    `server.remove_tool`) and every tool's `enabled` flag are unchanged, so disabling or
+    re-enabling a tool starts a new listing.
+    """
+
+    def __init__(self, server: FastMCP) -> None:
+        self.server = server
+        self.version = 0
+        self.hits = 0
+        self._tools: Optional[Tuple[int, List[Any]]] = None
+        self._listed: Optional[Tuple[Tuple[Any, ...], List[Any]]] = None
+        for name in ('add_tool', 'remove_tool'):
+            method = getattr(server, name)
+
+            def changed(*args: Any, _method: Callable[..., Any] = method, **kwargs: Any) -> Any:
+                result = _method(*args, **kwargs)
+                self.version += 1
+                return result
+
+            setattr(server, name, changed)
+
+    async def __call__(self, context: Any, call_next: Callable[[Any], Awaitable[Any]]) -> Any:
+        if context.method != 'tools/list':
+            return await call_next(context)
+        version = self.version
+        if self._tools is None or self._tools[0] != version:
+            self._tools = (version, list((await self.server.get_tools()).values()))
+        key = (version, tuple(tool.enabled for tool in self._tools[1]))
+        if self._listed is not None and self._listed[0] == key:
+            self.hits += 1
+            return self._listed[1]
+        tools = await call_next(context)
+        self._listed = (key, tools)
+        return tools
+
+
+class _StateLifespan:
+    """FastMCP lifespan that shares one ServerState between a server's sessions.
+
+    The state is created (and its connections warmed up) when the first session starts
+    and closed when the last one ends. A state passed in up front (the autotools are
+    bound to its client) is pinned: it stays open between sessions, and is closed only
+    when the outermost `serving()` block exits, after which the server can't be used
+    again. Multi-tenant servers share a TenantPool instead.
+    """
+
+    def __init__(self, config: ServerConfig, state: Optional[ServerState] = None):
+        self.config = config
+        self.state: Any = state
+        self.pinned = state is not None
+        self.sessions = 0
+        # Open serving() blocks
+        self.holds = 0
+
+    @asynccontextmanager
+    async def __call__(self, server: Any) -> AsyncIterator[Any]:
+        if self.pinned and self.state.closed:
+            raise RuntimeError('This server was shut down; build a new one with create_server')
+        if self.state is None or self.state.closed:
+            if self.config.multi_tenant:
+                self.state = _tenant_pool(self.config)
+            else:
+                self.state = ServerState(self.config)
+        state = self.state
+        if isinstance(state, ServerState):
+            state.start_warm_up()
+        self.sessions += 1
+        try:
+            yield state
+        finally:
+            self.sessions -= 1
+            if self.sessions == 0 and not self.pinned:
+                await state.aclose()
+
+
+# The state lifespan of every server built by create_server()
+_LIFESPANS: 'weakref.WeakKeyDictionary[Any, _StateLifespan]' = weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def serving(server: FastMCP) -> AsyncIterator[Any]:
+    """Keep `server`'s state open across sessions for the duration of the block.
+
+    Long-running transports (HTTP, stdio) hold this for the life of the process, so
+    caches and pooled connections survive between sessions instead of closing with the
+    last one. When the outermost block exits the state is closed, pinned or not.
+    """
+    lifespan = _LIFESPANS[server]
+    lifespan.holds += 1
+    try:
+        async with lifespan(server) as state:
+            yield state
+    finally:
+        lifespan.holds -= 1
+        if lifespan.holds == 0 and lifespan.sessions == 0 and lifespan.pinned:
+            await lifespan.state.aclose()
+
+
+# Registry of the curated tools below. create_server() adds a copy of each to every
+# server it builds; the tools find their server's client and caches through _state().
+_CURATED_TOOLS: List[Any] = []
+
+
+def _tool(**kwargs: Any) -> Callable[[Callable], Any]:
+    """Make `fn` a curated tool (the arguments of `FastMCP.tool`) for create_server()."""
+
+    def register(fn: Callable) -> Any:
+        tool = Tool.from_function(fn, serializer=codec.dumps, **kwargs)
+        _CURATED_TOOLS.append(tool)
+        return tool
+
+    return register
+
+
+def create_server(config: Optional[ServerConfig] = None) -> FastMCP:
+    """Build a PocketSmith MCP server; `config` defaults to ServerConfig.from_env().
+
+    Each server owns its HTTP client, caches and rate limiter (see `_StateLifespan`),
+    so servers with different credentials can live in one process. A multi-tenant
+    server keeps one such set per caller instead (see `_TenantRouting`).
+    """
+    config = config or ServerConfig.from_env()
+    if config.multi_tenant and config.include_autotools:
+        raise ValueError('Autotools are bound to one client and cannot run multi-tenant')
+    # Only the autotools need the spec; curated-only startup skips loading it
+    spec = load_openapi_spec() if config.include_autotools else None
+    if config.base_url is None:
+        base_url = detect_base_url(spec) if spec is not None else DEFAULT_BASE_URL
+        config = dataclasses.replace(config, base_url=base_url)
+    print(f'PocketSmith MCP mode: {"write" if config.write_mode else "read-only"}', file=sys.stderr)
+    if not config.authenticated and not config.multi_tenant:
+        print(
+            '[PocketSmith MCP] Warning: No POCKETSMITH_ACCESS_TOKEN or '
+            'POCKETSMITH_DEVELOPER_KEY set; API calls may be unauthorized.',
+            file=sys.stderr,
+        )
+
+    if spec is not None:
+        # Selected operations only; write operations need write mode
+        selected = OperationFilter.from_config(config).apply(spec)
+        print(
+            f'PocketSmith MCP autotools: {count_operations(selected)} of '
+            f'{count_operations(spec)} operations',
+            file=sys.stderr,
+        )
+        lifespan = _StateLifespan(config, ServerState(config))
+        server: FastMCP = FastMCP.from_openapi(
+            openapi_spec=selected,
+            client=lifespan.state.client,
+            name='PocketSmith MCP',
+            tool_serializer=codec.dumps,
+            lifespan=lifespan,
+        )
+    else:
+        # Curated-only surface (read-only by design)
+        lifespan = _StateLifespan(config)
+        server = FastMCP(name='PocketSmith MCP', tool_serializer=codec.dumps, lifespan=lifespan)
+    _LIFESPANS[server] = lifespan
+    if config.multi_tenant:
+        server.add_middleware(_TenantRouting())
+    # Copies, so enabling or disabling a tool on one server leaves the others alone
+    for tool in _CURATED_TOOLS:
+        server.add_tool(tool.model_copy())
+    server.add_middleware(_ToolListCache(server))
+    return server
+
+
+@_tool(tags={'curated', 'users'})
+async def me() -> dict:
+    """Get the authorised user (GET /me)."""
+    return await _reference('user', 'me', '/me')
+
+
 # -----------------------
 # Small whitelist of raw GET wrappers (read-only)
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'accounts', 'read'})
+@_tool(tags={'curated', 'accounts', 'read'})
 async def get_account_raw(account_id: int) -> dict:
     """Fetch the raw account payload by ID (GET /accounts/{id})."""
-    resp = await _client.get(f'/accounts/{account_id}')
+    resp = await _state().client.get(f'/accounts/{account_id}')
     resp.raise_for_status()
     return resp.json()
 
 
-@mcp.tool(tags={'curated', 'transactions', 'read'})
-async def get_transaction(transaction_id: int) -> dict:
-    """Fetch a single transaction by ID (GET /transactions/{id})."""
-    resp = await _client.get(f'/transactions/{transaction_id}')
+@_tool(tags={'curated', 'transactions', 'read'})
+async def get_transaction(
+    transaction_id: int, fields: Optional[List[str]] = None, compact: bool = False
+) -> dict:
+    """Fetch a single transaction by ID (GET /transactions/{id}).
+
+    fields / compact: project the payload (see list_transactions).
+    """
+    resp = await _state().client.get(f'/transactions/{transaction_id}')
     resp.raise_for_status()
-    return resp.json()
+    if not fields and not compact:
+        return resp.json()
+    return select([resp.json()], 'transaction', fields, compact)[0]
 
 
 # -----------------------
@@ -245,13 +1347,27 @@ async def get_transaction(transaction_id: int) -> dict:
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'utilities', 'read'})
+@_tool(tags={'curated', 'utilities', 'read'})
+async def client_stats() -> dict:
+    """Report HTTP client and cache statistics for this server instance.
+
+    Response shape:
+    { requests: {upstream, coalesced, in_flight}, rate_limiter, http_cache,
+      reference_data, segment_cache, mirror, results, cache_backend }
+    where `coalesced` counts GETs that were served by an identical in-flight request
+    instead of going upstream, and `http_cache.revalidated` counts 304 answers served
+    from a stored body.
+    """
+    return _state().stats()
+
+
+@_tool(tags={'curated', 'utilities', 'read'})
 async def auth_check() -> dict:
     """Check API auth by fetching the given user id; returns status and rate-limit.
 
     Response shape: { ok, status, rate_limit: {limit, remaining, reset}, user_id }
     """
-    resp = await _client.get('/me')
+    resp = await _state().client.get('/me')
     ok = 200 <= resp.status_code < 300
     rate = {
         'limit': resp.headers.get('X-Rate-Limit-Limit'),
@@ -276,27 +1392,36 @@ async def auth_check() -> dict:
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'accounts'})
-async def get_accounts(user_id: Optional[int] = None) -> List[dict]:
+@_tool(tags={'curated', 'accounts'})
+async def get_accounts(
+    user_id: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    columnar: bool = False,
+) -> Union[List[dict], dict]:
     """List all accounts for the given user.
 
     If user_id is not provided, it will be resolved automatically via GET /me.
+
+    fields: return only these fields; dotted paths reach nested objects
+    (e.g. "primary_transaction_account.institution.title").
+    compact: flat records of id, title, type, currency_code, current_balance and
+    current_balance_date; `fields` then picks among those names.
+    columnar: return { columns, rows } instead of a list of objects.
     """
     user_id = await _resolve_user_id(user_id)
-    resp = await _client.get(f'/users/{user_id}/accounts')
-    resp.raise_for_status()
-    return resp.json()
+    accounts = await _reference('accounts', user_id, f'/users/{user_id}/accounts')
+    rows = select(accounts, 'account', fields, compact)
+    return to_columns(rows) if columnar else rows
 
 
-@mcp.tool(tags={'curated', 'accounts'})
+@_tool(tags={'curated', 'accounts'})
 async def get_account_overview(account_id: int) -> dict:
     """Return a concise overview for an account.
 
     Combines key fields into a compact structure suitable for chat.
     """
-    resp = await _client.get(f'/accounts/{account_id}')
-    resp.raise_for_status()
-    acc = resp.json()
+    acc = await _reference('account', account_id, f'/accounts/{account_id}')
 
     # Best-effort extraction of common fields
     overview = {
@@ -318,7 +1443,7 @@ async def get_account_overview(account_id: int) -> dict:
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'transactions'})
+@_tool(tags={'curated', 'transactions'})
 async def list_transactions(
     user_id: Optional[int] = None,
     start_date: Optional[str] = None,
@@ -327,24 +1452,66 @@ async def list_transactions(
     uncategorised: Optional[int] = None,
     type: Optional[str] = None,
     needs_review: Optional[int] = None,
-) -> List[dict]:
-    """List user transactions with common filters.
+    max_age: Optional[int] = None,
+    page_size: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    columnar: bool = False,
+) -> dict:
+    """List user transactions with common filters, one page at a time.
 
     Dates should be YYYY-MM-DD. updated_since should be ISO8601.
 
     If user_id is not provided, it will be resolved automatically via GET /me.
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
+
+    Response shape: { items, offset, total, next_cursor }. Pass next_cursor to
+    `next_page` for the following rows (page_size defaults to
+    POCKETSMITH_RESULT_PAGE_SIZE); it is null on the last page.
+
+    fields: return only these fields; dotted paths reach nested objects
+    (e.g. "category.title", "transaction_account.id").
+    compact: flat records of id, date, payee, amount, category_id, category_title and
+    account_id, typically 5-10x smaller; `fields` then picks among those names.
+    columnar: pages come back as { columns, rows } (one header, then value arrays)
+    in place of items. next_page keeps the shape chosen here.
     """
     user_id = await _resolve_user_id(user_id)
+    mirror = await _ready_mirror(user_id, max_age) if not updated_since else None
+    if mirror is not None:
+        rows = mirror.transactions(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            uncategorised=uncategorised,
+            tx_type=type,
+            needs_review=needs_review,
+        )
+    else:
+        rows = await _fetch_transactions(
+            user_id=user_id,
+            start_date=start_date,
+            end_date=end_date,
+            updated_since=updated_since,
+            uncategorised=uncategorised,
+            tx_type=type,
+            needs_review=needs_review,
+        )
+    rows = select(rows, 'transaction', fields, compact)
+    return await _state().results.first_page(rows, page_size, columnar)
 
-    return await _fetch_transactions(
-        user_id=user_id,
-        start_date=start_date,
-        end_date=end_date,
-        updated_since=updated_since,
-        uncategorised=uncategorised,
-        tx_type=type,
-        needs_review=needs_review,
-    )
+
+@_tool(tags={'curated', 'utilities', 'read'})
+async def next_page(cursor: str, page_size: Optional[int] = None) -> dict:
+    """Continue a paged list result (list_transactions, list_category_transactions).
+
+    Reads the rows the first call already fetched, without calling the API again.
+    Cursors expire after POCKETSMITH_RESULT_TTL seconds without use; then rerun the
+    original tool. Response shape: { items, offset, total, next_cursor }.
+    """
+    return await _state().results.next_page(cursor, page_size)
 
 
 async def _fetch_transactions(
@@ -359,7 +1526,30 @@ async def _fetch_transactions(
     """Internal helper to fetch transactions without going through the tool wrapper.
 
     Kept separate so curated tools can call it without invoking a decorated FunctionTool.
+    All result pages are fetched (see `_fetch_pages`), not just the first.
     """
+    params = _transaction_params(
+        start_date, end_date, updated_since, uncategorised, tx_type, needs_review
+    )
+    return await _fetch_date_range(f'/users/{user_id}/transactions', params)
+
+
+def _iter_transactions(
+    user_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> AsyncIterator[List[dict]]:
+    """Stream a user's transactions page by page (see `_iter_date_range`)."""
+    params = _transaction_params(start_date, end_date)
+    return _iter_date_range(f'/users/{user_id}/transactions', params)
+
+
+def _transaction_params(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    updated_since: Optional[str] = None,
+    uncategorised: Optional[int] = None,
+    tx_type: Optional[str] = None,
+    needs_review: Optional[int] = None,
+) -> Dict[str, Any]:
     params: Dict[str, Any] = {}
     if start_date:
         params['start_date'] = start_date
@@ -373,10 +1563,22 @@ async def _fetch_transactions(
         params['type'] = tx_type
     if needs_review is not None:
         params['needs_review'] = needs_review
+    return params
 
-    resp = await _client.get(f'/users/{user_id}/transactions', params=params)
-    resp.raise_for_status()
-    return resp.json()
+
+def _to_records(rows: List[dict]) -> List[Transaction]:
+    """Normalise raw API transaction payloads once, for the report helpers."""
+    return [Transaction.from_api(t) for t in rows if isinstance(t, dict)]
+
+
+async def _aggregate(
+    pages: AsyncIterator[List[dict]], *groupings: Sequence[str]
+) -> GroupAccumulator:
+    """Fold a page stream into running group totals, one page in memory at a time."""
+    acc = GroupAccumulator(*groupings)
+    async for rows in pages:
+        acc.add(_to_records(rows))
+    return acc
 
 
 async def _resolve_user_id(user_id: Optional[int]) -> int:
@@ -386,9 +1588,7 @@ async def _resolve_user_id(user_id: Optional[int]) -> int:
     """
     if user_id is not None:
         return user_id
-    me_resp = await _client.get('/me')
-    me_resp.raise_for_status()
-    me_body = me_resp.json() or {}
+    me_body = await _reference('user', 'me', '/me') or {}
     resolved = me_body.get('id')
     if not isinstance(resolved, int):
         raise RuntimeError('Unable to resolve user_id from /me response')
@@ -400,30 +1600,28 @@ async def _resolve_user_id(user_id: Optional[int]) -> int:
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'categories', 'read'})
+@_tool(tags={'curated', 'categories', 'read'})
 async def list_categories(user_id: Optional[int] = None) -> List[dict]:
     """List all categories for a user.
 
     If user_id is not provided, it will be resolved automatically via GET /me.
     """
     user_id = await _resolve_user_id(user_id)
-    resp = await _client.get(f'/users/{user_id}/categories')
-    resp.raise_for_status()
-    return resp.json()
+    return await _reference('categories', user_id, f'/users/{user_id}/categories')
 
 
-@mcp.tool(tags={'curated', 'categories', 'read'})
+@_tool(tags={'curated', 'categories', 'read'})
 async def get_category(category_id: int) -> dict:
     """Get category details by ID."""
-    resp = await _client.get(f'/categories/{category_id}')
+    resp = await _state().client.get(f'/categories/{category_id}')
     resp.raise_for_status()
     return resp.json()
 
 
-@mcp.tool(tags={'curated', 'categories', 'read'})
+@_tool(tags={'curated', 'categories', 'read'})
 async def get_category_rules(category_id: int) -> List[dict]:
     """List rules for a category (if any)."""
-    resp = await _client.get(f'/categories/{category_id}/category_rules')
+    resp = await _state().client.get(f'/categories/{category_id}/category_rules')
     # Some categories may have no rules; the API may return 404 in that case.
     if resp.status_code == 404:
         return []
@@ -431,132 +1629,364 @@ async def get_category_rules(category_id: int) -> List[dict]:
     return resp.json()
 
 
+async def _category_index(user_id: int) -> CategoryIndex:
+    """The user's category hierarchy index, built once per fetched category tree."""
+    tree = await _reference('categories', user_id, f'/users/{user_id}/categories')
+    state = _state()
+    cached = state.category_indexes.get(user_id)
+    if cached is None or cached[0] is not tree:
+        cached = state.category_indexes[user_id] = (tree, CategoryIndex(tree))
+    return cached[1]
+
+
+async def _rollup_index(user_id: int, rollup_depth: Optional[int]) -> Optional[CategoryIndex]:
+    """The index for a report's rollup_depth (None when not rolling up)."""
+    if rollup_depth is None:
+        return None
+    if rollup_depth < 1:
+        raise ValueError('rollup_depth must be at least 1 (1 = top-level categories)')
+    return await _category_index(user_id)
+
+
 async def _fetch_category_transactions(
     category_id: int,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
 ) -> List[dict]:
-    """Internal helper to fetch transactions for a category without tool wrapper."""
-    params: Dict[str, Any] = {}
-    if start_date:
-        params['start_date'] = start_date
-    if end_date:
-        params['end_date'] = end_date
-    resp = await _client.get(f'/categories/{category_id}/transactions', params=params)
-    resp.raise_for_status()
-    return resp.json()
+    """Internal helper to fetch all pages of a category's transactions without tool wrapper."""
+    params = _transaction_params(start_date, end_date)
+    return await _fetch_date_range(f'/categories/{category_id}/transactions', params)
+
+
+def _iter_category_transactions(
+    category_id: int, start_date: Optional[str] = None, end_date: Optional[str] = None
+) -> AsyncIterator[List[dict]]:
+    """Stream a category's transactions page by page (see `_iter_date_range`)."""
+    params = _transaction_params(start_date, end_date)
+    return _iter_date_range(f'/categories/{category_id}/transactions', params)
 
 
-@mcp.tool(tags={'curated', 'categories', 'transactions', 'read'})
+@_tool(tags={'curated', 'categories', 'transactions', 'read'})
 async def list_category_transactions(
     category_id: int,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-) -> List[dict]:
-    """List transactions for a category with optional date range (YYYY-MM-DD)."""
-    return await _fetch_category_transactions(category_id, start_date, end_date)
+    page_size: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    compact: bool = False,
+    columnar: bool = False,
+) -> dict:
+    """List transactions for a category with optional date range (YYYY-MM-DD).
+
+    Paged and projected like list_transactions: { items, offset, total, next_cursor };
+    continue with `next_page`.
+    """
+    rows = await _fetch_category_transactions(category_id, start_date, end_date)
+    rows = select(rows, 'transaction', fields, compact)
+    return await _state().results.first_page(rows, page_size, columnar)
 
 
-@mcp.tool(tags={'curated', 'reports', 'categories', 'read'})
+@_tool(tags={'curated', 'reports', 'categories', 'read'})
 async def category_spend_summary(
     category_id: int,
     start_date: str,
     end_date: str,
+    max_age: Optional[int] = None,
+    include_subcategories: bool = False,
+    user_id: Optional[int] = None,
 ) -> dict:
     """Summarize spending for a single category over a period.
 
     Returns {category_id, total, count}.
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
+
+    include_subcategories: add the spend of every descendant category, plus a
+    `breakdown` of {category_id, category, total, count} per category with spend.
+    Uses one fetch of the user's transactions (user_id resolved via GET /me when
+    omitted) rather than one per subcategory.
     """
-    txns = await _fetch_category_transactions(
-        category_id=category_id, start_date=start_date, end_date=end_date
-    )
-    total = 0.0
-    count = 0
-    for t in txns:
-        amount = _parse_amount(t)
-        if amount is None:
-            continue
-        total += amount
-        count += 1
+    if include_subcategories:
+        return await _subtree_spend_summary(category_id, start_date, end_date, max_age, user_id)
+    cached = _state().mirror
+    owner = cached.category_owner(category_id) if cached is not None else None
+    mirror = await _ready_mirror(owner, max_age)
+    if mirror is not None:
+        groups = mirror.totals(category_id=category_id, start_date=start_date, end_date=end_date)
+    else:
+        pages = _iter_category_transactions(category_id, start_date, end_date)
+        groups = (await _aggregate(pages, ())).groups()
+    total, count = (groups[0][1], groups[0][2]) if groups else (0.0, 0)
     return {'category_id': category_id, 'total': total, 'count': count}
 
 
+async def _subtree_spend_summary(
+    category_id: int,
+    start_date: str,
+    end_date: str,
+    max_age: Optional[int],
+    user_id: Optional[int],
+) -> dict:
+    user_id = await _resolve_user_id(user_id)
+    index = await _category_index(user_id)
+    by = ('category_id', 'category')
+    mirror = await _ready_mirror(user_id, max_age)
+    if mirror is not None:
+        groups = mirror.totals(user_id, start_date=start_date, end_date=end_date, by=by)
+    else:
+        pages = _iter_transactions(user_id, start_date, end_date)
+        groups = (await _aggregate(pages, by)).groups()
+    groups = index.within(groups, category_id)
+    breakdown = [
+        {'category_id': cid, 'category': title, 'total': total, 'count': count}
+        for (cid, title), total, count in groups
+    ]
+    breakdown.sort(key=lambda x: abs(x['total']), reverse=True)
+    return {
+        'category_id': category_id,
+        'total': sum(row['total'] for row in breakdown),
+        'count': sum(row['count'] for row in breakdown),
+        'breakdown': breakdown,
+    }
+
+
 # -----------------------
-# Curated Reports tools
+# Budget aggregates
 # -----------------------
 
 
-@mcp.tool(tags={'curated', 'reports', 'read'})
-async def top_spending_categories(
+def _aggregate_params(start_date: str, end_date: str, period: str, interval: int) -> Dict[str, Any]:
+    if period not in aggregates.PERIODS:
+        raise ValueError(f'period must be one of {list(aggregates.PERIODS)}')
+    if interval < 1:
+        raise ValueError('interval must be at least 1')
+    return {'period': period, 'interval': interval, 'start_date': start_date, 'end_date': end_date}
+
+
+async def _fetch_trend_analysis(
+    user_id: int,
+    start_date: str,
+    end_date: str,
+    period: str = 'months',
+    interval: int = 1,
+    category_ids: Optional[List[int]] = None,
+    scenario_ids: Optional[List[int]] = None,
+) -> Optional[List[dict]]:
+    """Trend analysis packages, cached per (period, interval, range, categories, scenarios).
+
+    Categories and scenarios default to all of the user's (from the reference cache).
+    Returns None when there is nothing to analyse (no categories or no scenarios).
+    """
+    params = _aggregate_params(start_date, end_date, period, interval)
+    if category_ids is None:
+        tree = await _reference('categories', user_id, f'/users/{user_id}/categories')
+        flat = aggregates.flatten_categories(tree)
+        category_ids = [c['id'] for c in flat if isinstance(c.get('id'), int)]
+    if scenario_ids is None:
+        accounts = await _reference('accounts', user_id, f'/users/{user_id}/accounts')
+        scenario_ids = aggregates.scenario_ids(accounts)
+    if not category_ids or not scenario_ids:
+        return None
+    params['categories'] = ','.join(str(i) for i in sorted(set(category_ids)))
+    params['scenarios'] = ','.join(str(i) for i in sorted(set(scenario_ids)))
+    key = (user_id, *params.values())
+    path = f'/users/{user_id}/trend_analysis?{urlencode(params)}'
+    return await _reference('trend_analysis', key, path) or []
+
+
+async def _fetch_budget_summary(
+    user_id: int, start_date: str, end_date: str, period: str = 'months', interval: int = 1
+) -> List[dict]:
+    """Budget summary packages, cached per (period, interval, range)."""
+    params = _aggregate_params(start_date, end_date, period, interval)
+    key = (user_id, *params.values())
+    path = f'/users/{user_id}/budget_summary?{urlencode(params)}'
+    return await _reference('budget_summary', key, path) or []
+
+
+async def _planned_groups(
+    user_id: int,
     start_date: str,
     end_date: str,
+    by: Sequence[str],
+    source: str,
+    counts: bool = False,
+) -> Optional[List[Group]]:
+    """Monthly trend_analysis groups when the planner picks aggregates, else None.
+
+    Uncategorised spend is added from a download filtered to uncategorised
+    transactions. In auto mode aggregates are only used where they match a transaction
+    sum: an enabled mirror wins, every account must share the analysis currency, and
+    per-category groupings must not involve roll-up categories. None (so the caller
+    sums transactions) also when the user has no categories or scenarios.
+    """
+    state = _state()
+    if source == 'auto' and (state.mirror is not None or not state.config.aggregates):
+        source = 'transactions'
+    min_months = state.config.aggregate_min_months
+    if not aggregates.plan(source, start_date, end_date, by, min_months, counts):
+        return None
+    exact = source == 'auto'
+    tree, accounts = await asyncio.gather(
+        _reference('categories', user_id, f'/users/{user_id}/categories'),
+        _reference('accounts', user_id, f'/users/{user_id}/accounts'),
+    )
+    category_ids, rolled_up = aggregates.analysed_categories(tree)
+    currency = aggregates.account_currency(accounts)
+    if exact and (currency is None or (rolled_up and set(by) != {'month'})):
+        return None
+    packages = await _fetch_trend_analysis(
+        user_id,
+        start_date,
+        end_date,
+        category_ids=category_ids,
+        scenario_ids=aggregates.scenario_ids(accounts),
+    )
+    if packages is None or (exact and aggregates.currencies(packages) - {currency}):
+        return None
+    uncategorised = await _fetch_transactions(user_id, start_date, end_date, uncategorised=1)
+    acc = GroupAccumulator(by)
+    acc.add(_to_records(uncategorised))
+    # Counts are unknown for the aggregated part, so none are reported
+    extra = [(labels, total, None) for labels, total, _ in acc.groups()]
+    return aggregates.merge(aggregates.groups(packages, by), extra)
+
+
+@_tool(tags={'curated', 'reports', 'budgets', 'read'})
+async def trend_analysis(
+    start_date: str,
+    end_date: str,
+    category_ids: Optional[List[int]] = None,
+    scenario_ids: Optional[List[int]] = None,
+    period: str = 'months',
+    interval: int = 1,
     user_id: Optional[int] = None,
-    limit: int = 10,
 ) -> List[dict]:
-    """Top categories by absolute spend over a period.
+    """Income and expense analysis per category, aggregated by PocketSmith.
 
-    Returns list of {category, total, count} sorted by |total| desc.
+    period: 'weeks' | 'months' | 'years'; interval: periods per bucket (e.g. 2 weeks).
+    The API widens the range to whole periods. category_ids and scenario_ids default to
+    all of the user's categories and account scenarios.
+
+    Returns one entry per category: {category_id, category, is_transfer, expense,
+    income}, where expense/income hold the totals and per-period actual_amount,
+    forecast_amount, refund_amount, over_by, under_by and percentage_used. Actuals
+    are signed like transactions (spend is negative).
     """
     user_id = await _resolve_user_id(user_id)
-    txns = await _fetch_transactions(user_id, start_date=start_date, end_date=end_date)
-    groups: Dict[str, Dict[str, Any]] = defaultdict(lambda: {'total': 0.0, 'count': 0})
-    for t in txns:
-        amount = _parse_amount(t)
-        if amount is None:
-            continue
+    packages = await _fetch_trend_analysis(
+        user_id, start_date, end_date, period, interval, category_ids, scenario_ids
+    )
+    return aggregates.summarize(packages or [])
+
 
-        cat = t.get('category') or {}
-        key = (cat or {}).get('title') if isinstance(cat, dict) else None
-        key = key or t.get('category_name') or '(uncategorised)'
+@_tool(tags={'curated', 'reports', 'budgets', 'read'})
+async def budget_summary(
+    start_date: str,
+    end_date: str,
+    period: str = 'months',
+    interval: int = 1,
+    user_id: Optional[int] = None,
+) -> List[dict]:
+    """Whole-budget income and expense analysis, like PocketSmith's Budget page.
+
+    Covers every category except transfers. period and interval as for trend_analysis;
+    returns entries shaped like trend_analysis's.
+    """
+    user_id = await _resolve_user_id(user_id)
+    packages = await _fetch_budget_summary(user_id, start_date, end_date, period, interval)
+    return aggregates.summarize(packages)
+
+
+# -----------------------
+# Curated Reports tools
+# -----------------------
 
-        g = groups[str(key)]
-        g['total'] += amount
-        g['count'] += 1
 
-    result = [{'category': k, 'total': v['total'], 'count': v['count']} for k, v in groups.items()]
+def _ranked(groups: List[Group], label: str, limit: int) -> List[dict]:
+    """Format single-key groups as {label, total, count}, largest |total| first."""
+    result = [{label: k, 'total': total, 'count': count} for (k,), total, count in groups]
     result.sort(key=lambda x: abs(x['total']), reverse=True)
     return result[: max(0, limit)]
 
 
-@mcp.tool(tags={'curated', 'reports', 'read'})
+@_tool(tags={'curated', 'reports', 'read'})
+async def top_spending_categories(
+    start_date: str,
+    end_date: str,
+    user_id: Optional[int] = None,
+    limit: int = 10,
+    max_age: Optional[int] = None,
+    source: str = 'transactions',
+    rollup_depth: Optional[int] = None,
+) -> List[dict]:
+    """Top categories by absolute spend over a period.
+
+    Returns list of {category, total, count} sorted by |total| desc.
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
+
+    source: 'transactions' (default) sums the transactions. 'aggregate' sums
+    PocketSmith's trend analysis for a range from the 1st of a month to a month end
+    instead (plus a download of uncategorised transactions only); count is then null,
+    and amounts are in the budget currency. 'auto' uses transactions, since this report
+    needs counts.
+
+    rollup_depth: fold subcategories into their ancestor at this depth of the category
+    tree (1 = top-level categories) before ranking.
+    """
+    user_id = await _resolve_user_id(user_id)
+    index = await _rollup_index(user_id, rollup_depth)
+    by = ('category',) if index is None else ('category_id', 'category')
+    groups = await _planned_groups(user_id, start_date, end_date, by, source, counts=True)
+    if groups is None:
+        mirror = await _ready_mirror(user_id, max_age)
+        if mirror is not None:
+            groups = mirror.totals(user_id, start_date=start_date, end_date=end_date, by=by)
+        else:
+            pages = _iter_transactions(user_id, start_date, end_date)
+            groups = (await _aggregate(pages, by)).groups()
+    if index is not None:
+        groups = index.roll_up(groups, rollup_depth)  # type: ignore[arg-type]
+    return _ranked(groups, 'category', limit)
+
+
+@_tool(tags={'curated', 'reports', 'read'})
 async def top_spending_payees(
     start_date: str,
     end_date: str,
     user_id: Optional[int] = None,
     limit: int = 10,
+    max_age: Optional[int] = None,
 ) -> List[dict]:
     """Top payees by absolute spend over a period.
 
     Returns list of {payee, total, count} sorted by |total| desc.
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
     """
     user_id = await _resolve_user_id(user_id)
-    txns = await _fetch_transactions(user_id, start_date=start_date, end_date=end_date)
-    groups: Dict[str, Dict[str, Any]] = defaultdict(lambda: {'total': 0.0, 'count': 0})
-    for t in txns:
-        amt = t.get('amount') or t.get('amount_cents')
-        try:
-            amount = float(amt) if isinstance(amt, (int, float, str)) else None
-        except ValueError:
-            amount = None
-        if amount is None:
-            continue
-
-        key = t.get('payee') or t.get('payee_name') or t.get('merchant') or '(unknown)'
-        g = groups[str(key)]
-        g['total'] += amount
-        g['count'] += 1
-
-    result = [{'payee': k, 'total': v['total'], 'count': v['count']} for k, v in groups.items()]
-    result.sort(key=lambda x: abs(x['total']), reverse=True)
-    return result[: max(0, limit)]
+    mirror = await _ready_mirror(user_id, max_age)
+    if mirror is not None:
+        groups = mirror.totals(user_id, start_date=start_date, end_date=end_date, by=('payee',))
+    else:
+        pages = _iter_transactions(user_id, start_date, end_date)
+        groups = (await _aggregate(pages, ('payee',))).groups()
+    return _ranked(groups, 'payee', limit)
 
 
-@mcp.tool(tags={'curated', 'reports', 'read'})
+@_tool(tags={'curated', 'reports', 'read'})
 async def monthly_spend_trend(
     start_date: str,
     end_date: str,
     group_by: str = 'total',
     user_id: Optional[int] = None,
+    max_age: Optional[int] = None,
+    source: str = 'auto',
+    rollup_depth: Optional[int] = None,
 ) -> List[dict]:
     """Monthly spend trend between start_date and end_date.
 
@@ -564,70 +1994,113 @@ async def monthly_spend_trend(
     - total: sum per YYYY-MM
     - category: sum per YYYY-MM per category
     - payee: sum per YYYY-MM per payee
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
+
+    source: 'auto' | 'aggregate' | 'transactions'. For total and category trends over
+    long ranges running from the 1st of a month to a month end, auto sums
+    PocketSmith's trend analysis in one call, plus a download of uncategorised
+    transactions only, when that matches a transaction sum (one currency across
+    accounts; no roll-up categories for a per-category trend); otherwise it sums the
+    transactions. 'aggregate' always uses the analysis, 'transactions' never.
+
+    rollup_depth: with group_by='category', fold subcategories into their ancestor at
+    this depth of the category tree (1 = top-level categories).
     """
     user_id = await _resolve_user_id(user_id)
-    txns = await _fetch_transactions(user_id, start_date=start_date, end_date=end_date)
+    key = group_by if group_by in ('category', 'payee') else None
+    if rollup_depth is not None and key != 'category':
+        raise ValueError("rollup_depth needs group_by='category'")
+    index = await _rollup_index(user_id, rollup_depth)
+    by = ('month',) if key is None else ('month', key)
+    if index is not None:
+        by = ('month', 'category_id', 'category')
+    groups = await _planned_groups(user_id, start_date, end_date, by, source)
+    if groups is None:
+        mirror = await _ready_mirror(user_id, max_age)
+        if mirror is not None:
+            groups = mirror.totals(user_id, start_date=start_date, end_date=end_date, by=by)
+        else:
+            pages = _iter_transactions(user_id, start_date, end_date)
+            groups = (await _aggregate(pages, by)).groups()
+    if index is not None:
+        groups = index.roll_up(groups, rollup_depth, id_at=1, title_at=2)  # type: ignore[arg-type]
+
+    if key is None:
+        result = [{'month': m, 'total': total} for (m,), total, _ in groups]
+        result.sort(key=lambda x: x['month'])
+        return result
+
+    out = [{'month': m, key: k, 'total': total} for (m, k), total, _ in groups]
+    out.sort(key=lambda x: (x['month'], -abs(x['total'])))
+    return out
 
-    def month_key(s: Optional[str]) -> Optional[str]:
-        if not s:
-            return None
-        try:
-            return datetime.fromisoformat(s[:10]).strftime('%Y-%m')
-        except Exception:
-            return None
 
-    if group_by == 'category':
-        groups: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        for t in txns:
-            m = month_key(t.get('date') or t.get('transaction_date') or t.get('created_at'))
-            if not m:
-                continue
-            amount = _parse_amount(t)
-            if amount is None:
-                continue
-            cat = t.get('category') or {}
-            key = (cat or {}).get('title') if isinstance(cat, dict) else None
-            key = key or t.get('category_name') or '(uncategorised)'
-            groups[m][str(key)] += amount
-        # flatten
-        out: List[dict] = []
-        for m, cats in groups.items():
-            for k, total in cats.items():
-                out.append({'month': m, 'category': k, 'total': total})
-        out.sort(key=lambda x: (x['month'], -abs(x['total'])))
-        return out
+@_tool(tags={'curated', 'reports', 'read'})
+async def spending_dashboard(
+    start_date: str,
+    end_date: str,
+    user_id: Optional[int] = None,
+    category_limit: int = 10,
+    payee_limit: int = 10,
+    per_month_limit: int = 5,
+    max_age: Optional[int] = None,
+) -> dict:
+    """Combined spending overview for a period from a single fetch.
 
-    if group_by == 'payee':
-        groups2: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
-        for t in txns:
-            m = month_key(t.get('date') or t.get('transaction_date') or t.get('created_at'))
-            if not m:
-                continue
-            amount = _parse_amount(t)
-            if amount is None:
-                continue
-            key = t.get('payee') or t.get('payee_name') or t.get('merchant') or '(unknown)'
-            groups2[m][str(key)] += amount
-        out2: List[dict] = []
-        for m, payees in groups2.items():
-            for k, total in payees.items():
-                out2.append({'month': m, 'payee': k, 'total': total})
-        out2.sort(key=lambda x: (x['month'], -abs(x['total'])))
-        return out2
-
-    # total per month
-    totals: Dict[str, float] = defaultdict(float)
-    for t in txns:
-        m = month_key(t.get('date') or t.get('transaction_date') or t.get('created_at'))
-        if not m:
-            continue
-        amount = _parse_amount(t)
-        if amount is None:
-            continue
-        totals[m] += amount
-    result = [{'month': m, 'total': total} for m, total in totals.items()]
-    result.sort(key=lambda x: x['month'])
-    return result
+    Returns {summary, top_categories, top_payees, monthly, monthly_by_category}:
+    - summary: {count, total, min, max, mean} over all transactions
+    - top_categories / top_payees: {category|payee, total, count}, largest |total|
+      first, capped at category_limit / payee_limit
+    - monthly: {month, total, count} per YYYY-MM
+    - monthly_by_category: {month, category, total} with the per_month_limit largest
+      categories of each month
+
+    Prefer this over calling top_spending_categories, top_spending_payees and
+    monthly_spend_trend separately for the same period.
+
+    max_age: with the local mirror enabled (POCKETSMITH_MIRROR), accept mirrored data
+    up to this many seconds old before syncing (default POCKETSMITH_MIRROR_MAX_AGE).
+    """
+    user_id = await _resolve_user_id(user_id)
+    mirror = await _ready_mirror(user_id, max_age)
+    if mirror is not None:
+        by_month_category = mirror.totals(
+            user_id, start_date=start_date, end_date=end_date, by=('month', 'category')
+        )
+        by_category = regroup(by_month_category, (1,))
+        by_payee = mirror.totals(user_id, start_date=start_date, end_date=end_date, by=('payee',))
+        summary = mirror.describe(user_id, start_date=start_date, end_date=end_date)
+    else:
+        pages = _iter_transactions(user_id, start_date, end_date)
+        # Month groups skip undated rows, so category and payee totals get their own grouping
+        acc = await _aggregate(pages, ('category', 'payee'), ('month', 'category'))
+        by_category_payee, by_month_category = acc.groups(0), acc.groups(1)
+        by_category = regroup(by_category_payee, (0,))
+        by_payee = regroup(by_category_payee, (1,))
+        summary = acc.describe()
+
+    monthly = [
+        {'month': m, 'total': total, 'count': count}
+        for (m,), total, count in regroup(by_month_category, (0,))
+    ]
+    monthly.sort(key=lambda x: x['month'])
+    per_month: Dict[str, List[dict]] = {}
+    for (m, k), total, _ in by_month_category:
+        per_month.setdefault(m, []).append({'month': m, 'category': k, 'total': total})
+    monthly_by_category: List[dict] = []
+    for m in sorted(per_month):
+        rows = sorted(per_month[m], key=lambda x: abs(x['total']), reverse=True)
+        monthly_by_category.extend(rows[: max(0, per_month_limit)])
+
+    return {
+        'summary': summary,
+        'top_categories': _ranked(by_category, 'category', category_limit),
+        'top_payees': _ranked(by_payee, 'payee', payee_limit),
+        'monthly': monthly,
+        'monthly_by_category': monthly_by_category,
+    }
 
 
 # -----------------------
@@ -646,9 +2119,14 @@ async def monthly_spend_trend(
 # Curated payee tools have been removed to avoid exposing non-existent endpoints.
 
 
+async def _serve_stdio(server: FastMCP) -> None:
+    async with serving(server):
+        await server.run_async()
+
+
 def main() -> None:
-    # Run the MCP server
-    mcp.run()
+    # Run the MCP server over stdio; its state is closed when the transport ends
+    asyncio.run(_serve_stdio(create_server()))
 
 
 if __name__ == '__main__':
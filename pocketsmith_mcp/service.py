@@ -0,0 +1,112 @@
+"""Streamable HTTP deployment of the PocketSmith MCP server.
+
+`create_app()` wraps one server in an ASGI app; `run()` serves it with uvicorn across
+one or more worker processes (`pocketsmith-mcp --http --workers N`). Every worker
+builds its own server from the environment, so HTTP clients, caches and rate limiters
+are worker-local and shared by all sessions that worker handles.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from .config import ServerConfig, env_flag
+from .server import ServerState, create_server, serving
+
+DEFAULT_PATH = '/mcp'
+
+
+def create_app(
+    config: Optional[ServerConfig] = None,
+    path: Optional[str] = None,
+    stateless: Optional[bool] = None,
+) -> Any:
+    """ASGI app serving one server over streamable HTTP at `path`.
+
+    The server's state is opened when the app starts and closed when it shuts down,
+    rather than per MCP session. `GET /healthz` answers while the process is up
+    (liveness); `GET /readyz` answers 200 only while the state is open (readiness), so
+    a load balancer skips workers that are starting or shutting down. Both are
+    unauthenticated and return only a status; counters stay behind `client_stats`.
+    `path` and `stateless` default to POCKETSMITH_HTTP_PATH and POCKETSMITH_HTTP_STATELESS.
+    """
+    server = create_server(config)
+    path = path or os.getenv('POCKETSMITH_HTTP_PATH') or DEFAULT_PATH
+    if stateless is None:
+        stateless = env_flag('POCKETSMITH_HTTP_STATELESS')
+    current: Dict[str, ServerState] = {}
+
+    @server.custom_route('/healthz', methods=['GET'], include_in_schema=False)
+    async def healthz(request: Request) -> JSONResponse:
+        return JSONResponse({'status': 'ok', 'pid': os.getpid()})
+
+    @server.custom_route('/readyz', methods=['GET'], include_in_schema=False)
+    async def readyz(request: Request) -> JSONResponse:
+        state = current.get('state')
+        if state is None or state.closed:
+            return JSONResponse({'status': 'unavailable'}, status_code=503)
+        return JSONResponse({'status': 'ready'})
+
+    app = server.http_app(path=path, stateless_http=stateless)
+    session_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app: Any) -> AsyncIterator[None]:
+        async with serving(server) as state, session_lifespan(app):
+            current['state'] = state
+            try:
+                yield
+            finally:
+                current.pop('state', None)
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def run(
+    host: str = '127.0.0.1',
+    port: int = 8000,
+    workers: int = 1,
+    path: str = DEFAULT_PATH,
+    stateless: bool = False,
+    graceful_timeout: int = 30,
+    log_level: str = 'info',
+) -> None:
+    """Serve `create_app()` with uvicorn in `workers` processes.
+
+    With several workers the cache backend defaults to `sqlite` (one file shared by the
+    workers on this host); an explicit `memory` backend raises ValueError.
+
+    On SIGTERM/SIGINT uvicorn stops accepting connections, waits up to
+    `graceful_timeout` seconds for in-flight requests, then runs the app shutdown,
+    which closes each worker's upstream connections and cache files.
+    """
+    import uvicorn
+
+    if workers > 1:
+        # A next_page call may land on another worker than the listing that opened its
+        # cursor, so snapshots (and caches) need a backend every worker can see
+        backend = ServerConfig.from_env().cache_backend
+        if backend == 'memory' and os.getenv('POCKETSMITH_CACHE_BACKEND'):
+            raise ValueError(
+                'POCKETSMITH_CACHE_BACKEND=memory is worker-local; use sqlite or redis:// '
+                'with more than one worker'
+            )
+        if backend == 'memory':
+            os.environ['POCKETSMITH_CACHE_BACKEND'] = 'sqlite'
+    # Workers are separate processes that build their app from these
+    os.environ['POCKETSMITH_HTTP_PATH'] = path
+    os.environ['POCKETSMITH_HTTP_STATELESS'] = '1' if stateless else '0'
+    uvicorn.run(
+        'pocketsmith_mcp.service:create_app',
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        lifespan='on',
+        timeout_graceful_shutdown=graceful_timeout,
+        log_level=log_level,
+    )
@@ -0,0 +1,113 @@
+"""Per-tenant server state for multi-tenant deployments.
+
+In multi-tenant mode the PocketSmith credentials come with each request rather than
+from the environment. `TenantPool` keeps one state (HTTP client, rate-limit budget,
+caches) per credential in a bounded LRU, so tenants never share connections, budgets
+or cached data. `request_credentials()` finds the credentials of the current request.
+"""
+
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Mapping, NamedTuple, Optional
+
+
+class Credentials(NamedTuple):
+    access_token: Optional[str] = None
+    developer_key: Optional[str] = None
+
+
+def credentials_from_headers(headers: Mapping[str, str]) -> Optional[Credentials]:
+    """`Authorization: Bearer <token>` or `X-Developer-Key: <key>` from lower-cased headers."""
+    authorization = headers.get('authorization', '')
+    scheme, _, token = authorization.partition(' ')
+    if scheme.lower() == 'bearer' and token.strip():
+        return Credentials(access_token=token.strip())
+    key = headers.get('x-developer-key', '').strip()
+    if key:
+        return Credentials(developer_key=key)
+    return None
+
+
+def request_credentials() -> Optional[Credentials]:
+    """Credentials of the current MCP request, or None outside a request or without any.
+
+    A token validated by the server's MCP auth provider wins; otherwise the HTTP
+    request's Authorization / X-Developer-Key headers are used.
+    """
+    from fastmcp.server.dependencies import get_access_token, get_http_headers
+
+    access = get_access_token()
+    if access is not None and access.token:
+        return Credentials(access_token=access.token)
+    return credentials_from_headers(get_http_headers(include_all=True))
+
+
+class TenantPool:
+    """Bounded LRU of per-tenant states keyed by a credential fingerprint.
+
+    `build(credentials)` creates a tenant's state, which must have an async `aclose()`.
+    When more than `max_tenants` are held the least recently used one is evicted; a
+    state still serving a call is closed when its last lease ends.
+    """
+
+    def __init__(self, build: Callable[[Credentials], Any], max_tenants: int = 32):
+        self.max_tenants = max(1, max_tenants)
+        self._build = build
+        self._states: 'OrderedDict[str, Any]' = OrderedDict()
+        self._leases: Dict[int, int] = {}
+        self._retired: Dict[int, Any] = {}
+        self.created = 0
+        self.evicted = 0
+        self.closed = False
+
+    @asynccontextmanager
+    async def lease(self, key: str, credentials: Credentials) -> AsyncIterator[Any]:
+        """Hold the state of the tenant `key` (built on first use) for the block."""
+        if self.closed:
+            raise RuntimeError('tenant pool is closed')
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = self._build(credentials)
+            self.created += 1
+        else:
+            self._states.move_to_end(key)
+        self._leases[id(state)] = self._leases.get(id(state), 0) + 1
+        try:
+            await self._evict()
+            yield state
+        finally:
+            left = self._leases.pop(id(state)) - 1
+            if left:
+                self._leases[id(state)] = left
+            elif self._retired.pop(id(state), None) is not None:
+                await state.aclose()
+
+    async def _evict(self) -> None:
+        while len(self._states) > self.max_tenants:
+            _, state = self._states.popitem(last=False)
+            self.evicted += 1
+            if id(state) in self._leases:
+                self._retired[id(state)] = state
+            else:
+                await state.aclose()
+
+    async def aclose(self) -> None:
+        """Close every tenant's state, including evicted ones still in use."""
+        if self.closed:
+            return
+        self.closed = True
+        states = list(self._states.values()) + list(self._retired.values())
+        self._states.clear()
+        self._retired.clear()
+        for state in states:
+            await state.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters only; no tenant's own statistics are exposed here."""
+        return {
+            'tenants': len(self._states),
+            'max_tenants': self.max_tenants,
+            'in_use': len(self._leases),
+            'created': self.created,
+            'evicted': self.evicted,
+        }
@@ -0,0 +1,70 @@
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def srv():
+    """Import the real server module, discarding stub modules left by test_headers."""
+    for name in ('fastmcp', 'fastmcp.tools', 'httpx', 'tenacity', 'dotenv'):
+        if name in sys.modules and getattr(sys.modules[name], '__file__', None) is None:
+            sys.modules.pop(name, None)
+            sys.modules.pop('pocketsmith_mcp.server', None)
+    return importlib.import_module('pocketsmith_mcp.server')
+
+
+@pytest.fixture
+def mock_client(srv, monkeypatch):
+    """Make tools use a client backed by an httpx.MockTransport handler.
+
+    Installs a fresh default ServerState, so no test sees another test's cached
+    responses; keyword arguments override ServerConfig fields.
+    """
+    import httpx
+
+    from pocketsmith_mcp.config import ServerConfig
+
+    def install(handler, **config):
+        client = httpx.AsyncClient(
+            base_url='https://api.test/v2', transport=httpx.MockTransport(handler)
+        )
+        monkeypatch.setattr(srv, '_default', srv.ServerState(ServerConfig(**config), client))
+        return client
+
+    return install
+
+
+@pytest.fixture
+async def layered_client(srv, monkeypatch):
+    """Like `mock_client`, but through the layers ServerState installs on its own client.
+
+    The handler sees what upstream would after retries, the JSON codec, the HTTP cache,
+    single flight and write invalidation. Retries don't sleep between attempts.
+    Returns the installed ServerState, which is closed after the test.
+    """
+    import httpx
+
+    from pocketsmith_mcp.config import ServerConfig
+
+    real_client = httpx.AsyncClient
+    states = []
+
+    def install(handler, **config):
+        options = {'developer_key': 'k', 'base_url': 'https://api.test/v2'}
+        options.update(warmup_connections=0, **config)
+        with monkeypatch.context() as patch:
+            patch.setattr(srv, 'wait_exponential_jitter', lambda **kw: lambda state: 0)
+            patch.setattr(
+                srv.httpx,
+                'AsyncClient',
+                lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+            )
+            state = srv.ServerState(ServerConfig(**options))
+        monkeypatch.setattr(srv, '_default', state)
+        states.append(state)
+        return state
+
+    yield install
+    for state in states:
+        await state.aclose()
@@ -0,0 +1,205 @@
+import httpx
+import pytest
+
+from pocketsmith_mcp import aggregates
+
+CATEGORIES = [
+    {'id': 10, 'title': 'Food', 'children': [{'id': 11, 'title': 'Cafes', 'children': []}]},
+    {'id': 20, 'title': 'Rent'},
+]
+ACCOUNTS = [
+    {
+        'id': 5,
+        'currency_code': 'NZD',
+        'primary_scenario': {'id': 50},
+        'scenarios': [{'id': 50}, {'id': 51}],
+    }
+]
+UNCATEGORISED = [{'id': 1, 'date': '2024-01-09', 'amount': -7.0, 'payee': 'Kiosk'}]
+
+
+def _analysis(*actuals):
+    months = ['2024-01', '2024-02']
+    return {
+        'currency_code': 'nzd',
+        'total_actual_amount': sum(actuals),
+        'periods': [
+            {'start_date': f'{m}-01', 'end_date': f'{m}-28', 'actual_amount': a, 'over_by': 0}
+            for m, a in zip(months, actuals, strict=True)
+        ],
+    }
+
+
+PACKAGES = [
+    {
+        'category': {'id': 10, 'title': 'Food', 'colour': '#fff', 'children': []},
+        'is_transfer': False,
+        'expense': _analysis(-40.0, -25.0),
+        'income': _analysis(5.0, 0.0),
+    },
+    {'category': {'id': 20, 'title': 'Rent'}, 'expense': _analysis(-1000.0, -1000.0)},
+    {'category': {'id': 11, 'title': 'Cafes'}, 'expense': _analysis(0.0, 0.0)},
+]
+
+
+@pytest.fixture
+def api(srv, mock_client):
+    calls = []
+    data = {'categories': CATEGORIES, 'accounts': ACCOUNTS, 'transactions': UNCATEGORISED}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path, dict(request.url.params)))
+        path = request.url.path
+        if path == '/v2/me':
+            return httpx.Response(200, json={'id': 1})
+        if path == '/v2/users/1/categories':
+            return httpx.Response(200, json=data['categories'])
+        if path == '/v2/users/1/accounts':
+            return httpx.Response(200, json=data['accounts'])
+        if path.endswith(('/trend_analysis', '/budget_summary')):
+            return httpx.Response(200, json=PACKAGES)
+        if path == '/v2/users/1/transactions':
+            return httpx.Response(200, json=data['transactions'])
+        if request.method == 'GET':
+            return httpx.Response(200, json=[])
+        return httpx.Response(201, json={'id': 99})
+
+    def install(**overrides):
+        data.update({k: overrides.pop(k) for k in list(overrides) if k in data})
+        mock_client(handler, **overrides)
+        return calls
+
+    return install
+
+
+def test_plan_needs_month_aligned_groupable_ranges():
+    assert aggregates.whole_months('2024-01-01', '2024-12-31') == 12
+    assert aggregates.whole_months('2024-02-01', '2024-02-29') == 1
+    assert aggregates.whole_months('2024-01-02', '2024-12-31') is None
+    assert aggregates.plan('auto', '2024-01-01', '2024-12-31', ('month', 'category'), 6)
+    assert not aggregates.plan('auto', '2024-01-01', '2024-03-31', ('month',), 6)
+    assert not aggregates.plan('auto', '2024-01-01', '2024-12-31', ('month', 'payee'), 6)
+    assert not aggregates.plan('transactions', '2024-01-01', '2024-12-31', ('month',), 1)
+    assert not aggregates.plan('auto', '2024-01-01', '2024-12-31', ('category',), 6, counts=True)
+    assert aggregates.plan('aggregate', '2024-01-01', '2024-01-31', ('category',), 6)
+    with pytest.raises(ValueError, match='payee'):
+        aggregates.plan('aggregate', '2024-01-01', '2024-12-31', ('payee',), 6)
+    with pytest.raises(ValueError, match='1st of a month'):
+        aggregates.plan('aggregate', '2024-01-15', '2024-12-31', ('month',), 6)
+
+
+async def test_trend_replaces_transaction_downloads_and_is_cached(srv, api):
+    calls = api()
+    total = await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31')
+    assert total == [{'month': '2024-01', 'total': -1042.0}, {'month': '2024-02', 'total': -1025.0}]
+    by_category = await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31', group_by='category')
+    assert by_category[:3] == [
+        {'month': '2024-01', 'category': 'Rent', 'total': -1000.0},
+        {'month': '2024-01', 'category': 'Food', 'total': -35.0},
+        {'month': '2024-01', 'category': '(uncategorised)', 'total': -7.0},
+    ]
+    top = await srv.top_spending_categories.fn(
+        '2024-01-01', '2024-12-31', limit=1, source='aggregate'
+    )
+    assert top == [{'category': 'Rent', 'total': -2000.0, 'count': None}]
+    rolled = await srv.top_spending_categories.fn(
+        '2024-01-01', '2024-12-31', rollup_depth=1, source='aggregate'
+    )
+    assert rolled == [
+        {'category': 'Rent', 'total': -2000.0, 'count': None},
+        {'category': 'Food', 'total': -60.0, 'count': None},
+        {'category': '(uncategorised)', 'total': -7.0, 'count': None},
+    ]
+
+    paths = [path for _, path, _ in calls]
+    assert paths.count('/v2/users/1/trend_analysis') == 1
+    # Only uncategorised transactions are downloaded
+    assert all(
+        params.get('uncategorised') == '1'
+        for _, path, params in calls
+        if path == '/v2/users/1/transactions'
+    )
+    params = calls[paths.index('/v2/users/1/trend_analysis')][2]
+    assert params == {
+        'period': 'months',
+        'interval': '1',
+        'start_date': '2024-01-01',
+        'end_date': '2024-12-31',
+        'categories': '10,11,20',
+        'scenarios': '50,51',
+    }
+
+
+async def test_short_ranges_payees_and_opt_out_use_transactions(srv, api):
+    calls = api()
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-03-31')
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31', group_by='payee')
+    await srv.top_spending_categories.fn('2024-01-01', '2024-12-31')
+    await srv.top_spending_categories.fn('2024-01-01', '2024-12-31', source='auto')
+    assert not any(path.endswith('/trend_analysis') for _, path, _ in calls)
+
+    calls = api(aggregates=False)
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31')
+    assert not any(path.endswith('/trend_analysis') for _, path, _ in calls)
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-01-31', source='aggregate')
+    assert calls[-2][1] == '/v2/users/1/trend_analysis'
+    assert calls[-1][2]['uncategorised'] == '1'
+    with pytest.raises(ValueError, match='Unknown source'):
+        await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31', source='fast')
+
+
+async def test_auto_falls_back_where_aggregates_would_be_wrong(srv, api):
+    # No categories: nothing to analyse, so the uncategorised spend comes from transactions
+    spend = [
+        {'id': m, 'date': f'2024-{m:02d}-10', 'amount': -10.0, 'payee': 'Kiosk'}
+        for m in range(1, 13)
+    ]
+    calls = api(categories=[], transactions=spend)
+    top = await srv.top_spending_categories.fn('2024-01-01', '2024-12-31')
+    assert top == [{'category': '(uncategorised)', 'total': -120.0, 'count': 12}]
+    trend = await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31')
+    assert len(trend) == 12 and sum(row['total'] for row in trend) == -120.0
+    assert not any(path.endswith('/trend_analysis') for _, path, _ in calls)
+
+    # Accounts in several currencies: budget-currency actuals would not match
+    mixed = ACCOUNTS + [{'id': 6, 'currency_code': 'USD', 'scenarios': [{'id': 60}]}]
+    calls = api(categories=CATEGORIES, accounts=mixed, transactions=UNCATEGORISED)
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31')
+    assert not any(path.endswith('/trend_analysis') for _, path, _ in calls)
+
+    # A roll-up category covers its children: fine for totals, not per category
+    rolled = [dict(CATEGORIES[0], roll_up=True), CATEGORIES[1]]
+    calls = api(categories=rolled, accounts=ACCOUNTS)
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31', group_by='category')
+    assert not any(path.endswith('/trend_analysis') for _, path, _ in calls)
+    await srv.monthly_spend_trend.fn('2024-01-01', '2024-12-31')
+    trend = [params for _, path, params in calls if path.endswith('/trend_analysis')]
+    assert [params['categories'] for params in trend] == ['10,20']
+
+
+async def test_budget_tools_summarize_and_writes_invalidate(srv, api):
+    calls = api()
+    summary = await srv.budget_summary.fn('2024-01-01', '2024-02-29', period='months')
+    assert summary[0]['category'] == 'Food' and 'colour' not in summary[0]
+    assert summary[0]['expense']['periods'][0] == {
+        'start_date': '2024-01-01',
+        'end_date': '2024-01-28',
+        'actual_amount': -40.0,
+        'forecast_amount': None,
+        'refund_amount': None,
+        'over_by': 0,
+        'under_by': None,
+        'percentage_used': None,
+    }
+    trend = await srv.trend_analysis.fn('2024-01-01', '2024-02-29', category_ids=[20])
+    assert [p['category_id'] for p in trend] == [10, 20, 11]
+    assert calls[-1][2]['categories'] == '20' and calls[-1][2]['scenarios'] == '50,51'
+    with pytest.raises(ValueError, match='period'):
+        await srv.budget_summary.fn('2024-01-01', '2024-02-29', period='days')
+
+    await srv.budget_summary.fn('2024-01-01', '2024-02-29')
+    assert [path for _, path, _ in calls].count('/v2/users/1/budget_summary') == 1
+    state = srv._state()
+    await srv._invalidate_after_write(state, 'PUT', '/v2/transactions/7')
+    await srv.budget_summary.fn('2024-01-01', '2024-02-29')
+    assert [path for _, path, _ in calls].count('/v2/users/1/budget_summary') == 2
@@ -0,0 +1,97 @@
+import mcp.types
+
+from pocketsmith_mcp.autotools import OperationFilter, count_operations
+from pocketsmith_mcp.config import ServerConfig
+
+
+def _operations(spec):
+    return {
+        (method.upper(), path)
+        for path, item in spec['paths'].items()
+        for method in item
+        if method in ('get', 'put', 'post', 'delete', 'patch')
+    }
+
+
+def test_read_only_keeps_only_gets(srv):
+    spec = srv.load_openapi_spec()
+    selected = OperationFilter(read_only=True).apply(spec)
+
+    ops = _operations(selected)
+    assert ops and all(method == 'GET' for method, _ in ops)
+    assert not any('forecast_cache' in path for path in selected['paths'])
+    # The original spec is left untouched
+    assert count_operations(spec) > count_operations(selected)
+    assert ('DELETE', '/users/{id}/forecast_cache') in _operations(spec)
+
+
+def test_tag_path_and_method_rules():
+    spec = {
+        'paths': {
+            '/users/{id}/transactions': {
+                'parameters': [{'name': 'id'}],
+                'get': {'tags': ['Transactions']},
+            },
+            '/transactions/{id}': {
+                'get': {'tags': ['Transactions']},
+                'put': {'tags': ['Transactions']},
+            },
+            '/users/{id}/attachments': {'get': {'tags': ['Attachments']}},
+            '/currencies': {'get': {'tags': ['Currencies']}},
+        }
+    }
+    only_transactions = OperationFilter(tags=['transactions']).apply(spec)
+    assert set(only_transactions['paths']) == {'/users/{id}/transactions', '/transactions/{id}'}
+    assert only_transactions['paths']['/users/{id}/transactions']['parameters'] == [{'name': 'id'}]
+
+    assert _operations(OperationFilter(paths=['/users/*']).apply(spec)) == {
+        ('GET', '/users/{id}/transactions'),
+        ('GET', '/users/{id}/attachments'),
+    }
+    assert _operations(
+        OperationFilter(exclude_tags=['Attachments'], exclude_paths=['/currencies']).apply(spec)
+    ) == {
+        ('GET', '/users/{id}/transactions'),
+        ('GET', '/transactions/{id}'),
+        ('PUT', '/transactions/{id}'),
+    }
+    assert _operations(OperationFilter(methods=['PUT']).apply(spec)) == {
+        ('PUT', '/transactions/{id}')
+    }
+    # Read-only wins over an explicit method allowlist
+    assert OperationFilter(methods=['put'], read_only=True).apply(spec)['paths'] == {}
+
+
+def test_filter_from_config_follows_write_mode():
+    assert OperationFilter.from_config(ServerConfig()).read_only
+    assert not OperationFilter.from_config(ServerConfig(write_mode=True)).read_only
+
+
+async def test_list_tools_is_cached_until_tools_change(srv):
+    server = srv.create_server(ServerConfig())
+    handler = server._mcp_server.request_handlers[mcp.types.ListToolsRequest]
+    (cache,) = [mw for mw in server.middleware if isinstance(mw, srv._ToolListCache)]
+
+    first = (await handler(None)).root.tools
+    second = (await handler(None)).root.tools
+    assert [t.name for t in first] == [t.name for t in second]
+    assert cache.hits == 1
+
+    @server.tool
+    def ping() -> str:
+        return 'pong'
+
+    third = (await handler(None)).root.tools
+    assert 'ping' in {t.name for t in third} and cache.hits == 1
+
+    # Disabling or re-enabling a tool starts a new listing
+    me = (await server.get_tools())['me']
+    me.disable()
+    assert 'me' not in {t.name for t in (await handler(None)).root.tools}
+    me.enable()
+    assert 'me' in {t.name for t in (await handler(None)).root.tools}
+    assert 'me' in {t.name for t in (await handler(None)).root.tools}
+    assert cache.hits == 2
+
+    server.remove_tool('ping')
+    assert len((await handler(None)).root.tools) == len(first) and cache.hits == 2
@@ -0,0 +1,237 @@
+import asyncio
+import fnmatch
+import sqlite3
+
+import httpx
+import pytest
+
+from pocketsmith_mcp.cachestore import (
+    CacheBackend,
+    MemoryBackend,
+    RedisBackend,
+    SqliteBackend,
+    open_backend,
+)
+from pocketsmith_mcp.config import ServerConfig
+
+
+class RedisStandIn:
+    """Just enough of the Redis protocol for RedisBackend: GET, SET [PX], DEL, SCAN."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+        self.delay = 0.0
+
+    async def serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readuntil(b'\r\n')
+                args = []
+                for _ in range(int(line[1:-2])):
+                    size = int((await reader.readuntil(b'\r\n'))[1:-2])
+                    args.append((await reader.readexactly(size + 2))[:-2])
+                await asyncio.sleep(self.delay)
+                writer.write(self.reply(args))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    def reply(self, args):
+        command = args[0].upper()
+        if command == b'GET':
+            value = self.data.get(args[1])
+            return b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+        if command == b'SET':
+            self.data[args[1]] = args[2]
+            if len(args) > 3:
+                self.ttls[args[1]] = int(args[4])
+            return b'+OK\r\n'
+        if command == b'DEL':
+            removed = sum(self.data.pop(k, None) is not None for k in args[1:])
+            return b':%d\r\n' % removed
+        if command == b'SCAN':
+            pattern = args[3].decode().replace('\\', '')
+            keys = [k for k in self.data if fnmatch.fnmatchcase(k.decode(), pattern)]
+            body = b''.join(b'$%d\r\n%s\r\n' % (len(k), k) for k in keys)
+            return b'*2\r\n$1\r\n0\r\n*%d\r\n%s' % (len(keys), body)
+        return b'-ERR unknown command\r\n'
+
+
+@pytest.fixture
+async def redis_url():
+    stand_in = RedisStandIn()
+    server = await asyncio.start_server(stand_in.serve, '127.0.0.1', 0)
+    yield f'redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0', stand_in
+    server.close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('kind', ['memory', 'sqlite'])
+async def test_local_backends_expire_and_delete_by_prefix(kind, tmp_path):
+    clock = _Clock()
+    if kind == 'memory':
+        backend = MemoryBackend(clock=clock)
+    else:
+        backend = SqliteBackend(tmp_path / 'shared.sqlite3', clock=clock)
+    await backend.set('t1:user:me', b'a', ttl=60)
+    await backend.set('t1:accounts:1', b'b')
+    await backend.set('t2:accounts:1', b'c')
+    assert await backend.get('t1:user:me') == b'a'
+    clock.now += 61
+    assert await backend.get('t1:user:me') is None
+    await backend.delete_prefix('t1:')
+    assert await backend.get('t1:accounts:1') is None
+    assert await backend.get('t2:accounts:1') == b'c'
+    assert backend.stats()['hits'] == 2 and backend.stats()['errors'] == 0
+    backend.close()
+
+
+def test_backends_must_implement_the_interface():
+    class Partial(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+async def test_sqlite_lock_waits_do_not_block_the_loop(tmp_path):
+    path = tmp_path / 'shared.sqlite3'
+    backend = SqliteBackend(path, busy_timeout=2.0)
+    # Another process holds the write lock for a while
+    holder = sqlite3.connect(str(path), isolation_level=None)
+    holder.execute('BEGIN IMMEDIATE')
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.ensure_future(ticker())
+    write = asyncio.ensure_future(backend.set('k', b'v'))
+    await asyncio.sleep(0.3)
+    holder.execute('COMMIT')
+    await write
+    task.cancel()
+    assert ticks >= 10
+    assert await backend.get('k') == b'v'
+    holder.close()
+    backend.close()
+
+
+async def test_redis_backend_speaks_resp(redis_url):
+    url, stand_in = redis_url
+    backend = open_backend(url, cache_dir=None)
+    assert isinstance(backend, RedisBackend)
+    await backend.set('t1:user:me', b'\x00binary\r\n', ttl=1.5)
+    await backend.set('t1:segments:[1]:5', b'rows')
+    await backend.set('t2:user:me', b'other')
+    assert await backend.get('t1:user:me') == b'\x00binary\r\n'
+    assert stand_in.ttls[b't1:user:me'] == 1500
+    await backend.delete_prefix('t1:')
+    assert sorted(stand_in.data) == [b't2:user:me']
+    assert await backend.get('missing') is None
+    backend.close()
+
+
+async def test_cancelled_redis_command_does_not_shift_replies(redis_url):
+    url, stand_in = redis_url
+    backend = RedisBackend(url)
+    await backend.set('a', b'value-a')
+    stand_in.delay = 0.05
+    pending = asyncio.ensure_future(backend.set('x', b'value-x'))
+    await asyncio.sleep(0.01)
+    pending.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
+    # The cancelled SET's reply is never read as the GET's
+    assert await backend.get('a') == b'value-a'
+    assert await backend.get('x') == b'value-x'
+    backend.close()
+
+
+async def test_redis_outage_is_a_miss():
+    backend = RedisBackend('redis://127.0.0.1:1/0', timeout=0.5)
+    assert await backend.get('k') is None
+    await backend.set('k', b'v')
+    assert backend.stats()['errors'] == 2
+
+
+async def test_workers_share_entries_within_a_tenant(srv, monkeypatch, tmp_path):
+    upstream = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        upstream.append((request.headers['X-Developer-Key'], request.headers.get('If-None-Match')))
+        return httpx.Response(200, json=[{'id': 1}], headers={'ETag': '"v1"'})
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        srv.httpx,
+        'AsyncClient',
+        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+    )
+
+    def worker(key):
+        config = ServerConfig(developer_key=key, cache_dir=tmp_path, cache_backend='sqlite')
+        return srv.ServerState(config)
+
+    first, second, other_tenant = worker('a'), worker('a'), worker('b')
+
+    async def fetch():
+        upstream.append('fetch')
+        return {'id': 1}
+
+    await first.ref_cache.get('user', 'me', fetch)
+    assert await second.ref_cache.get('user', 'me', fetch) == {'id': 1}
+    assert upstream == ['fetch'] and second.ref_cache.stats()['shared_hits'] == 1
+    await other_tenant.ref_cache.get('user', 'me', fetch)
+    assert upstream == ['fetch', 'fetch']
+
+    # The second worker revalidates the first worker's response instead of refetching it
+    await first.client.get('/users/1/categories')
+    await second.client.get('/users/1/categories')
+    await other_tenant.client.get('/users/1/categories')
+    assert upstream[2:] == [('a', None), ('a', '"v1"'), ('b', None)]
+
+    # A write through one worker clears the shared tier, so a fresh worker refetches
+    await first.ref_cache.forget('user')
+    third = worker('a')
+    await third.ref_cache.get('user', 'me', fetch)
+    assert upstream[-1] == 'fetch'
+
+    for state in (first, second, third, other_tenant):
+        await state.aclose()
+
+
+async def test_shared_segments_skip_upstream(tmp_path):
+    from pocketsmith_mcp.segments import SegmentCache
+
+    backend = SqliteBackend(tmp_path / 'shared.sqlite3')
+    calls = []
+
+    async def fetch_window(start, end):
+        calls.append((start, end))
+        return [{'id': 1, 'date': '2020-01-15'}, {'id': 2, 'date': '2020-02-03'}]
+
+    first = SegmentCache(backend=backend, namespace='t1:segments')
+    second = SegmentCache(backend=backend, namespace='t1:segments')
+    rows = await first.fetch('k', '2020-01-01', '2020-02-29', fetch_window)
+    assert await second.fetch('k', '2020-01-01', '2020-02-29', fetch_window) == rows
+    assert len(calls) == 1 and second.stats()['shared_hits'] == 2
+
+    await first.forget()
+    assert backend.entries() == 0
+    third = SegmentCache(backend=backend, namespace='t1:segments')
+    await third.fetch('k', '2020-01-01', '2020-01-31', fetch_window)
+    assert len(calls) == 2
+    backend.close()
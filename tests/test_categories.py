@@ -0,0 +1,129 @@
+import httpx
+import pytest
+
+from pocketsmith_mcp.categories import CategoryIndex
+
+TREE = [
+    {
+        'id': 1,
+        'title': 'Food',
+        'children': [
+            {
+                'id': 2,
+                'title': 'Eating out',
+                'parent_id': 1,
+                'children': [{'id': 3, 'title': 'Cafes', 'parent_id': 2, 'children': []}],
+            },
+            {'id': 4, 'title': 'Groceries', 'parent_id': 1, 'children': []},
+        ],
+    },
+    {'id': 5, 'title': 'Rent', 'children': []},
+]
+
+
+def _txn(id, amount, category_id=None, date='2025-01-10'):
+    row = {'id': id, 'date': date, 'amount': amount, 'payee': 'Shop'}
+    if category_id is not None:
+        titles = {1: 'Food', 2: 'Eating out', 3: 'Cafes', 4: 'Groceries', 5: 'Rent', 9: 'Gone'}
+        row['category'] = {'id': category_id, 'title': titles[category_id]}
+    return row
+
+
+TXNS = [
+    _txn(1, -4.0, 3),
+    _txn(2, -6.0, 3, date='2025-02-03'),
+    _txn(3, -20.0, 2),
+    _txn(4, -50.0, 4),
+    _txn(5, -1.0, 1),
+    _txn(6, -900.0, 5),
+    _txn(7, -3.0, 9),
+    _txn(8, -2.0),
+]
+
+
+@pytest.fixture
+def api(srv, mock_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == '/v2/me':
+            return httpx.Response(200, json={'id': 1})
+        if request.url.path == '/v2/users/1/categories':
+            return httpx.Response(200, json=TREE)
+        return httpx.Response(200, json=TXNS)
+
+    mock_client(handler)
+    return calls
+
+
+def test_index_paths_subtrees_and_ancestors():
+    index = CategoryIndex(TREE)
+    assert index.paths[3] == (1, 2, 3)
+    assert index.paths[5] == (5,)
+    assert index.subtree(2) == {2, 3}
+    assert index.subtree(1) == {1, 2, 3, 4}
+    assert index.subtree(42) == {42}
+    assert index.ancestor(3, 1) == 1
+    assert index.ancestor(3, 2) == 2
+    assert index.ancestor(4, 5) == 4
+    assert index.ancestor(None, 1) is None
+
+    # A flat list with parent ids builds the same paths
+    flat = [
+        {'id': c, 'title': t, 'parent_id': p}
+        for c, t, p in [(3, 'C', 2), (2, 'B', 1), (1, 'A', None)]
+    ]
+    assert CategoryIndex(flat).paths[3] == (1, 2, 3)
+
+
+def test_roll_up_merges_labels_and_keeps_unknown_counts():
+    index = CategoryIndex(TREE)
+    groups = [((3, 'Cafes'), -10.0, 2), ((4, 'Groceries'), -50.0, 1), ((9, 'Gone'), -3.0, 1)]
+    assert sorted(index.roll_up(groups, 1)) == [(('Food',), -60.0, 3), (('Gone',), -3.0, 1)]
+    monthly = [(('2025-01', 3, 'Cafes'), -4.0, None), (('2025-01', 2, 'Eating out'), -20.0, None)]
+    assert index.roll_up(monthly, 2, id_at=1, title_at=2) == [
+        (('2025-01', 'Eating out'), -24.0, None)
+    ]
+    with pytest.raises(ValueError):
+        index.roll_up(groups, 0)
+
+
+async def test_reports_roll_up_from_one_transaction_fetch(srv, api):
+    top = await srv.top_spending_categories.fn('2025-01-01', '2025-02-28', rollup_depth=1)
+    assert top == [
+        {'category': 'Rent', 'total': -900.0, 'count': 1},
+        {'category': 'Food', 'total': -81.0, 'count': 5},
+        {'category': 'Gone', 'total': -3.0, 'count': 1},
+        {'category': '(uncategorised)', 'total': -2.0, 'count': 1},
+    ]
+    summary = await srv.category_spend_summary.fn(
+        2, '2025-01-01', '2025-02-28', include_subcategories=True
+    )
+    assert summary == {
+        'category_id': 2,
+        'total': -30.0,
+        'count': 3,
+        'breakdown': [
+            {'category_id': 2, 'category': 'Eating out', 'total': -20.0, 'count': 1},
+            {'category_id': 3, 'category': 'Cafes', 'total': -10.0, 'count': 2},
+        ],
+    }
+    trend = await srv.monthly_spend_trend.fn(
+        '2025-01-01', '2025-02-28', group_by='category', rollup_depth=2
+    )
+    assert {'month': '2025-01', 'category': 'Eating out', 'total': -24.0} in trend
+    assert {'month': '2025-02', 'category': 'Eating out', 'total': -6.0} in trend
+
+    # One user-wide fetch (repeats come from the segment cache), never one per category
+    assert api.count('/v2/users/1/transactions') == 1
+    assert not any(path.startswith('/v2/categories/') for path in api)
+    assert api.count('/v2/users/1/categories') == 1
+    index = srv._state().category_indexes[1][1]
+    await srv.top_spending_categories.fn('2025-01-01', '2025-02-28', rollup_depth=2)
+    assert srv._state().category_indexes[1][1] is index
+
+    with pytest.raises(ValueError, match='group_by'):
+        await srv.monthly_spend_trend.fn('2025-01-01', '2025-02-28', rollup_depth=1)
+    with pytest.raises(ValueError, match='at least 1'):
+        await srv.top_spending_categories.fn('2025-01-01', '2025-02-28', rollup_depth=0)
@@ -0,0 +1,37 @@
+import pytest
+
+from pocketsmith_mcp import codec
+
+
+@pytest.mark.parametrize('name', list(codec.BACKENDS))
+def test_backends_round_trip(name):
+    try:
+        codec.BACKENDS[name]()
+    except ImportError:
+        pytest.skip(f'{name} not installed')
+    chosen, loads, dumps = codec.select(name)
+    assert chosen == name
+    payload = {'id': 1, 'payee': 'Café', 'amount': -12.5, 'tags': [None, True]}
+    assert loads(dumps(payload)) == payload
+    assert loads(dumps(payload).encode('utf-8')) == payload
+
+
+def test_unknown_backend_picks_first_installed():
+    name, _, dumps = codec.select('nope')
+    assert name in codec.BACKENDS
+    assert dumps({'a': 1}) == '{"a":1}'
+
+
+async def test_client_decodes_with_codec(srv, mock_client, monkeypatch):
+    import httpx
+
+    calls = []
+    monkeypatch.setattr(srv.codec, 'loads', lambda data: calls.append(data) or {'fast': True})
+    client = mock_client(lambda request: httpx.Response(200, json={'fast': False}))
+    srv._install_json_codec(client)
+
+    resp = await client.get('/me')
+    assert resp.json() == {'fast': True}
+    assert calls == [b'{"fast":false}']
+    # Stdlib-only keyword options still go through httpx's decoder
+    assert resp.json(parse_int=str) == {'fast': False}
@@ -0,0 +1,107 @@
+import httpx
+import pytest
+
+from pocketsmith_mcp.cachestore import MemoryBackend
+from pocketsmith_mcp.cursors import CursorError, ResultStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def test_pages_through_a_snapshot():
+    store = ResultStore(page_size=2)
+    rows = list(range(5))
+
+    first = await store.first_page(rows)
+    assert first['items'] == [0, 1] and first['total'] == 5
+    second = await store.next_page(first['next_cursor'])
+    assert second['items'] == [2, 3] and second['offset'] == 2
+    last = await store.next_page(second['next_cursor'], page_size=10)
+    assert last['items'] == [4] and last['next_cursor'] is None
+    # Retrying a cursor serves the same page again
+    assert (await store.next_page(first['next_cursor']))['items'] == [2, 3]
+
+    # Results that fit in one page leave nothing behind
+    assert (await store.first_page([1]))['next_cursor'] is None
+    assert store.stats()['snapshots'] == 1
+
+
+async def test_snapshots_expire_and_are_bounded():
+    clock = _Clock()
+    store = ResultStore(page_size=1, max_snapshots=2, ttl=60, clock=clock)
+    a = (await store.first_page([1, 2]))['next_cursor']
+    clock.now = 50
+    await store.next_page(a)  # reading refreshes the TTL
+    clock.now = 100
+    assert (await store.next_page(a))['items'] == [2]
+    clock.now = 161
+    with pytest.raises(CursorError):
+        await store.next_page(a)
+
+    b = (await store.first_page([1, 2]))['next_cursor']
+    await store.first_page([1, 2])
+    await store.first_page([1, 2])
+    with pytest.raises(CursorError):
+        await store.next_page(b)
+    with pytest.raises(CursorError):
+        await store.next_page('not a cursor')
+
+    # Rows are bounded too, but the newest snapshot is always kept
+    store = ResultStore(page_size=1, max_rows=5, clock=clock)
+    c = (await store.first_page([1, 2, 3]))['next_cursor']
+    d = (await store.first_page(list(range(10))))['next_cursor']
+    assert store.stats()['rows'] == 10
+    assert (await store.next_page(d))['items'] == [1]
+    with pytest.raises(CursorError):
+        await store.next_page(c)
+
+
+async def test_shared_backend_serves_cursors_to_other_workers():
+    clock = _Clock()
+    backend = MemoryBackend(clock=clock)
+    opener = ResultStore(page_size=2, ttl=60, clock=clock, backend=backend, namespace='t:a')
+    other = ResultStore(page_size=2, ttl=60, clock=clock, backend=backend, namespace='t:a')
+    stranger = ResultStore(page_size=2, ttl=60, clock=clock, backend=backend, namespace='t:b')
+
+    first = await opener.first_page([{'id': i} for i in range(5)], columnar=True)
+    page = await other.next_page(first['next_cursor'])
+    assert page['columns'] == ['id'] and page['rows'] == [[2], [3]]
+    assert other.stats()['shared_hits'] == 1
+    with pytest.raises(CursorError):
+        await stranger.next_page(first['next_cursor'])
+
+    # Reads past half the TTL renew the shared copy
+    clock.now = 40
+    await other.next_page(first['next_cursor'])
+    clock.now = 90
+    fresh = ResultStore(ttl=60, clock=clock, backend=backend, namespace='t:a')
+    assert (await fresh.next_page(page['next_cursor']))['rows'] == [[4]]
+    clock.now = 151
+    with pytest.raises(CursorError):
+        await ResultStore(clock=clock, backend=backend, namespace='t:a').next_page(
+            page['next_cursor']
+        )
+
+
+async def test_list_transactions_pages_without_refetching(srv, mock_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        rows = [{'id': i, 'date': '2025-03-01'} for i in range(250)]
+        return httpx.Response(200, json=rows)
+
+    mock_client(handler, result_page_size=100)
+    first = await srv.list_transactions.fn(user_id=1)
+    assert len(first['items']) == 100 and first['total'] == 250
+
+    second = await srv.next_page.fn(first['next_cursor'])
+    third = await srv.next_page.fn(second['next_cursor'])
+    assert [r['id'] for r in third['items']] == list(range(200, 250))
+    assert third['next_cursor'] is None
+    assert calls == ['/v2/users/1/transactions']
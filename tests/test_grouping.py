@@ -0,0 +1,92 @@
+import pytest
+
+from pocketsmith_mcp.grouping import GroupAccumulator, regroup
+from pocketsmith_mcp.records import Transaction
+
+ROWS = [
+    {'date': '2025-01-05', 'amount': -10, 'payee': 'Cafe', 'category': {'title': 'Food'}},
+    {'date': '2025-01-20', 'amount': '-2.5', 'payee': 'Cafe', 'category': {'title': 'Food'}},
+    {'date': '2025-02-01', 'amount': -1000, 'payee_name': 'Landlord', 'category_name': 'Rent'},
+    {'transaction_date': '2025-02-14', 'amount_cents': 0, 'merchant': 'Gift'},
+    {'date': 'garbage', 'amount': -4, 'payee': 'Cafe', 'category': {'title': 'Food'}},
+    {'date': '2025-03-01', 'amount': None, 'payee': 'Ignored'},
+    {'date': '2025-03-02', 'amount': 'n/a', 'payee': 'Ignored'},
+]
+
+
+def _grouped(rows, *groupings):
+    acc = GroupAccumulator(*groupings)
+    acc.add(Transaction.from_api(r) for r in rows)
+    return acc
+
+
+def test_rows_without_amount_are_dropped():
+    acc = _grouped(ROWS)
+    assert acc.groups() == [((), -1016.5, 5)]
+    assert acc.describe() == {
+        'count': 5,
+        'total': -1016.5,
+        'min': -1000.0,
+        'max': 0.0,
+        'mean': -203.3,
+    }
+
+
+def test_group_by_single_key():
+    acc = _grouped(ROWS, ('category',), ('month',))
+    assert sorted(acc.groups(0)) == [
+        (('(uncategorised)',), 0.0, 1),
+        (('Food',), -16.5, 3),
+        (('Rent',), -1000.0, 1),
+    ]
+    # Unparseable dates are excluded only when grouping by month
+    assert sorted(acc.groups(1)) == [
+        (('2025-01',), -12.5, 2),
+        (('2025-02',), -1000.0, 2),
+    ]
+
+
+def test_group_by_month_and_payee():
+    assert sorted(_grouped(ROWS, ('payee', 'month')).groups()) == [
+        (('Cafe', '2025-01'), -12.5, 2),
+        (('Gift', '2025-02'), 0.0, 1),
+        (('Landlord', '2025-02'), -1000.0, 1),
+    ]
+
+
+def test_empty_batch():
+    acc = _grouped([], (), ('month', 'category'))
+    assert acc.groups(0) == [] and acc.groups(1) == []
+    assert acc.describe()['mean'] is None
+
+
+def test_group_by_category_id_keeps_missing_ids():
+    rows = [
+        {'date': '2025-01-05', 'amount': -10, 'category': {'id': 11, 'title': 'Cafes'}},
+        {'date': '2025-01-06', 'amount': -5, 'category': {'id': 11, 'title': 'Cafes'}},
+        {'date': '2025-01-07', 'amount': -7},
+    ]
+    assert sorted(_grouped(rows, ('category_id', 'category')).groups(), key=str) == [
+        ((11, 'Cafes'), -15.0, 2),
+        ((None, '(uncategorised)'), -7.0, 1),
+    ]
+
+
+def test_unknown_group_key():
+    with pytest.raises(ValueError):
+        GroupAccumulator(('account',))
+
+
+def test_batches_match_one_pass_and_regroup():
+    records = [Transaction.from_api(r) for r in ROWS]
+    acc = GroupAccumulator(('category',), ('month', 'payee'))
+    for start in range(0, len(records), 2):
+        acc.add(records[start : start + 2])
+    whole = _grouped(ROWS, ('category',), ('month', 'payee'))
+    assert sorted(acc.groups(0)) == sorted(whole.groups(0))
+    assert sorted(acc.groups(1)) == sorted(whole.groups(1))
+    assert acc.describe() == whole.describe()
+    assert sorted(regroup(acc.groups(1), (0,))) == [
+        (('2025-01',), -12.5, 2),
+        (('2025-02',), -1000.0, 2),
+    ]
@@ -0,0 +1,91 @@
+import httpx
+
+from pocketsmith_mcp.httpcache import HttpCache
+
+
+def _etag_handler(body, etag='"v1"'):
+    """Serve `body` with an ETag, answering 304 when the client already has it."""
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == etag:
+            return httpx.Response(304, headers={'ETag': etag})
+        return httpx.Response(200, json=body, headers={'ETag': etag})
+
+    return handler, seen
+
+
+async def test_304_serves_cached_parsed_body(srv, mock_client):
+    handler, seen = _etag_handler([{'id': 1, 'title': 'Groceries'}])
+    client = mock_client(handler)
+    cache = HttpCache()
+    srv._install_http_cache(client, cache)
+
+    first = await client.get('/users/1/categories')
+    second = await client.get('/users/1/categories')
+    third = await client.get('/users/1/categories')
+
+    assert seen == [None, '"v1"', '"v1"']
+    assert second.status_code == 200
+    assert second.json() == first.json() == [{'id': 1, 'title': 'Groceries'}]
+    # Parsed once per entry, not once per 304
+    assert second.json() is third.json()
+    assert cache.stats()['revalidated'] == 2
+
+
+async def test_304_headers_replace_the_stored_ones(srv, mock_client):
+    remaining = iter(['99', '98'])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers = {'ETag': '"v1"', 'X-Rate-Limit-Remaining': next(remaining)}
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304, headers=headers)
+        return httpx.Response(200, json={'id': 1}, headers={**headers, 'X-Kept': 'yes'})
+
+    client = mock_client(handler)
+    srv._install_http_cache(client, HttpCache())
+    await client.get('/me')
+    resp = await client.get('/me')
+    assert resp.status_code == 200 and resp.json() == {'id': 1}
+    assert resp.headers['X-Rate-Limit-Remaining'] == '98'
+    assert resp.headers['X-Kept'] == 'yes'
+
+
+async def test_responses_without_validators_or_non_gets_are_not_cached(srv, mock_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.headers.get('If-Modified-Since')))
+        return httpx.Response(200, json={'ok': True})
+
+    client = mock_client(handler)
+    cache = HttpCache()
+    srv._install_http_cache(client, cache)
+
+    await client.get('/currencies')
+    await client.get('/currencies')
+    await client.put('/transactions/1', json={'note': 'x'})
+    assert calls == [('GET', None), ('GET', None), ('PUT', None)]
+    assert cache.stats()['entries'] == 0
+
+
+async def test_memory_tier_is_lru_and_disk_tier_survives(srv, mock_client, tmp_path):
+    handler, seen = _etag_handler({'ok': True})
+    client = mock_client(handler)
+    cache = HttpCache(max_entries=1, path=tmp_path / 'http.sqlite3')
+    srv._install_http_cache(client, cache)
+
+    await client.get('/time_zones')
+    await client.get('/currencies')
+    assert cache.stats()['entries'] == 1 and cache.stats()['disk_entries'] == 2
+    cache.close()
+
+    # A new process: the entry comes back from disk and is revalidated
+    reopened = HttpCache(path=tmp_path / 'http.sqlite3')
+    client = mock_client(handler)
+    srv._install_http_cache(client, reopened)
+    resp = await client.get('/time_zones')
+    assert seen[-1] == '"v1"'
+    assert resp.json() == {'ok': True}
+    reopened.close()
@@ -6,7 +6,7 @@ import sys
 
 def test_in_memory_client_lists_tools():
     # Clear any stubs installed by other tests so we import real packages
-    for name in ('fastmcp', 'httpx', 'tenacity', 'dotenv'):
+    for name in ('fastmcp', 'fastmcp.tools', 'httpx', 'tenacity', 'dotenv'):
         if name in sys.modules and getattr(sys.modules[name], '__file__', None) is None:
             # Our stub modules have no __file__; pop them
             sys.modules.pop(name, None)
@@ -21,8 +21,10 @@ def test_in_memory_client_lists_tools():
         sys.modules.pop('pocketsmith_mcp.server', None)
     srv = importlib.import_module('pocketsmith_mcp.server')
 
+    from pocketsmith_mcp.config import ServerConfig
+
     async def _run():
-        async with Client(srv.mcp) as client:
+        async with Client(srv.create_server(ServerConfig(warmup_connections=0))) as client:
             tools = await client.list_tools()
             assert isinstance(tools, list)
             # We don't assert count as tools may depend on env flags
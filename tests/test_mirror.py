@@ -0,0 +1,285 @@
+from datetime import date
+
+import httpx
+import pytest
+
+from pocketsmith_mcp.mirror import TransactionMirror
+
+
+def _txn(id, date, amount, payee='Shop', category=None, **extra):
+    t = {'id': id, 'date': date, 'amount': amount, 'payee': payee, **extra}
+    if category is not None:
+        t['category'] = {'id': category[0], 'title': category[1]}
+    return t
+
+
+GROCERIES = (10, 'Groceries')
+RENT = (20, 'Rent')
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    m = TransactionMirror(tmp_path / 'mirror.sqlite3')
+    yield m
+    m.close()
+
+
+def test_full_then_incremental_sync(mirror):
+    assert mirror.age(1) is None and mirror.needs_full_sync(1)
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [
+            _txn(1, '2025-01-05', -10, category=GROCERIES),
+            _txn(2, '2025-01-20', -1000, payee='Landlord', category=RENT),
+            _txn(3, '2025-02-03', -15, category=GROCERIES, needs_review=True, type='debit'),
+        ],
+        [{'id': 10, 'title': 'Groceries', 'children': [{'id': 11, 'title': 'Snacks'}]}],
+        [{'id': 5, 'title': 'Cheque'}],
+        full=True,
+    )
+    assert not mirror.needs_full_sync(1)
+    assert mirror.cursor(1) == '2023-11-14T22:12:20+00:00'
+    assert mirror.category_owner(11) == 1
+
+    # Incremental: one edit and one new row; untouched rows are kept
+    mirror.apply_sync(
+        1,
+        1_700_000_100,
+        [_txn(1, '2025-01-05', -12, category=GROCERIES), _txn(4, '2025-02-10', 50)],
+        [],
+        [],
+        full=False,
+    )
+    rows = mirror.transactions(user_id=1)
+    assert [t['id'] for t in rows] == [4, 3, 2, 1]
+    assert rows[-1]['amount'] == -12
+    assert [t['id'] for t in mirror.transactions(user_id=1, uncategorised=1)] == [4]
+    assert [t['id'] for t in mirror.transactions(user_id=1, needs_review=1)] == [3]
+    assert [t['id'] for t in mirror.transactions(user_id=1, tx_type='debit')] == [3]
+
+
+def test_totals_grouping(mirror):
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [
+            _txn(1, '2025-01-05', -10, category=GROCERIES),
+            _txn(2, '2025-01-20', -1000, payee='Landlord', category=RENT),
+            _txn(3, '2025-02-03', -15, category=GROCERIES),
+            _txn(4, '2025-03-01', -99, category=GROCERIES),
+        ],
+        [],
+        [],
+        full=True,
+    )
+    by_cat = mirror.totals(1, start_date='2025-01-01', end_date='2025-02-28', by=('category',))
+    assert sorted(by_cat) == [(('Groceries',), -25.0, 2), (('Rent',), -1000.0, 1)]
+    monthly = mirror.totals(1, start_date='2025-01-01', end_date='2025-03-31', by=('month',))
+    assert sorted(monthly) == [
+        (('2025-01',), -1010.0, 2),
+        (('2025-02',), -15.0, 1),
+        (('2025-03',), -99.0, 1),
+    ]
+    assert mirror.totals(category_id=10, start_date='2025-01-01', end_date='2025-02-28') == [
+        ((), -25.0, 2)
+    ]
+    assert mirror.totals(category_id=99) == []
+
+
+def test_rollups_track_incremental_edits_and_deletes(mirror):
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [
+            _txn(1, '2025-01-05', -10, category=GROCERIES),
+            _txn(2, '2025-01-20', -1000, payee='Landlord', category=RENT),
+            _txn(3, '2025-02-03', -15, category=GROCERIES),
+            _txn(4, '2025-02-27', -40, payee='Cafe'),
+        ],
+        [],
+        [],
+        full=True,
+    )
+    # Recategorise and move one row to another month, add one, delete one
+    mirror.apply_sync(
+        1,
+        1_700_000_100,
+        [_txn(1, '2025-02-14', -12, category=RENT), _txn(5, '2025-01-31', -7, category=RENT)],
+        [],
+        [],
+        full=False,
+    )
+    mirror.delete_transactions(1, [4])
+
+    def raw(**kw):
+        return sorted(mirror._raw_totals(kw.pop('user_id', 1), **kw))
+
+    for by in [(), ('month',), ('category',), ('month', 'category'), ('payee', 'month')]:
+        kw = {'start_date': '2025-01-01', 'end_date': '2025-02-28', 'by': by}
+        assert sorted(mirror.totals(1, **kw)) == raw(category_id=None, **kw)
+    kw = {'category_id': 20, 'start_date': '2025-01-01', 'end_date': '2025-02-28', 'by': ()}
+    assert mirror.totals(1, **kw) == [((), -1019.0, 3)]
+    assert not mirror._db.execute(
+        'SELECT * FROM rollup_payee WHERE payee = ?', ('Cafe',)
+    ).fetchall()
+
+
+def test_rollup_ranges_read_partial_months_from_raw_rows(mirror):
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [
+            _txn(1, '2025-01-05', -10, category=GROCERIES),
+            _txn(2, '2025-01-20', -20, category=GROCERIES),
+            _txn(3, '2025-02-10', -30, category=GROCERIES),
+            _txn(4, '2025-03-02', -40, category=GROCERIES),
+            _txn(5, '2025-03-25', -50, category=GROCERIES),
+        ],
+        [],
+        [],
+        full=True,
+    )
+    assert mirror._rollup_plan(None, '2025-01-10', '2025-03-10', ('month',)) == (
+        'rollup_category',
+        '2025-02',
+        '2025-02',
+        [('2025-01-10', '2025-01-31'), ('2025-03-01', '2025-03-10')],
+    )
+    assert mirror._rollup_plan(None, '2025-01-10', '2025-01-20', ()) is None
+    assert mirror._rollup_plan(None, None, '2025-03-10', ()) is None
+    assert mirror._rollup_plan(None, '2025-01-01', '2025-03-31', ('category', 'payee')) is None
+    by_month = mirror.totals(1, start_date='2025-01-10', end_date='2025-03-10', by=('month',))
+    assert sorted(by_month) == [
+        (('2025-01',), -20.0, 1),
+        (('2025-02',), -30.0, 1),
+        (('2025-03',), -40.0, 1),
+    ]
+
+
+async def test_reports_served_from_mirror_after_one_sync(srv, mock_client, monkeypatch, tmp_path):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.url.path, dict(request.url.params)))
+        if request.url.path.endswith('/transactions'):
+            if 'updated_since' in request.url.params:
+                return httpx.Response(200, json=[_txn(3, '2025-02-01', -5, payee='Cafe')])
+            return httpx.Response(
+                200,
+                json=[_txn(1, '2025-01-05', -10, payee='Cafe'), _txn(2, '2025-01-09', -30)],
+            )
+        return httpx.Response(200, json=[])
+
+    mock_client(handler)
+    mirror = TransactionMirror(tmp_path / 'm.sqlite3')
+    monkeypatch.setattr(srv._state(), 'mirror', mirror)
+
+    first = await srv.top_spending_payees.fn('2025-01-01', '2025-12-31', user_id=1)
+    assert first == [
+        {'payee': 'Shop', 'total': -30.0, 'count': 1},
+        {'payee': 'Cafe', 'total': -10.0, 'count': 1},
+    ]
+    assert len(calls) == 3  # transactions + categories + accounts
+
+    # Fresh enough: no upstream calls at all
+    await srv.monthly_spend_trend.fn('2025-01-01', '2025-12-31', user_id=1)
+    assert len(calls) == 3
+
+    # max_age=0 forces an incremental updated_since sync
+    trend = await srv.monthly_spend_trend.fn('2025-01-01', '2025-12-31', user_id=1, max_age=0)
+    assert 'updated_since' in calls[3][1]
+    assert trend == [{'month': '2025-01', 'total': -40.0}, {'month': '2025-02', 'total': -5.0}]
+    mirror.close()
+
+
+async def test_incremental_sync_drops_recently_deleted_rows(srv, mock_client, tmp_path):
+    today = date.today()
+    recent = [_txn(1, today.isoformat(), -10), _txn(2, today.isoformat(), -30)]
+    old = [_txn(3, '2020-01-10', -5)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        if request.url.path.endswith('/transactions'):
+            if 'updated_since' in params:
+                return httpx.Response(200, json=[])
+            lo, hi = params.get('start_date', ''), params.get('end_date', '9999')
+            return httpx.Response(200, json=[t for t in recent + old if lo <= t['date'] <= hi])
+        return httpx.Response(200, json=[])
+
+    mock_client(handler)
+    mirror = TransactionMirror(tmp_path / 'm.sqlite3')
+    srv._state().mirror = mirror
+    await srv._sync_mirror(mirror, 1)
+    assert mirror.describe(1)['count'] == 3
+
+    # Deleted upstream: updated_since can't tell, the recent relisting can
+    recent.pop()
+    old.pop()
+    await srv._sync_mirror(mirror, 1)
+    assert sorted(t['id'] for t in mirror.transactions(user_id=1)) == [1, 3]
+    assert mirror.totals(1, by=('payee',)) == [(('Shop',), -15.0, 2)]
+    mirror.close()
+
+
+async def test_deleting_through_the_tool_updates_rollups(srv, monkeypatch, tmp_path):
+    from fastmcp import Client
+
+    from pocketsmith_mcp.config import ServerConfig
+
+    deleted = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        deleted.append((request.method, request.url.path))
+        return httpx.Response(204)
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        srv.httpx,
+        'AsyncClient',
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    server = srv.create_server(
+        ServerConfig(
+            developer_key='a', include_autotools=True, write_mode=True, warmup_connections=0
+        )
+    )
+    mirror = TransactionMirror(tmp_path / 'm.sqlite3')
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [_txn(1, '2025-01-05', -10, category=GROCERIES), _txn(2, '2025-01-09', -20)],
+        [],
+        [],
+        full=True,
+    )
+    srv._LIFESPANS[server].state.mirror = mirror
+    async with Client(server) as client:
+        await client.call_tool('Delete_transaction', {'id': 1})
+
+    assert deleted == [('DELETE', '/v2/transactions/1')]
+    assert mirror.totals(1, start_date='2025-01-01', end_date='2025-01-31', by=('month',)) == [
+        (('2025-01',), -20.0, 1)
+    ]
+    assert mirror.totals(1, by=('category_id',)) == [((None,), -20.0, 1)]
+    mirror.close()
+
+
+def test_totals_by_category_id_match_between_rollups_and_raw_rows(mirror):
+    mirror.apply_sync(
+        1,
+        1_700_000_000,
+        [
+            _txn(1, '2025-01-05', -10, category=GROCERIES),
+            _txn(2, '2025-02-10', -30, category=RENT),
+            _txn(3, '2025-02-11', -5),
+        ],
+        [],
+        [],
+        full=True,
+    )
+    by = ('category_id', 'category')
+    whole = mirror.totals(1, start_date='2025-01-01', end_date='2025-02-28', by=by)
+    raw = mirror._raw_totals(1, None, '2025-01-01', '2025-02-28', by)
+    assert sorted(whole, key=str) == sorted(raw, key=str)
+    assert ((None, '(uncategorised)'), -5.0, 1) in whole
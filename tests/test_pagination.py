@@ -0,0 +1,188 @@
+import asyncio
+
+import httpx
+
+
+def _page_handler(pages, per_page=2, link_last=True, delays=None):
+    """Serve `pages` (a list of row lists) with PocketSmith-style pagination headers."""
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get('page', '1'))
+        seen.append(page)
+        if delays:
+            await asyncio.sleep(delays.get(page, 0))
+        headers = {'Per-Page': str(per_page), 'Total': str(sum(len(p) for p in pages))}
+        if link_last:
+            headers['Link'] = (
+                f'<https://api.test/v2/x?page={len(pages)}>; rel="last", '
+                f'<https://api.test/v2/x?page={min(page + 1, len(pages))}>; rel="next"'
+            )
+        return httpx.Response(200, json=pages[page - 1], headers=headers)
+
+    return handler, seen
+
+
+def test_parse_link_header(srv):
+    links = srv._parse_link_header(
+        '<https://a/x?page=2>; rel="next", <https://a/x?page=9>; rel="last"'
+    )
+    assert links == {'next': 'https://a/x?page=2', 'last': 'https://a/x?page=9'}
+    assert srv._parse_link_header(None) == {}
+
+
+def test_total_pages_prefers_link_then_total(srv):
+    assert srv._total_pages({'Link': '<https://a/x?page=7>; rel="last"'}) == 7
+    assert srv._total_pages({'Total': '61', 'Per-Page': '30'}) == 3
+    assert srv._total_pages({'Total': '0', 'Per-Page': '30'}) == 1
+    assert srv._total_pages({}) is None
+
+
+async def test_fetch_transactions_reads_all_pages_in_order(srv, mock_client, monkeypatch):
+    pages = [[{'id': 1}, {'id': 2}], [{'id': 3}, {'id': 4}], [{'id': 5}]]
+    # Later pages answer first to prove results are reassembled in page order
+    handler, seen = _page_handler(pages, delays={2: 0.02, 3: 0.0})
+    mock_client(handler, shard_months=12)  # one window, so pages map 1:1
+
+    rows = await srv._fetch_transactions(1, start_date='2025-01-01', end_date='2025-12-31')
+
+    assert [r['id'] for r in rows] == [1, 2, 3, 4, 5]
+    assert sorted(seen) == [1, 2, 3]
+
+
+async def test_fetch_pages_respects_concurrency(srv, mock_client):
+    pages = [[{'id': i}] for i in range(1, 9)]
+    in_flight = 0
+    peak = 0
+    inner, _ = _page_handler(pages, per_page=1)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        try:
+            return await inner(request)
+        finally:
+            in_flight -= 1
+
+    mock_client(handler)
+    rows = await srv._fetch_pages('/categories/5/transactions', concurrency=2)
+
+    assert [r['id'] for r in rows] == list(range(1, 9))
+    assert peak == 2
+
+
+async def test_fetch_pages_follows_next_without_page_count(srv, mock_client):
+    pages = [[{'id': 1}], [{'id': 2}], []]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params.get('page', '1'))
+        headers = {}
+        if page < len(pages):
+            headers['Link'] = f'<https://api.test/v2/x?page={page + 1}>; rel="next"'
+        return httpx.Response(200, json=pages[page - 1], headers=headers)
+
+    mock_client(handler)
+    rows = await srv._fetch_pages('/users/1/transactions')
+    assert [r['id'] for r in rows] == [1, 2]
+
+
+async def test_long_ranges_are_sharded_and_deduplicated(srv, mock_client, monkeypatch):
+    windows = []
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        params = request.url.params
+        windows.append((params['start_date'], params['end_date']))
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        # id 7 straddles two windows, as an edited transaction might between requests
+        rows = [{'id': params['start_date']}, {'id': 7}]
+        return httpx.Response(200, json=rows)
+
+    mock_client(handler, segment_cache=False, shard_concurrency=2)
+    rows = await srv._fetch_transactions(1, start_date='2024-01-15', end_date='2024-12-31')
+
+    assert sorted(windows) == [
+        ('2024-01-15', '2024-03-31'),
+        ('2024-04-01', '2024-06-30'),
+        ('2024-07-01', '2024-09-30'),
+        ('2024-10-01', '2024-12-31'),
+    ]
+    assert [r['id'] for r in rows] == ['2024-10-01', 7, '2024-07-01', '2024-04-01', '2024-01-15']
+    assert peak == 2
+
+
+async def test_sharding_runs_serially_while_rate_limiter_paces(srv, mock_client, monkeypatch):
+    limiter = srv.RateLimiter()
+    limiter.update(
+        {'X-Rate-Limit-Limit': '1000', 'X-Rate-Limit-Remaining': '50', 'X-Rate-Limit-Reset': '60'}
+    )
+    assert limiter.pacing()
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.005)
+        in_flight -= 1
+        return httpx.Response(200, json=[])
+
+    mock_client(handler, segment_cache=False)
+    monkeypatch.setattr(srv._state(), 'rate_limiter', limiter)
+    await srv._fetch_transactions(1, start_date='2024-01-01', end_date='2024-12-31')
+    assert peak == 1
+
+
+async def test_bounded_in_order_limits_lookahead(srv):
+    started = []
+
+    def factory(i):
+        async def run():
+            started.append(i)
+            await asyncio.sleep(0.001 * (5 - i))
+            return i
+
+        return run
+
+    seen = []
+    async for value in srv._bounded_in_order([factory(i) for i in range(5)], 2):
+        # Never more than `limit` results started beyond what has been consumed
+        assert len(started) <= len(seen) + 2
+        seen.append(value)
+    assert seen == [0, 1, 2, 3, 4]
+
+
+async def test_reports_stream_pages_without_segment_cache(srv, mock_client, monkeypatch):
+    pages = [
+        [{'id': 1, 'date': '2025-01-05', 'amount': -10, 'payee': 'Cafe'}],
+        [{'id': 2, 'date': '2025-01-06', 'amount': -5, 'payee': 'Cafe'}],
+        [{'id': 3, 'date': '2025-01-07', 'amount': -1, 'payee': 'Bakery'}],
+    ]
+    handler, seen = _page_handler(pages, per_page=1)
+    mock_client(handler, segment_cache=False)
+    consumed = []
+    original = srv._aggregate
+
+    async def spy(stream, *groupings):
+        async def tap():
+            async for rows in stream:
+                consumed.append(len(rows))
+                yield rows
+
+        return await original(tap(), *groupings)
+
+    monkeypatch.setattr(srv, '_aggregate', spy)
+    result = await srv.top_spending_payees.fn('2025-01-01', '2025-01-31', user_id=1)
+    assert result == [
+        {'payee': 'Cafe', 'total': -15.0, 'count': 2},
+        {'payee': 'Bakery', 'total': -1.0, 'count': 1},
+    ]
+    assert consumed == [1, 1, 1]
@@ -0,0 +1,80 @@
+import httpx
+import pytest
+
+from pocketsmith_mcp.config import ServerConfig
+from pocketsmith_mcp.projection import select, to_columns
+
+TX = {
+    'id': 7,
+    'date': '2025-03-02',
+    'payee': 'Cafe',
+    'amount': -4.5,
+    'labels': ['coffee'],
+    'category': {'id': 3, 'title': 'Eating out', 'children': []},
+    'transaction_account': {'id': 11, 'institution': {'id': 1, 'title': 'Bank'}},
+}
+
+
+def test_fields_follow_dotted_paths():
+    rows = select([TX], 'transaction', fields=['id', 'category.title', 'transaction_account.x'])
+    assert rows == [{'id': 7, 'category.title': 'Eating out', 'transaction_account.x': None}]
+
+
+def test_compact_flattens_and_selects():
+    assert select([TX], 'transaction', compact=True) == [
+        {
+            'id': 7,
+            'date': '2025-03-02',
+            'payee': 'Cafe',
+            'amount': -4.5,
+            'category_id': 3,
+            'category_title': 'Eating out',
+            'account_id': 11,
+        }
+    ]
+    assert select([TX], 'transaction', ['id', 'amount'], compact=True) == [
+        {'id': 7, 'amount': -4.5}
+    ]
+    with pytest.raises(ValueError, match='labels'):
+        select([TX], 'transaction', ['labels'], compact=True)
+
+
+def test_columns_union_keys_in_order():
+    assert to_columns([{'a': 1}, {'b': 2, 'a': 3}]) == {
+        'columns': ['a', 'b'],
+        'rows': [[1, None], [3, 2]],
+    }
+
+
+async def test_columnar_pages_share_one_header(srv, mock_client):
+    rows = [{**TX, 'id': i} for i in range(5)]
+    mock_client(lambda request: httpx.Response(200, json=rows), result_page_size=2)
+
+    first = await srv.list_transactions.fn(user_id=1, compact=True, columnar=True)
+    assert 'items' not in first and first['columns'][:2] == ['id', 'date']
+    assert [r[0] for r in first['rows']] == [0, 1]
+    second = await srv.next_page.fn(first['next_cursor'])
+    assert second['columns'] == first['columns'] and [r[0] for r in second['rows']] == [2, 3]
+
+
+async def test_projected_tools_over_mcp(srv, monkeypatch):
+    from fastmcp import Client
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == '/v2/me':
+            return httpx.Response(200, json={'id': 1})
+        return httpx.Response(200, json=[{'id': 5, 'title': 'Cheque', 'scenarios': [{}] * 3}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        srv.httpx,
+        'AsyncClient',
+        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+    )
+    server = srv.create_server(ServerConfig(warmup_connections=0))
+    async with Client(server) as client:
+        result = await client.call_tool('get_accounts', {'compact': True, 'columnar': True})
+        assert result.data['columns'][:2] == ['id', 'title']
+        assert result.data['rows'][0][:2] == [5, 'Cheque']
+        result = await client.call_tool('get_accounts', {'fields': ['title']})
+        assert result.structured_content == {'result': [{'title': 'Cheque'}]}
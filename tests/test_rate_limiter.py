@@ -0,0 +1,86 @@
+import httpx
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_limiter_passes_through_until_headers_seen(srv):
+    limiter = srv.RateLimiter(clock=_Clock())
+    for _ in range(100):
+        assert limiter._try_acquire() == 0.0
+
+
+def test_limiter_paces_when_budget_runs_low(srv):
+    clock = _Clock()
+    limiter = srv.RateLimiter(reserve=0.1, clock=clock)
+    limiter.update(
+        {'X-Rate-Limit-Limit': '100', 'X-Rate-Limit-Remaining': '12', 'X-Rate-Limit-Reset': '50'}
+    )
+    # Above the low-water mark (10): straight through
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == 0.0
+    # At the low-water mark: one token now, the next spaced over the remaining window
+    assert limiter._try_acquire() == 0.0
+    assert limiter._try_acquire() == 5.0
+    clock.now += 5.0
+    assert limiter._try_acquire() == 0.0
+
+
+def test_limiter_keeps_lower_count_and_refills_after_reset(srv):
+    clock = _Clock()
+    limiter = srv.RateLimiter(clock=clock)
+    headers = {
+        'X-Rate-Limit-Limit': '30',
+        'X-Rate-Limit-Remaining': '5',
+        'X-Rate-Limit-Reset': '10',
+    }
+    limiter.update(headers)
+    limiter.tokens = 2.0  # two requests in flight since that response
+    limiter.update({**headers, 'X-Rate-Limit-Reset': '9.5'})
+    assert limiter.tokens == 2.0
+    clock.now += 11
+    assert limiter._try_acquire() == 0.0
+    assert limiter.tokens == 29.0
+
+
+def test_limiter_block_holds_callers(srv):
+    clock = _Clock()
+    limiter = srv.RateLimiter(clock=clock)
+    limiter.block(3.0)
+    assert limiter._try_acquire() == 3.0
+    clock.now += 3.0
+    assert limiter._try_acquire() == 0.0
+
+
+async def test_patched_client_feeds_limiter_and_retries_429(srv):
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            return httpx.Response(429, headers={'Retry-After': '0.01'})
+        return httpx.Response(
+            200,
+            json={'id': 7},
+            headers={
+                'X-Rate-Limit-Limit': '60',
+                'X-Rate-Limit-Remaining': '59',
+                'X-Rate-Limit-Reset': '30',
+            },
+        )
+
+    client = httpx.AsyncClient(base_url='https://api.test', transport=httpx.MockTransport(handler))
+    limiter = srv.RateLimiter()
+    srv._install_retries(client, limiter)
+
+    resp = await client.get('/me')
+
+    assert resp.status_code == 200 and calls == 2
+    assert limiter.limit == 60 and limiter.tokens == 59.0
+    assert limiter.waits == 1
@@ -0,0 +1,63 @@
+import pytest
+
+from pocketsmith_mcp.records import Transaction, parse_date
+
+
+def test_from_api_full_payload():
+    t = Transaction.from_api(
+        {
+            'id': 42,
+            'date': '2025-02-27',
+            'amount': -34.6,
+            'payee': 'St Martins New World',
+            'category': {'id': 7, 'title': 'Groceries'},
+            'transaction_account': {'id': 3},
+            'type': 'debit',
+            'needs_review': True,
+        }
+    )
+    assert (t.id, t.date, t.amount, t.payee, t.category, t.category_id) == (
+        42,
+        '2025-02-27',
+        -34.6,
+        'St Martins New World',
+        'Groceries',
+        7,
+    )
+    assert t.month == 2025 * 12 + 1
+    assert t.account_id == 3 and t.type == 'debit' and t.needs_review is True
+
+
+@pytest.mark.parametrize(
+    'row, expected',
+    [
+        ({'amount_cents': 0, 'transaction_date': '2025-01-31T10:00:00Z'}, (0.0, '2025-01-31')),
+        ({'amount': 0, 'amount_cents': 99}, (0.0, None)),
+        ({'amount': 'oops', 'created_at': '2025-03-01'}, (None, '2025-03-01')),
+        ({'date': 'not-a-date'}, (None, None)),
+    ],
+)
+def test_amount_and_date_fallbacks(row, expected):
+    t = Transaction.from_api(row)
+    assert (t.amount, t.date) == expected
+
+
+def test_category_and_payee_fallbacks_are_interned():
+    a = Transaction.from_api({'category_name': ''.join(['Re', 'nt']), 'payee_name': 'Landlord'})
+    b = Transaction.from_api({'category': {'title': 'Rent'}, 'merchant': 'Landlord'})
+    assert a.category == 'Rent' and a.category is b.category
+    assert a.payee is b.payee
+    c = Transaction.from_api({'category': 'not-a-dict'})
+    assert (c.category, c.payee, c.category_id) == ('(uncategorised)', '(unknown)', None)
+
+
+def test_records_have_no_instance_dict():
+    t = Transaction.from_api({'id': 1})
+    assert not hasattr(t, '__dict__')
+    with pytest.raises(AttributeError):
+        t.extra = 1  # type: ignore[attr-defined]
+
+
+def test_parse_date_month_ordinal():
+    assert parse_date('1999-12-31') == ('1999-12-31', 1999 * 12 + 11)
+    assert parse_date('garbage') == (None, -1)
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+
+from pocketsmith_mcp.refdata import ReferenceCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+async def test_ttl_expiry_and_counters():
+    clock = _Clock()
+    cache = ReferenceCache(ttl=60, clock=clock)
+    fetches = []
+
+    async def fetch():
+        fetches.append(clock.now)
+        return {'id': 1}
+
+    assert await cache.get('user', 'me', fetch) == {'id': 1}
+    await cache.get('user', 'me', fetch)
+    clock.now += 61
+    await cache.get('user', 'me', fetch)
+
+    assert fetches == [100.0, 161.0]
+    assert cache.stats()['hits']['user'] == 1
+    assert cache.stats()['misses']['user'] == 2
+
+
+async def test_invalidation_by_entity_key_and_credentials():
+    cache = ReferenceCache()
+
+    async def fetch():
+        return []
+
+    cache.bind('a')
+    await cache.get('accounts', 1, fetch)
+    await cache.get('accounts', 2, fetch)
+    await cache.get('categories', 1, fetch)
+    cache.invalidate('accounts', 1)
+    assert cache.stats()['entries'] == 2
+    cache.invalidate('accounts')
+    assert cache.stats()['entries'] == 1
+    cache.bind('a')
+    assert cache.stats()['entries'] == 1
+    cache.bind('b')
+    assert cache.stats()['entries'] == 0
+
+
+async def test_entries_are_bounded_and_concurrent_misses_share_a_fetch():
+    cache = ReferenceCache(max_entries=2)
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0)
+        return {'id': len(fetches)}
+
+    values = await asyncio.gather(*(cache.get('account', 7, fetch) for _ in range(5)))
+    assert values == [{'id': 1}] * 5
+    assert len(fetches) == 1 and cache.stats()['coalesced'] == 4
+
+    await cache.get('account', 8, fetch)
+    await cache.get('account', 7, fetch)  # now most recently used
+    await cache.get('account', 9, fetch)
+    assert cache.stats()['entries'] == 2
+    await cache.get('account', 7, fetch)
+    await cache.get('account', 8, fetch)
+    assert len(fetches) == 4  # 8 was evicted, 7 was not
+
+    # A load that raced an invalidation is returned but not kept
+    pending = asyncio.ensure_future(cache.get('account', 1, fetch))
+    await asyncio.sleep(0)
+    cache.invalidate('account')
+    assert await pending == {'id': 5}
+    assert await cache.get('account', 1, fetch) == {'id': 6}
+
+
+async def test_user_id_resolved_once_across_tools(srv, layered_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, request.url.path))
+        if request.url.path == '/v2/me':
+            return httpx.Response(200, json={'id': 1})
+        return httpx.Response(200, json=[{'id': 10}])
+
+    client = layered_client(handler).client
+
+    await srv.list_categories.fn()
+    await srv.get_accounts.fn()
+    await srv.list_categories.fn()
+    await srv.get_accounts.fn()
+    assert calls == [
+        ('GET', '/v2/me'),
+        ('GET', '/v2/users/1/categories'),
+        ('GET', '/v2/users/1/accounts'),
+    ]
+
+    # A write to a category drops the cached trees but keeps the user and accounts
+    await client.put('/categories/10', json={'title': 'Food'})
+    await srv.list_categories.fn()
+    await srv.get_accounts.fn()
+    assert calls[3:] == [('PUT', '/v2/categories/10'), ('GET', '/v2/users/1/categories')]
@@ -0,0 +1,95 @@
+import httpx
+import pytest
+
+TXNS = [
+    {'id': 1, 'date': '2025-01-05', 'amount': -10, 'payee': 'Cafe', 'category': {'title': 'Food'}},
+    {
+        'id': 2,
+        'date': '2025-01-20',
+        'amount': -30,
+        'payee': 'Grocer',
+        'category': {'title': 'Food'},
+    },
+    {'id': 3, 'date': '2025-02-01', 'amount': -1000, 'payee': 'Landlord', 'category_name': 'Rent'},
+    {'id': 4, 'date': '2025-02-11', 'amount': 0, 'payee': 'Cafe'},
+]
+
+
+@pytest.fixture
+def api(srv, mock_client):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == '/v2/me':
+            return httpx.Response(200, json={'id': 1})
+        return httpx.Response(200, json=TXNS)
+
+    mock_client(handler)
+    return calls
+
+
+async def test_top_spending_categories(srv, api):
+    result = await srv.top_spending_categories.fn('2025-01-01', '2025-03-31', limit=2)
+    assert result == [
+        {'category': 'Rent', 'total': -1000.0, 'count': 1},
+        {'category': 'Food', 'total': -40.0, 'count': 2},
+    ]
+    assert api == ['/v2/me', '/v2/users/1/transactions']
+
+
+async def test_top_spending_payees_counts_zero_amounts(srv, api):
+    result = await srv.top_spending_payees.fn('2025-01-01', '2025-03-31', user_id=1)
+    assert {'payee': 'Cafe', 'total': -10.0, 'count': 2} in result
+
+
+async def test_monthly_spend_trend_groupings(srv, api):
+    total = await srv.monthly_spend_trend.fn('2025-01-01', '2025-03-31', user_id=1)
+    assert total == [{'month': '2025-01', 'total': -40.0}, {'month': '2025-02', 'total': -1000.0}]
+
+    by_cat = await srv.monthly_spend_trend.fn(
+        '2025-01-01', '2025-03-31', group_by='category', user_id=1
+    )
+    assert by_cat == [
+        {'month': '2025-01', 'category': 'Food', 'total': -40.0},
+        {'month': '2025-02', 'category': 'Rent', 'total': -1000.0},
+        {'month': '2025-02', 'category': '(uncategorised)', 'total': 0.0},
+    ]
+
+
+async def test_category_spend_summary(srv, api):
+    result = await srv.category_spend_summary.fn(7, '2025-01-01', '2025-03-31')
+    assert result == {'category_id': 7, 'total': -1040.0, 'count': 4}
+
+
+async def test_spending_dashboard_single_fetch(srv, api):
+    result = await srv.spending_dashboard.fn('2025-01-01', '2025-03-31', payee_limit=1)
+    assert api == ['/v2/me', '/v2/users/1/transactions']
+    assert result['summary'] == {
+        'count': 4,
+        'total': -1040.0,
+        'min': -1000.0,
+        'max': 0.0,
+        'mean': -260.0,
+    }
+    assert result['top_categories'][0] == {'category': 'Rent', 'total': -1000.0, 'count': 1}
+    assert result['top_payees'] == [{'payee': 'Landlord', 'total': -1000.0, 'count': 1}]
+    assert result['monthly'] == [
+        {'month': '2025-01', 'total': -40.0, 'count': 2},
+        {'month': '2025-02', 'total': -1000.0, 'count': 2},
+    ]
+    assert result['monthly_by_category'][0] == {
+        'month': '2025-01',
+        'category': 'Food',
+        'total': -40.0,
+    }
+
+
+async def test_spending_dashboard_matches_from_mirror(srv, api, monkeypatch, tmp_path):
+    from pocketsmith_mcp.mirror import TransactionMirror
+
+    expected = await srv.spending_dashboard.fn('2025-01-01', '2025-03-31', user_id=1)
+    mirror = TransactionMirror(tmp_path / 'm.sqlite3')
+    monkeypatch.setattr(srv._state(), 'mirror', mirror)
+    assert await srv.spending_dashboard.fn('2025-01-01', '2025-03-31', user_id=1) == expected
+    mirror.close()
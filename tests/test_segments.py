@@ -0,0 +1,211 @@
+import asyncio
+from datetime import date
+
+import pytest
+
+from pocketsmith_mcp.segments import SegmentCache, date_windows
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _upstream(rows):
+    """Fake fetch_window over a fixed set of rows; records each requested window."""
+    windows = []
+
+    async def fetch_window(start, end):
+        windows.append((start, end))
+        return [r for r in rows if start <= r['date'] <= end]
+
+    return fetch_window, windows
+
+
+ROWS = [{'id': i, 'date': f'2025-{m:02d}-15'} for i, m in enumerate(range(1, 13), start=1)]
+
+
+def _cache(**kwargs):
+    return SegmentCache(today=lambda: date(2025, 12, 20), **kwargs)
+
+
+async def test_overlapping_window_only_fetches_gap():
+    cache = _cache()
+    fetch_window, windows = _upstream(ROWS)
+
+    first = await cache.fetch('k', '2025-01-01', '2025-06-30', fetch_window)
+    second = await cache.fetch('k', '2025-03-10', '2025-09-20', fetch_window)
+
+    assert [r['id'] for r in first] == [6, 5, 4, 3, 2, 1]
+    assert [r['id'] for r in second] == [9, 8, 7, 6, 5, 4, 3]
+    # Gaps are fetched in windows of window_months (3), newest first
+    assert windows == [
+        ('2025-04-01', '2025-06-30'),
+        ('2025-01-01', '2025-03-31'),
+        ('2025-07-01', '2025-09-30'),
+    ]
+    assert cache.stats() == {'segments': 9, 'rows': 9, 'hits': 4, 'misses': 9, 'shared_hits': 0}
+
+
+async def test_each_gap_is_one_request():
+    cache = _cache()
+    fetch_window, windows = _upstream(ROWS)
+    await cache.fetch('k', '2025-03-01', '2025-03-31', fetch_window)
+    await cache.fetch('k', '2025-06-01', '2025-06-30', fetch_window)
+    windows.clear()
+
+    await cache.fetch('k', '2025-01-01', '2025-08-31', fetch_window)
+
+    assert sorted(windows) == [
+        ('2025-01-01', '2025-02-28'),
+        ('2025-04-01', '2025-05-31'),
+        ('2025-07-01', '2025-08-31'),
+    ]
+
+
+async def test_recent_months_expire_before_settled_months():
+    clock = _Clock()
+    cache = _cache(recent_ttl=60, settled_ttl=3600, settle_days=60, clock=clock)
+    fetch_window, windows = _upstream(ROWS)
+    await cache.fetch('k', '2025-01-01', '2025-12-31', fetch_window)
+    windows.clear()
+
+    clock.now += 61
+    await cache.fetch('k', '2025-01-01', '2025-12-31', fetch_window)
+
+    # Only October (ended < 60 days before 2025-12-20) onwards is refetched
+    assert windows == [('2025-10-01', '2025-12-31')]
+
+    # Settled months expire too, just later
+    windows.clear()
+    clock.now += 3600
+    await cache.fetch('k', '2025-01-01', '2025-12-31', fetch_window)
+    assert sorted(windows)[0] == ('2025-01-01', '2025-03-31') and len(windows) == 4
+
+
+async def test_rows_are_dated_like_transactions():
+    cache = _cache()
+    rows = [
+        {'id': 1, 'transaction_date': '2025-02-03'},
+        {'id': 2, 'created_at': '2025-01-20T10:00:00Z'},
+        {'id': 3},
+    ]
+
+    async def fetch_window(start, end):
+        return rows
+
+    months = cache.stream('k', '2025-01-01', '2025-02-28', fetch_window)
+    # The undated row stays with the first month of the gap
+    assert [[r['id'] for r in rows] async for rows in months] == [[1], [2, 3]]
+
+
+async def test_cold_ranges_prefetch_a_bounded_number_of_windows():
+    cache = _cache(window_months=1, window_concurrency=2)
+    fetch_window, windows = _upstream(ROWS)
+    months = cache.stream('k', '2025-01-01', '2025-12-31', fetch_window)
+    assert [r['id'] for r in await months.__anext__()] == [12]
+    # December plus at most two one-month windows ahead, not the whole year
+    assert len(windows) <= 3 and all(lo[:7] == hi[:7] for lo, hi in windows)
+    await months.aclose()
+
+
+async def test_segments_are_capped_by_rows():
+    cache = _cache(max_rows=3)
+    fetch_window, _ = _upstream(ROWS)
+    await cache.fetch('k', '2025-01-01', '2025-06-30', fetch_window)
+    assert cache.stats()['segments'] == 3 and cache.stats()['rows'] == 3
+    # One month bigger than the cap is still kept on its own
+    big = [{'id': i, 'date': '2025-08-01'} for i in range(5)]
+    await cache.fetch('big', '2025-08-01', '2025-08-31', _upstream(big)[0])
+    assert cache.stats()['segments'] == 1 and cache.stats()['rows'] == 5
+
+
+async def test_keys_are_isolated_and_invalidate():
+    cache = _cache()
+    fetch_window, windows = _upstream(ROWS)
+    await cache.fetch(('a', ()), '2025-01-01', '2025-01-31', fetch_window)
+    await cache.fetch(('b', ()), '2025-01-01', '2025-01-31', fetch_window)
+    cache.invalidate(('a', ()))
+    await cache.fetch(('a', ()), '2025-01-01', '2025-01-31', fetch_window)
+    await cache.fetch(('b', ()), '2025-01-01', '2025-01-31', fetch_window)
+    assert len(windows) == 3
+
+
+async def test_stream_yields_one_month_at_a_time():
+    cache = _cache()
+    fetch_window, windows = _upstream(ROWS)
+    await cache.fetch('k', '2025-03-01', '2025-03-31', fetch_window)
+    windows.clear()
+
+    months = cache.stream('k', '2025-01-01', '2025-04-20', fetch_window)
+    assert [[r['id'] for r in rows] async for rows in months] == [[4], [3], [2], [1]]
+    assert sorted(windows) == [('2025-01-01', '2025-02-28'), ('2025-04-01', '2025-04-30')]
+
+    # Stopping early cancels the gaps still being fetched
+    cancelled = []
+
+    async def slow_window(start, end):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(start)
+            raise
+
+    cache.invalidate()
+    await cache.fetch('k', '2025-03-01', '2025-03-31', fetch_window)
+    months = cache.stream('k', '2025-01-01', '2025-03-31', slow_window)
+    assert [r['id'] for r in await months.__anext__()] == [3]
+    await asyncio.sleep(0)
+    await months.aclose()
+    await asyncio.sleep(0)
+    assert cancelled == ['2025-01-01']
+
+
+async def test_invalid_dates_raise():
+    fetch_window, _ = _upstream(ROWS)
+    with pytest.raises(ValueError):
+        await _cache().fetch('k', 'last month', '2025-01-31', fetch_window)
+
+
+def test_date_windows_align_to_months_newest_first():
+    assert date_windows('2024-01-15', '2024-08-10', 3) == [
+        ('2024-07-01', '2024-08-10'),
+        ('2024-04-01', '2024-06-30'),
+        ('2024-01-15', '2024-03-31'),
+    ]
+    assert date_windows('2024-03-05', '2024-03-09', 1) == [('2024-03-05', '2024-03-09')]
+
+
+async def test_fetch_transactions_uses_segment_cache(srv, mock_client, monkeypatch):
+    import httpx
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(dict(request.url.params))
+        return httpx.Response(200, json=[])
+
+    mock_client(handler, shard_months=12)  # one upstream request per gap
+    await srv._fetch_transactions(1, start_date='2020-01-01', end_date='2020-06-30')
+    await srv._fetch_transactions(1, start_date='2020-02-01', end_date='2020-03-31')
+    await srv._fetch_transactions(
+        1, start_date='2020-02-01', end_date='2020-03-31', tx_type='debit'
+    )
+    await srv._fetch_transactions(1, updated_since='2020-01-01T00:00:00Z')
+
+    assert calls == [
+        {'start_date': '2020-01-01', 'end_date': '2020-06-30'},
+        {'type': 'debit', 'start_date': '2020-02-01', 'end_date': '2020-03-31'},
+        {'updated_since': '2020-01-01T00:00:00Z'},
+    ]
+
+    # Category and category rule writes rename or recategorise cached rows
+    state = srv._state()
+    for path in ('/v2/categories/4', '/v2/categories/4/category_rules'):
+        calls.clear()
+        await srv._invalidate_after_write(state, 'POST', path)
+        await srv._fetch_transactions(1, start_date='2020-02-01', end_date='2020-03-31')
+        assert calls == [{'start_date': '2020-02-01', 'end_date': '2020-03-31'}]
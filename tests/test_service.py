@@ -0,0 +1,92 @@
+import json
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from pocketsmith_mcp.__main__ import _parse_args
+from pocketsmith_mcp.config import ServerConfig
+
+
+def _call(client: TestClient, request_id: int, tool: str) -> dict:
+    resp = client.post(
+        '/mcp/',
+        json={
+            'jsonrpc': '2.0',
+            'id': request_id,
+            'method': 'tools/call',
+            'params': {'name': tool, 'arguments': {}},
+        },
+        headers={'Accept': 'application/json, text/event-stream'},
+    )
+    assert resp.status_code == 200
+    data = [line[5:] for line in resp.text.splitlines() if line.startswith('data:')]
+    return json.loads(data[-1])
+
+
+def test_app_shares_worker_state_across_requests(srv, monkeypatch):
+    from pocketsmith_mcp.service import create_app
+
+    paths = []
+    created = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return httpx.Response(200, json={'id': 1, 'login': 'me'})
+
+    real_client = httpx.AsyncClient
+
+    def make_client(**kwargs):
+        client = real_client(transport=httpx.MockTransport(handler), **kwargs)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(srv.httpx, 'AsyncClient', make_client)
+    app = create_app(ServerConfig(developer_key='k', warmup_connections=0), stateless=True)
+
+    with TestClient(app) as client:
+        assert client.get('/healthz').json()['status'] == 'ok'
+        assert client.get('/readyz').json() == {'status': 'ready'}
+        # Each stateless request is its own MCP session, yet the reference cache is shared
+        assert not _call(client, 1, 'me')['result']['isError']
+        assert not _call(client, 2, 'me')['result']['isError']
+        assert len(created) == 1 and paths == ['/v2/me']
+
+    assert created[0].is_closed
+
+
+def test_readyz_unavailable_before_startup(srv):
+    from pocketsmith_mcp.service import create_app
+
+    app = create_app(ServerConfig(warmup_connections=0))
+    # Without entering the lifespan the worker state is never opened
+    client = TestClient(app)
+    assert client.get('/healthz').status_code == 200
+    ready = client.get('/readyz')
+    assert ready.status_code == 503 and ready.json() == {'status': 'unavailable'}
+
+
+def test_cli_forces_stateless_with_several_workers():
+    args = _parse_args(['--http', '--workers', '4', '--port', '9000'])
+    assert args.http and args.stateless and args.port == 9000
+    assert not _parse_args(['--http']).stateless
+    assert not _parse_args([]).http
+
+
+def test_several_workers_need_a_shared_cache_backend(monkeypatch):
+    import uvicorn
+
+    from pocketsmith_mcp import service
+
+    monkeypatch.setattr(uvicorn, 'run', lambda *args, **kwargs: None)
+    monkeypatch.setattr(service.ServerConfig, 'from_env', classmethod(lambda cls: cls()))
+    # run() exports settings for its workers; restore them afterwards
+    for name in ('POCKETSMITH_HTTP_PATH', 'POCKETSMITH_HTTP_STATELESS'):
+        monkeypatch.setenv(name, '')
+    monkeypatch.delenv('POCKETSMITH_CACHE_BACKEND', raising=False)
+    service.run(workers=2)
+    assert service.os.environ['POCKETSMITH_CACHE_BACKEND'] == 'sqlite'
+
+    monkeypatch.setenv('POCKETSMITH_CACHE_BACKEND', 'memory')
+    with pytest.raises(ValueError, match='worker-local'):
+        service.run(workers=2)
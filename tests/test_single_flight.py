@@ -0,0 +1,100 @@
+import asyncio
+
+import httpx
+
+
+def _client(srv, handler, **kwargs):
+    client = httpx.AsyncClient(
+        base_url='https://api.test', transport=httpx.MockTransport(handler), **kwargs
+    )
+    flight = srv.SingleFlight()
+    srv._install_single_flight(client, flight)
+    return client, flight
+
+
+async def test_identical_gets_share_one_request_and_body(srv):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={'id': 42})
+
+    client, flight = _client(srv, handler, headers={'X-Developer-Key': 'k'})
+    responses = await asyncio.gather(*(client.get('/me') for _ in range(5)))
+
+    assert len(calls) == 1
+    bodies = [r.json() for r in responses]
+    assert all(b is bodies[0] for b in bodies)
+    assert flight.snapshot() == {'upstream': 1, 'coalesced': 4, 'in_flight': 0}
+
+
+async def test_distinct_params_credentials_and_writes_are_not_coalesced(srv):
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append((request.method, str(request.url), request.headers.get('X-Developer-Key')))
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json=[])
+
+    client, flight = _client(srv, handler)
+    await asyncio.gather(
+        client.get('/users/1/transactions', params={'page': 1}),
+        client.get('/users/1/transactions', params={'page': 2}),
+        client.get('/me', headers={'X-Developer-Key': 'a'}),
+        client.get('/me', headers={'X-Developer-Key': 'b'}),
+        client.put('/transactions/1', json={'note': 'x'}),
+        client.put('/transactions/1', json={'note': 'x'}),
+    )
+
+    assert len(calls) == 6
+    assert flight.coalesced == 0
+
+
+async def test_errors_propagate_to_every_waiter(srv):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        raise httpx.ConnectError('boom', request=request)
+
+    client, flight = _client(srv, handler)
+    results = await asyncio.gather(client.get('/me'), client.get('/me'), return_exceptions=True)
+
+    assert all(isinstance(r, httpx.ConnectError) for r in results)
+    assert flight.snapshot()['in_flight'] == 0
+
+
+async def test_layers_compose_on_the_server_client(layered_client):
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((request.method, request.headers.get('If-None-Match')))
+        await asyncio.sleep(0.01)
+        if request.method != 'GET':
+            return httpx.Response(200, json={'id': 4})
+        if len(seen) == 1:
+            return httpx.Response(503)
+        if request.headers.get('If-None-Match') == '"v1"':
+            return httpx.Response(304, headers={'ETag': '"v1"'})
+        return httpx.Response(200, json={'id': 1}, headers={'ETag': '"v1"'})
+
+    state = layered_client(handler)
+    client = state.client
+
+    # Coalesced into one call, which retries past the 503
+    responses = await asyncio.gather(*(client.get('/me') for _ in range(3)))
+    assert [r.json() for r in responses] == [{'id': 1}] * 3
+    assert seen == [('GET', None), ('GET', None)]
+    assert state.single_flight.snapshot()['coalesced'] == 2
+
+    # Revalidated with the stored ETag and answered from the cache
+    resp = await client.get('/me')
+    assert resp.status_code == 200 and resp.json() == {'id': 1}
+    assert seen[-1] == ('GET', '"v1"')
+
+    # A successful write drops the reference data it may have changed
+    async def fetch():
+        return []
+
+    await state.ref_cache.get('categories', 1, fetch)
+    await client.put('/categories/4', json={'title': 'Food'})
+    assert state.ref_cache.stats()['entries'] == 0
@@ -0,0 +1,130 @@
+import httpx
+import pytest
+
+from pocketsmith_mcp.config import ServerConfig
+
+
+def test_default_base_url_matches_bundled_spec(srv):
+    assert srv.detect_base_url(srv.load_openapi_spec()) == srv.DEFAULT_BASE_URL
+
+
+def test_curated_only_server_skips_spec(srv, monkeypatch):
+    def no_spec():
+        raise AssertionError('spec loaded without autotools')
+
+    monkeypatch.setattr(srv, 'load_openapi_spec', no_spec)
+    srv.create_server(ServerConfig())
+
+
+async def test_servers_have_separate_clients_closed_on_shutdown(srv, monkeypatch):
+    from fastmcp import Client
+
+    keys = []
+    created = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        keys.append(request.headers.get('X-Developer-Key'))
+        return httpx.Response(200, json={'id': len(keys)})
+
+    real_client = httpx.AsyncClient
+
+    def make_client(**kwargs):
+        client = real_client(transport=httpx.MockTransport(handler), **kwargs)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(srv.httpx, 'AsyncClient', make_client)
+    first = srv.create_server(ServerConfig(developer_key='a', warmup_connections=0))
+    second = srv.create_server(ServerConfig(developer_key='b', warmup_connections=0))
+    assert created == []  # nothing is opened until a session starts
+
+    async with Client(first) as a, Client(second) as b:
+        await a.call_tool('me', {})
+        await b.call_tool('me', {})
+        # Served from the first server's own reference cache
+        await a.call_tool('me', {})
+
+    assert keys == ['a', 'b']
+    assert len(created) == 2 and all(c.is_closed for c in created)
+
+
+async def test_autotools_state_survives_between_sessions(srv, monkeypatch):
+    from fastmcp import Client
+
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        return httpx.Response(200, json=[{'name': 'UTC'}])
+
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        srv.httpx,
+        'AsyncClient',
+        lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    server = srv.create_server(
+        ServerConfig(developer_key='a', include_autotools=True, warmup_connections=0)
+    )
+    state = srv._LIFESPANS[server].state
+    for _ in range(2):
+        async with Client(server) as client:
+            await client.call_tool('List_time_zones', {})
+        assert not state.client.is_closed
+
+    assert paths.count('/v2/time_zones') == 2
+
+    # Leaving serving() is the server's shutdown: the pinned state closes too
+    async with srv.serving(server):
+        async with Client(server) as client:
+            await client.call_tool('List_time_zones', {})
+    assert state.closed and state.client.is_closed
+    with pytest.raises(RuntimeError, match='shut down'):
+        async with Client(server) as client:
+            pass
+
+
+async def test_warm_up_opens_connections_outside_the_client_layers(srv):
+    methods = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        methods.append(request.method)
+        return httpx.Response(405)
+
+    client = httpx.AsyncClient(
+        base_url='https://api.test/v2', transport=httpx.MockTransport(handler)
+    )
+    srv._install_single_flight(client, flight := srv.SingleFlight())
+    state = srv.ServerState(ServerConfig(warmup_connections=3), client)
+    await state.warm_up()
+    assert methods == ['HEAD', 'HEAD', 'HEAD']
+    assert flight.snapshot()['upstream'] == 0
+    await state.aclose()
+    assert client.is_closed
+
+
+def test_client_pool_and_timeouts_follow_config(srv, monkeypatch):
+    monkeypatch.setenv('POCKETSMITH_WARMUP_CONNECTIONS', '0')
+    monkeypatch.setenv('POCKETSMITH_READ_TIMEOUT', '60')
+    config = ServerConfig.from_env(dotenv=False)
+    assert config.warmup_connections == 0 and config.read_timeout == 60
+
+    options = srv._client_options(
+        ServerConfig(max_connections=8, max_keepalive_connections=50, read_timeout=60)
+    )
+    assert options['limits'].max_connections == 8
+    assert options['limits'].max_keepalive_connections == 8
+    assert options['timeout'].read == 60 and options['timeout'].connect == 5
+
+    # HTTP/2 without h2 installed falls back to HTTP/1.1
+    monkeypatch.setattr(srv.importlib.util, 'find_spec', lambda name: None)
+    assert srv._client_options(ServerConfig(http2=True))['http2'] is False
+
+
+async def test_servers_get_their_own_tool_instances(srv):
+    first = srv.create_server(ServerConfig(warmup_connections=0))
+    second = srv.create_server(ServerConfig(warmup_connections=0))
+    mine, theirs = (await first.get_tools())['me'], (await second.get_tools())['me']
+    assert mine is not theirs
+    mine.disable()
+    assert theirs.enabled and srv.me.enabled
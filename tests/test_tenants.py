@@ -0,0 +1,110 @@
+import json
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from pocketsmith_mcp.config import ServerConfig
+from pocketsmith_mcp.tenants import Credentials, TenantPool, credentials_from_headers
+
+
+class FakeState:
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_credentials_from_headers():
+    assert credentials_from_headers({'authorization': 'Bearer t1'}) == Credentials('t1')
+    assert credentials_from_headers({'x-developer-key': 'k1'}) == Credentials(None, 'k1')
+    assert credentials_from_headers({'authorization': 'Basic abc'}) is None
+    assert credentials_from_headers({}) is None
+
+
+async def test_pool_evicts_least_recently_used_once_idle():
+    pool = TenantPool(FakeState, max_tenants=2)
+    async with pool.lease('a', Credentials('a')) as a:
+        pass
+    async with pool.lease('b', Credentials('b')) as b:
+        async with pool.lease('a', Credentials('a')) as again:
+            assert again is a
+        # b is now least recently used but still serving this call
+        async with pool.lease('c', Credentials('c')) as c:
+            assert not b.closed
+        assert not b.closed
+    assert b.closed and not a.closed
+    assert pool.stats() == {
+        'tenants': 2,
+        'max_tenants': 2,
+        'in_use': 0,
+        'created': 3,
+        'evicted': 1,
+    }
+    await pool.aclose()
+    assert a.closed and c.closed
+
+
+def _call(client: TestClient, tool: str, **headers: str) -> dict:
+    resp = client.post(
+        '/mcp/',
+        json={
+            'jsonrpc': '2.0',
+            'id': 1,
+            'method': 'tools/call',
+            'params': {'name': tool, 'arguments': {}},
+        },
+        headers={'Accept': 'application/json, text/event-stream', **headers},
+    )
+    assert resp.status_code == 200
+    data = [line[5:] for line in resp.text.splitlines() if line.startswith('data:')]
+    return json.loads(data[-1])['result']
+
+
+def test_each_tenant_gets_its_own_client_and_caches(srv, monkeypatch):
+    from pocketsmith_mcp.service import create_app
+
+    seen = []
+    created = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        caller = request.headers.get('X-Developer-Key') or request.headers['Authorization']
+        seen.append(caller)
+        return httpx.Response(200, json={'id': 1, 'login': caller})
+
+    real_client = httpx.AsyncClient
+
+    def make_client(**kwargs):
+        client = real_client(transport=httpx.MockTransport(handler), **kwargs)
+        created.append(client)
+        return client
+
+    monkeypatch.setattr(srv.httpx, 'AsyncClient', make_client)
+    monkeypatch.setenv('POCKETSMITH_DEVELOPER_KEY', 'from-env')
+    config = ServerConfig(multi_tenant=True, max_tenants=2, warmup_connections=0)
+    app = create_app(config, stateless=True)
+
+    with TestClient(app) as client:
+        denied = _call(client, 'me')
+        assert denied['isError'] and 'credentials required' in denied['content'][0]['text']
+
+        assert _call(client, 'me', **{'X-Developer-Key': 'a'})['structuredContent']['login'] == 'a'
+        assert _call(client, 'me', Authorization='Bearer b')['structuredContent']['login'] == (
+            'Bearer b'
+        )
+        # a's cached /me, not b's
+        assert _call(client, 'me', **{'X-Developer-Key': 'a'})['structuredContent']['login'] == 'a'
+        _call(client, 'me', **{'X-Developer-Key': 'c'})  # evicts b
+        assert created[1].is_closed and not created[0].is_closed
+        _call(client, 'me', Authorization='Bearer b')
+        assert created[0].is_closed and not created[2].is_closed
+
+    assert seen == ['a', 'Bearer b', 'c', 'Bearer b']
+    assert len(created) == 4 and all(c.is_closed for c in created)
+
+
+def test_multi_tenant_rejects_autotools(srv):
+    with pytest.raises(ValueError):
+        srv.create_server(ServerConfig(multi_tenant=True, include_autotools=True))